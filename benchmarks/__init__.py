@@ -0,0 +1 @@
+# benchmarks\__init__.py
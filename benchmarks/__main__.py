@@ -0,0 +1,9 @@
+# benchmarks\__main__.py
+"""
+Run the benchmark suite with: python -m benchmarks
+"""
+import sys
+
+from .suite import main
+
+sys.exit(main())
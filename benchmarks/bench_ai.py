@@ -0,0 +1,25 @@
+# benchmarks\bench_ai.py
+"""
+Auto-player placement speed during a long headless session.
+
+Run from the repository root with: python -m benchmarks.bench_ai
+"""
+import random
+import time
+
+from tetris.ai import AutoPlayer
+from tetris.engine import GameState
+
+
+def main(pieces=2000, seed=1):
+    random.seed(seed)
+    player = AutoPlayer()
+    start = time.perf_counter()
+    state = player.play_game(GameState(), max_pieces=pieces)
+    seconds = time.perf_counter() - start
+    print(f'{state.pieces_placed} pieces, {state.lines_cleared} lines, lost={state.lost}: '
+          f'{state.pieces_placed / seconds:8.1f} pieces/s')
+
+
+if __name__ == '__main__':
+    main()
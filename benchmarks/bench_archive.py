@@ -0,0 +1,74 @@
+# benchmarks\bench_archive.py
+"""
+Size and read speed of tetris.archive against one JSON file per game: random
+access to games and ticks, the bulk export of final boards and scores, and
+streaming (board, piece, action) samples.
+
+Run from the repository root with: python -m benchmarks.bench_archive
+"""
+import json
+import os
+import random
+import tempfile
+import time
+
+from tetris.archive import ArchiveWriter, ReplayArchive, index_path
+from tetris.replay import ReplayPlayer
+
+from .bench_replay import record_random_game
+
+
+def write_json(directory, replays):
+    # the per-game files the archive replaces: the inputs plus the final grid of RGB tuples
+    for number, replay in enumerate(replays):
+        state = ReplayPlayer(replay).run()
+        with open(os.path.join(directory, f'{number}.json'), 'w') as f:
+            json.dump({'seed': replay.seed, 'tick_rate': replay.tick_rate, 'end_tick': replay.end_tick,
+                       'records': replay.records, 'score': state.score, 'lines': state.lines_cleared,
+                       'grid': state.grid.grid}, f)
+
+
+def main(games=300, lookups=1000):
+    rng = random.Random(1)
+    replays = [record_random_game(rng) for _ in range(games)]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'games.tra')
+        start = time.perf_counter()
+        with ArchiveWriter(path) as writer:
+            for replay in replays:
+                writer.add(replay)
+        print(f'{games / (time.perf_counter() - start):8.0f} games/s archived')
+        write_json(directory, replays)
+        archive_size = os.path.getsize(path) + os.path.getsize(index_path(path))
+        json_size = sum(os.path.getsize(os.path.join(directory, f'{number}.json')) for number in range(games))
+        print(f'{archive_size / games:8.0f} bytes/game archived  {json_size / games:8.0f} bytes/game as JSON')
+
+        with ReplayArchive(path) as archive:
+            start = time.perf_counter()
+            for _ in range(lookups):
+                archive[rng.randrange(games)].score
+            archive_lookup = (time.perf_counter() - start) / lookups
+            start = time.perf_counter()
+            for _ in range(lookups):
+                with open(os.path.join(directory, f'{rng.randrange(games)}.json')) as f:
+                    json.load(f)['score']
+            json_lookup = (time.perf_counter() - start) / lookups
+            print(f'{archive_lookup * 1e6:8.1f} us/game lookup      {json_lookup * 1e6:8.1f} us/game from JSON')
+
+            start = time.perf_counter()
+            for _ in range(lookups // 10):
+                game = archive[rng.randrange(games)]
+                game.state_at(rng.randrange(game.end_tick + 1))
+            print(f'{(time.perf_counter() - start) / (lookups // 10) * 1000:8.2f} ms/seek to a random tick')
+
+            start = time.perf_counter()
+            archive.export(os.path.join(directory, 'games.csv'))
+            print(f'{games / (time.perf_counter() - start):8.0f} games/s exported')
+
+            start = time.perf_counter()
+            samples = sum(1 for _ in archive.samples())
+            print(f'{samples / (time.perf_counter() - start):8.0f} samples/s streamed ({samples} samples)')
+
+
+if __name__ == '__main__':
+    main()
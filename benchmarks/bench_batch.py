@@ -0,0 +1,37 @@
+# benchmarks\bench_batch.py
+"""
+Throughput of the NumPy batch simulator in board-steps per second.
+
+Run from the repository root with: python -m benchmarks.bench_batch
+"""
+import time
+
+import numpy as np
+
+from tetris.batch import BatchBoards
+
+
+def main(count=4096, steps=200):
+    boards = BatchBoards(count, seed=1)
+    rng = np.random.default_rng(2)
+    # a simple population of policies: prefer the lowest column for a random rotation
+    start = time.perf_counter()
+    for _ in range(steps):
+        rotations = rng.integers(0, 4, count)
+        xs = boards.column_tops().argmax(axis=1)
+        boards.step(rotations, xs)
+        boards.reset(boards.lost)
+    seconds = time.perf_counter() - start
+
+    print(f'{count} boards x {steps} steps: {count * steps / seconds:12.0f} board-steps/s (placements)')
+
+    zeros = np.zeros(count, dtype=np.int64)
+    spawn_x = np.full(count, 5)
+    start = time.perf_counter()
+    for _ in range(steps):
+        boards.drop_distance(boards.pieces, zeros, spawn_x, zeros)
+    seconds = time.perf_counter() - start
+    print(f'{count} boards x {steps} steps: {count * steps / seconds:12.0f} board-steps/s (ghost drops)')
+
+if __name__ == '__main__':
+    main()
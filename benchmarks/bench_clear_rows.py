@@ -0,0 +1,64 @@
+# benchmarks\bench_clear_rows.py
+"""
+Row clearing: RowOperations.clear_rows against the Grid row-array compaction.
+
+Run from the repository root with: python -m benchmarks.bench_clear_rows
+"""
+import random
+import time
+
+from tetris.gameplay import Grid, RowOperations
+
+
+def build_locked(rows, columns, seed=1):
+    """
+    Build a board where every third row is full and the rest are ragged.
+
+    Args:
+        rows (int): Number of rows on the board.
+        columns (int): Number of columns on the board.
+        seed (int, optional): Seed for the random board. Defaults to 1.
+
+    Returns:
+        dict: The locked positions of the board.
+    """
+    rng = random.Random(seed)
+    locked = {}
+    for y in range(rows // 4, rows):
+        full = y % 3 == 0
+        for x in range(columns):
+            if full or rng.random() < 0.6:
+                locked[(x, y)] = (255, 0, 0)
+    return locked
+
+
+def time_clears(rows, columns, copies):
+    locked = build_locked(rows, columns)
+    row_operations = RowOperations()
+
+    legacy = [(grid.create_grid(grid.locked_positions), grid.locked_positions)
+              for grid in (Grid(dict(locked), rows, columns) for _ in range(copies))]
+    start = time.perf_counter()
+    for grid, locked_positions in legacy:
+        row_operations.clear_rows(grid, locked_positions)
+    legacy_time = time.perf_counter() - start
+
+    grids = [Grid(dict(locked), rows, columns) for _ in range(copies)]
+    start = time.perf_counter()
+    for grid in grids:
+        grid.clear_full_rows()
+    compact_time = time.perf_counter() - start
+
+    assert grids[0].locked_positions == legacy[0][1]
+    return legacy_time / copies * 1e6, compact_time / copies * 1e6
+
+
+def main(copies=300):
+    for rows, columns in ((20, 10), (100, 10), (400, 10)):
+        legacy, compact = time_clears(rows, columns, copies)
+        print(f'{rows:4d}x{columns:<3d} clear_rows {legacy:10.1f} us   clear_full_rows {compact:8.1f} us'
+              f'   x{legacy / compact:5.1f}')
+
+
+if __name__ == '__main__':
+    main()
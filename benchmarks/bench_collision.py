@@ -0,0 +1,61 @@
+# benchmarks\bench_collision.py
+"""
+Micro-benchmark of the collision strategies.
+
+Run from the repository root with: python -m benchmarks.bench_collision
+"""
+import random
+import timeit
+
+from tetris.gameplay import Grid, ValidSpaceStrategy, BitboardValidSpaceStrategy
+from tetris.shapes import SHAPES, SHAPE_COLORS, Piece
+
+
+def build_fixture(seed=1, filled_rows=8):
+    """
+    Build a half-filled board and a set of pieces to test against it.
+
+    Args:
+        seed (int, optional): Seed for the random board. Defaults to 1.
+        filled_rows (int, optional): Number of ragged rows at the bottom. Defaults to 8.
+
+    Returns:
+        tuple: (grid_instance, grid, pieces)
+    """
+    rng = random.Random(seed)
+    locked = {}
+    for y in range(20 - filled_rows, 20):
+        for x in range(10):
+            if rng.random() < 0.7:
+                locked[(x, y)] = SHAPE_COLORS[rng.randrange(len(SHAPE_COLORS))]
+    grid_instance = Grid(locked)
+    pieces = [Piece(rng.randrange(-1, 12), rng.randrange(0, 24), shape, SHAPE_COLORS[0], rng.randrange(4))
+              for shape in SHAPES for _ in range(20)]
+    return grid_instance, grid_instance.grid, pieces
+
+
+def main(number=200):
+    grid_instance, grid, pieces = build_fixture()
+    legacy = ValidSpaceStrategy()
+    bitboard = BitboardValidSpaceStrategy()
+    board = grid_instance.bitboard
+
+    for piece in pieces:
+        assert legacy.execute(piece, grid) == bitboard.execute(piece, board) == bitboard.execute(piece, grid)
+
+    cases = [
+        ('ValidSpaceStrategy (grid)', lambda: [legacy.execute(p, grid) for p in pieces]),
+        ('BitboardValidSpaceStrategy (grid)', lambda: [bitboard.execute(p, grid) for p in pieces]),
+        ('BitboardValidSpaceStrategy (bitboard)', lambda: [bitboard.execute(p, board) for p in pieces]),
+    ]
+    calls = number * len(pieces)
+    baseline = None
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        per_call = seconds / calls * 1e6
+        baseline = baseline or per_call
+        print(f'{name:40s} {per_call:8.3f} us/call  x{baseline / per_call:6.1f}')
+
+
+if __name__ == '__main__':
+    main()
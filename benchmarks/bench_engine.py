@@ -0,0 +1,51 @@
+# benchmarks\bench_engine.py
+"""
+Headless simulation throughput of tetris.engine.GameState.
+
+Run from the repository root with: python -m benchmarks.bench_engine
+"""
+import random
+import sys
+import time
+
+from tetris.engine import GameState, Input
+
+ACTIONS = (Input.LEFT, Input.RIGHT, Input.ROTATE, Input.HARD_DROP, Input.HOLD)
+
+
+def play_random_game(rng, max_steps=5000, step_ms=16):
+    """
+    Play one game with random inputs.
+
+    Args:
+        rng (random.Random): Source of the random inputs.
+        max_steps (int, optional): Steps after which the game is stopped. Defaults to 5000.
+        step_ms (int, optional): Milliseconds simulated per step. Defaults to 16.
+
+    Returns:
+        GameState: The final state of the game.
+    """
+    state = GameState(seed=rng.getrandbits(64))
+    for _ in range(max_steps):
+        inputs = [rng.choice(ACTIONS)] if rng.random() < 0.3 else []
+        state.step(inputs, step_ms, soft_drop=rng.random() < 0.5)
+        if state.lost:
+            break
+    return state
+
+
+def main(games=200):
+    assert 'pygame' not in sys.modules
+    rng = random.Random(1)
+    steps = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        state = play_random_game(rng)
+        steps += state.pieces_placed
+    seconds = time.perf_counter() - start
+    assert 'pygame' not in sys.modules
+    print(f'{games / seconds:8.1f} games/s   {steps / seconds:10.1f} pieces/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# benchmarks\bench_env.py
+"""
+Steps per second of the reinforcement learning environments of tetris.env: one
+environment, a vector stepped in this process and a vector split across worker
+processes with shared memory observations, for both action spaces.
+
+Run from the repository root with: python -m benchmarks.bench_env
+"""
+import os
+import time
+
+import numpy as np
+
+from tetris.env import SubprocessVectorEnv, TetrisEnv, VectorTetrisEnv
+
+
+def random_actions(rng, observation, count, action_count):
+    mask = observation.get('action_mask')
+    if mask is None:
+        return rng.integers(0, action_count, count)
+    # a random possible placement per environment
+    scores = rng.random(mask.shape) * mask
+    return scores.argmax(axis=1)
+
+
+def measure_vector(vector, steps, rng):
+    observation, _ = vector.reset(seed=0)
+    start = time.perf_counter()
+    for _ in range(steps):
+        observation, *_ = vector.step(random_actions(rng, observation, vector.count, vector.action_count))
+    return vector.count * steps / (time.perf_counter() - start)
+
+
+def measure_single(mode, steps, rng):
+    env = TetrisEnv(mode, seed=0)
+    observation, _ = env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        action = random_actions(rng, {name: array[None] for name, array in observation.items()}, 1, env.action_count)
+        observation, _, terminated, truncated, _ = env.step(action[0])
+        if terminated or truncated:
+            observation, _ = env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+def main(count=64, steps=200, workers=None):
+    rng = np.random.default_rng(1)
+    workers = workers or os.cpu_count()
+    for mode in ('input', 'placement'):
+        print(f'{mode:9s}  single {measure_single(mode, count * steps // 8, rng):8.0f} steps/s')
+        print(f'{mode:9s}  vector of {count} in process {measure_vector(VectorTetrisEnv(count, mode), steps, rng):8.0f} steps/s')
+        with SubprocessVectorEnv(count, workers, mode) as vector:
+            print(f'{mode:9s}  vector of {count} on {workers} workers {measure_vector(vector, steps, rng):8.0f} steps/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+# benchmarks\bench_ghost.py
+"""
+Ghost piece / hard drop: stepping the piece down with valid_space against the skyline drop distance.
+
+Run from the repository root with: python -m benchmarks.bench_ghost
+"""
+import timeit
+
+from tetris.gameplay import ShapeOperations
+from benchmarks.bench_collision import build_fixture
+
+
+def main(number=200):
+    grid_instance, _, pieces = build_fixture()
+    shape_operations = ShapeOperations()
+    # pieces near the top, as they are while falling
+    pieces = [piece for piece in pieces if piece.y < 3]
+    board = grid_instance.bitboard
+
+    for piece in pieces:
+        ghost = piece.ghost_piece_position(board, shape_operations.valid_space)
+        assert ghost.y - piece.y == grid_instance.drop_distance(piece)
+
+    cases = [
+        ('ghost_piece_position (valid_space loop)',
+         lambda: [piece.ghost_piece_position(board, shape_operations.valid_space) for piece in pieces]),
+        ('Grid.drop_distance (skyline)', lambda: [grid_instance.drop_distance(piece) for piece in pieces]),
+    ]
+    calls = number * len(pieces)
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print(f'{name:42s} {seconds / calls * 1e6:8.3f} us/call')
+
+
+if __name__ == '__main__':
+    main()
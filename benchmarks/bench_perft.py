@@ -0,0 +1,55 @@
+# benchmarks\bench_perft.py
+"""
+Move tree counts of tetris.perft checked against published values, and the
+speed of the placement search in nodes per second. Nodes are the placements
+in the tree, counted the same whatever the number of workers, so nodes/s is
+comparable across --workers; placements generated more than once by
+different workers do not count.
+Exits with status 1 when a count differs: a change to the rotation, collision
+or clear logic that changes them changes the game.
+
+Run from the repository root with: python -m benchmarks.bench_perft [--workers N]
+"""
+import argparse
+import sys
+
+from tetris.bitboard import Bitboard
+from tetris.perft import perft, piece_sequence
+
+from .fixtures import build_board
+
+# (board, seed of the pieces, depth): (positions, paths) at every depth
+PUBLISHED = {
+    ('empty', 1, 4): [(17, 17), (289, 289), (5107, 5111), (82641, 93448)],
+    ('empty', 2, 3): [(34, 34), (585, 585), (7060, 10414)],
+    ('half_full', 1, 3): [(17, 17), (289, 289), (5097, 5101)],
+    ('half_full', 2, 3): [(34, 34), (585, 585), (7060, 10405)],
+    ('ragged', 1, 3): [(18, 18), (349, 349), (6620, 6621)],
+    ('ragged', 2, 3): [(36, 36), (687, 687), (8705, 13198)],
+    ('near_top_out', 1, 3): [(7, 7), (4, 4), (7, 7)],
+    ('near_top_out', 2, 3): [(2, 2), (12, 12), (31, 44)],
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check and time perft counts')
+    parser.add_argument('--workers', type=int, default=1, help='processes per search (default: 1)')
+    args = parser.parse_args(argv)
+
+    failed = False
+    nodes = seconds = 0
+    for (name, seed, depth), expected in PUBLISHED.items():
+        result = perft(Bitboard.from_locked(build_board(name)), piece_sequence(seed, depth), depth, args.workers)
+        counts = [(level.positions, level.paths) for level in result.levels]
+        ok = counts == expected
+        failed |= not ok
+        nodes += result.nodes
+        seconds += result.seconds
+        print(f'{name:13s} seed {seed} depth {depth}  {counts[-1][0]:7d} positions {counts[-1][1]:7d} paths  '
+              f'{result.nodes / result.seconds:8.0f} nodes/s  {"ok" if ok else f"MISMATCH, expected {expected}"}')
+    print(f'{nodes} nodes in {seconds:.2f}s: {nodes / seconds:.0f} nodes/s')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
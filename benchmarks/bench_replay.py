@@ -0,0 +1,65 @@
+# benchmarks\bench_replay.py
+"""
+Replay size, headless playback speed and seek time of tetris.replay.
+
+Run from the repository root with: python -m benchmarks.bench_replay
+"""
+import random
+import time
+
+from tetris.engine import GameState, Input
+from tetris.replay import Replay, ReplayPlayer, ReplayRecorder
+
+ACTIONS = (Input.LEFT, Input.RIGHT, Input.ROTATE, Input.LEFT, Input.RIGHT, Input.ROTATE, Input.HOLD)
+
+
+def record_random_game(rng, tick_rate=60, max_ticks=100000):
+    """
+    Record one game with random inputs, without hard drops so it lasts long enough.
+
+    Args:
+        rng (random.Random): Source of the seed and the random inputs.
+        tick_rate (int, optional): Simulation ticks per second. Defaults to 60.
+        max_ticks (int, optional): Ticks after which the game is stopped. Defaults to 100000.
+
+    Returns:
+        Replay: The recorded game.
+    """
+    seed = rng.getrandbits(64)
+    state = GameState(seed=seed)
+    recorder = ReplayRecorder(seed, tick_rate)
+    soft_drop = False
+    while not state.lost and recorder.tick < max_ticks:
+        if rng.random() < 0.02:
+            soft_drop = not soft_drop
+        inputs = [rng.choice(ACTIONS)] if rng.random() < 0.1 else []
+        recorder.record(inputs, soft_drop)
+        state.step(inputs, recorder.replay.tick_ms, soft_drop)
+    return recorder.replay
+
+
+def main(games=20, seeks=200):
+    rng = random.Random(1)
+    replays = [Replay.from_bytes(record_random_game(rng).to_bytes()) for _ in range(games)]
+    ticks = sum(replay.end_tick for replay in replays)
+    size = sum(len(replay.to_bytes()) for replay in replays)
+
+    start = time.perf_counter()
+    players = [ReplayPlayer(replay) for replay in replays]
+    for player in players:
+        player.run()
+    seconds = time.perf_counter() - start
+    played = sum(replay.end_tick / replay.tick_rate for replay in replays)
+    print(f'{size / games:8.0f} bytes/game  {size * 8 / played:6.1f} bits/s of play')
+    print(f'{ticks / seconds:8.0f} ticks/s    {played / seconds:6.0f}x real time')
+
+    start = time.perf_counter()
+    for _ in range(seeks):
+        player = rng.choice(players)
+        player.seek(rng.randrange(player.replay.end_tick + 1))
+    seconds = time.perf_counter() - start
+    print(f'{seconds / seeks * 1000:8.3f} ms/seek')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# benchmarks\bench_server.py
+"""
+Load generator for tetris.server: scripted bot clients play versus matches over
+loopback against a server in its own process, with more matches at every level.
+Reports the server's tick time and lateness percentiles, its CPU use, and how
+many matches one core sustains within the tick budget.
+
+Run from the repository root with: python -m benchmarks.bench_server
+"""
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+
+from tetris.engine import Input
+from tetris.profiler import RingBuffer
+
+BOT_INPUTS = (Input.LEFT, Input.RIGHT, Input.ROTATE, Input.LEFT, Input.RIGHT, Input.ROTATE, Input.HARD_DROP)
+
+
+class Bot:
+    """
+    A scripted client: joins, sends a random input now and then, rejoins when its match ends.
+    """
+    def __init__(self, host, port, rng):
+        self.host = host
+        self.port = port
+        self.rng = rng
+        self.intervals = RingBuffer(2000)  # milliseconds between state messages
+        self.running = True
+
+    async def run(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(b'{"type":"join","name":"bot"}\n')
+        last = None
+        while self.running:
+            line = await reader.readline()
+            if not line:
+                break
+            # only the message type is looked at, the bots must stay cheaper than the server
+            if line.startswith(b'{"type":"state"'):
+                now = time.perf_counter()
+                if last is not None:
+                    self.intervals.append((now - last) * 1000)
+                last = now
+                if self.rng.random() < 0.1:
+                    writer.write(b'{"type":"input","inputs":[%d],"soft_drop":false}\n' % self.rng.choice(BOT_INPUTS))
+            elif line.startswith(b'{"type":"end"'):
+                last = None
+                writer.write(b'{"type":"join","name":"bot"}\n')
+        writer.close()
+
+
+async def query_stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"type":"stats"}\n')
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+
+async def run_level(host, port, matches, seconds, rng):
+    bots = [Bot(host, port, rng) for _ in range(2 * matches)]
+    tasks = [asyncio.ensure_future(bot.run()) for bot in bots]
+    await asyncio.sleep(1)  # let the matches start and the ring buffers fill with this load
+    before = await query_stats(host, port)
+    await asyncio.sleep(seconds)
+    after = await query_stats(host, port)
+    for bot in bots:
+        bot.running = False
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(0.5)
+
+    intervals = RingBuffer(sum(bot.intervals.size for bot in bots))
+    for bot in bots:
+        for value in bot.intervals.values():
+            intervals.append(value)
+    cpu = (after['cpu_seconds'] - before['cpu_seconds']) / (after['wall_seconds'] - before['wall_seconds'])
+    return after, cpu, intervals.percentiles(99)[0]
+
+
+async def run_levels(host, port, levels, seconds):
+    rng = random.Random(1)
+    sustained = 0
+    for matches in levels:
+        stats, cpu, interval_p99 = await run_level(host, port, matches, seconds, rng)
+        tick, late = stats['tick_ms'], stats['late_ms']
+        within_budget = tick['p99'] + late['p99'] < stats['tick_budget_ms']
+        if within_budget:
+            sustained = max(sustained, matches)
+        print(f'{matches:5d} matches  tick p50 {tick["p50"]:6.2f} p99 {tick["p99"]:6.2f} ms  '
+              f'late p99 {late["p99"]:6.2f} ms  client interval p99 {interval_p99:6.2f} ms  '
+              f'cpu {cpu * 100:5.1f}%  {"ok" if within_budget else "over budget"}')
+        if within_budget and cpu > 0:
+            print(f'{"":5s}          ~{matches / cpu:7.0f} matches per core at this load')
+    print(f'sustained within the {stats["tick_budget_ms"]:.1f} ms tick budget: {sustained} matches')
+
+
+def main(levels=(8, 32, 64, 128, 256), seconds=3):
+    server = subprocess.Popen([sys.executable, '-m', 'tetris.server', '--port', '0'],
+                              stdout=subprocess.PIPE, text=True)
+    try:
+        host, port = server.stdout.readline().split()[-1].rsplit(':', 1)
+        asyncio.run(run_levels(host, int(port), levels, seconds))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
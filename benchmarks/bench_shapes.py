@@ -0,0 +1,62 @@
+# benchmarks\bench_shapes.py
+"""
+Per-call cost of shape position lookups before and after the compiled shape registry.
+
+Run from the repository root with: python -m benchmarks.bench_shapes
+"""
+import timeit
+
+from tetris.gameplay import ConvertShapeFormatStrategy
+from tetris.shapes import SHAPES, SHAPE_COLORS, Piece
+
+
+def legacy_convert_shape_format(shape):
+    """
+    The original string-parsing ConvertShapeFormatStrategy.execute, kept as the baseline.
+    """
+    positions = []
+    format = shape.shape[shape.rotation % len(shape.shape)]
+
+    for i, line in enumerate(format):
+        row = list(line)
+        for j, column in enumerate(row):
+            if column == '0':
+                positions.append((shape.x + j, shape.y + i))
+
+    for i, pos in enumerate(positions):
+        positions[i] = (pos[0] - 2, pos[1] - 4)
+
+    return positions
+
+
+def legacy_preview_blocks(shape):
+    """
+    The template walk the original TetrisDisplay.draw_shape did before drawing.
+    """
+    format = shape.shape[shape.rotation % len(shape.shape)]
+    return [(j, i) for i, line in enumerate(format) for j, column in enumerate(list(line)) if column == '0']
+
+
+def main(number=2000):
+    pieces = [Piece(5, 3, shape, SHAPE_COLORS[index], rotation)
+              for index, shape in enumerate(SHAPES) for rotation in range(4)]
+    strategy = ConvertShapeFormatStrategy()
+
+    for piece in pieces:
+        assert legacy_convert_shape_format(piece) == strategy.execute(piece)
+        assert legacy_preview_blocks(piece) == list(piece.rotation_table.blocks)
+
+    cases = [
+        ('convert_shape_format (string parse)', lambda: [legacy_convert_shape_format(p) for p in pieces]),
+        ('convert_shape_format (registry)', lambda: [strategy.execute(p) for p in pieces]),
+        ('draw_shape blocks (string parse)', lambda: [legacy_preview_blocks(p) for p in pieces]),
+        ('draw_shape blocks (registry)', lambda: [p.rotation_table.blocks for p in pieces]),
+    ]
+    calls = number * len(pieces)
+    for name, func in cases:
+        seconds = min(timeit.repeat(func, number=number, repeat=3))
+        print(f'{name:40s} {seconds / calls * 1e6:8.3f} us/call')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# benchmarks\bench_spectate.py
+"""
+Bandwidth and speed of the spectator stream of tetris.spectate: bytes per tick
+of deltas and keyframes against sending the whole board as JSON every tick,
+and encode/decode throughput. Every decoded frame is checked against the game.
+
+Run from the repository root with: python -m benchmarks.bench_spectate
+"""
+import json
+import random
+import time
+
+from tetris.engine import GameState, board_cells, packed_piece
+from tetris.spectate import KEYFRAME, DeltaDecoder, DeltaEncoder, shape_index
+
+from .bench_replay import ACTIONS
+
+
+def play_random_game(rng, ticks, tick_ms=1000 / 60):
+    """
+    Play random inputs for a number of ticks, starting a new game whenever one is lost.
+
+    Args:
+        rng (random.Random): Source of the seeds and the random inputs.
+        ticks (int): Ticks to play.
+        tick_ms (float, optional): Milliseconds per tick. Defaults to 60 ticks per second.
+
+    Yields:
+        GameState: The game after every tick. The same object is yielded until the game is lost.
+    """
+    state = GameState(seed=rng.getrandbits(64))
+    soft_drop = False
+    for _ in range(ticks):
+        if state.lost:
+            state = GameState(seed=rng.getrandbits(64))
+        if rng.random() < 0.02:
+            soft_drop = not soft_drop
+        state.step([rng.choice(ACTIONS)] if rng.random() < 0.1 else [], tick_ms, soft_drop)
+        yield state
+
+
+def naive_frame(state):
+    # what sending every tick without a codec looks like: the whole grid of RGB tuples as JSON
+    return json.dumps({'grid': state.grid.grid, 'score': state.score}, separators=(',', ':')).encode()
+
+
+def main(ticks=10000):
+    rng = random.Random(1)
+    encoder = DeltaEncoder()
+    decoder = DeltaDecoder()
+    frames = []
+    naive_bytes = 0
+    encode_seconds = decode_seconds = 0
+    for tick, state in enumerate(play_random_game(rng, ticks)):
+        start = time.perf_counter()
+        frame = encoder.encode(state, tick)
+        encode_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        decoder.decode(frame)
+        decode_seconds += time.perf_counter() - start
+        frames.append(frame)
+        naive_bytes += len(naive_frame(state))
+        assert bytes(decoder.cells) == board_cells(state.grid), f'board differs at tick {tick}'
+        assert decoder.piece == packed_piece(state.current_piece), f'piece differs at tick {tick}'
+        assert (decoder.next_shape, decoder.hold_shape, decoder.score) == (
+            shape_index(state.next_piece), shape_index(state.hold_piece), state.score), f'state differs at tick {tick}'
+
+    keyframes = [frame for frame in frames if frame[:1] == KEYFRAME]
+    deltas = [frame for frame in frames if frame[:1] != KEYFRAME]
+    stream_bytes = sum(map(len, frames)) + 2 * len(frames)  # with the length prefixes
+    print(f'{ticks} ticks, {len(keyframes)} keyframes, decoded boards match the game')
+    print(f'{sum(map(len, deltas)) / len(deltas):8.1f} bytes/delta  {len(keyframes[0]):6d} bytes/keyframe')
+    print(f'{stream_bytes / ticks:8.1f} bytes/tick streamed  {naive_bytes / ticks:8.1f} bytes/tick as JSON grids '
+          f'({naive_bytes / stream_bytes:.0f}x)')
+    print(f'{ticks / encode_seconds:8.0f} ticks/s encoded  {ticks / decode_seconds:8.0f} ticks/s decoded')
+
+
+if __name__ == '__main__':
+    main()
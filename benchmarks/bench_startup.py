@@ -0,0 +1,60 @@
+# benchmarks\bench_startup.py
+"""
+Cold start: time from process start to the first display.update of the main menu,
+with an empty font cache and with the cache written by the previous run.
+
+Run from the repository root with: python -m benchmarks.bench_startup
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+# runs in a fresh interpreter so imports and pygame initialization are measured too
+CHILD = '''
+import time
+started_at = time.perf_counter()
+import pygame
+from tetris_game import TetrisGame
+
+def first_update(*args):
+    print(time.perf_counter() - started_at)
+    raise SystemExit
+
+pygame.display.update = first_update
+TetrisGame(started_at=started_at, startup_budget=0).main_menu()
+'''
+
+
+def time_startup(cache_dir):
+    """
+    Start the game in a new process and time its first frame.
+
+    Args:
+        cache_dir (str): The cache directory the game uses.
+
+    Returns:
+        float: Seconds from process start to the first display.update.
+    """
+    env = dict(os.environ, TETRIS_CACHE_DIR=cache_dir, PYGAME_HIDE_SUPPORT_PROMPT='1')
+    env.setdefault('SDL_VIDEODRIVER', 'dummy')
+    env.setdefault('SDL_AUDIODRIVER', 'dummy')
+    output = subprocess.run([sys.executable, '-c', CHILD], env=env, capture_output=True, text=True, check=True)
+    return float(output.stdout.split()[-1])
+
+
+def main(runs=5):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = []
+        warm = []
+        for _ in range(runs):
+            for name in os.listdir(cache_dir):
+                os.remove(os.path.join(cache_dir, name))
+            cold.append(time_startup(cache_dir))
+            warm.append(time_startup(cache_dir))
+    print(f'first frame with empty font cache {min(cold) * 1000:8.1f} ms   '
+          f'with font cache {min(warm) * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# benchmarks\bench_text.py
+"""
+Frame time of the full TetrisDisplay frame with and without the text cache.
+
+Run from the repository root with: python -m benchmarks.bench_text
+"""
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from tetris import display
+from tetris.constants import S_HEIGHT, S_WIDTH
+from tetris.engine import GameState
+
+
+class UncachedText(display.Text):
+    """
+    The original Text, looking up the font and rendering on every construction.
+    """
+    def __init__(self, text, size, color, font_name='forte'):
+        self.font = pygame.font.SysFont(font_name, size)
+        self.label = self.font.render(text, 1, color)
+
+
+def draw_frames(tetris_display, state, frames):
+    ghost_piece = state.ghost_piece()
+    grid = state.view()
+    convert = state.shape_operations.convert_shape_format
+    start = time.perf_counter()
+    for frame in range(frames):
+        tetris_display.draw_window(ghost_piece, grid, convert)
+        tetris_display.draw_next_shape(state.next_piece)
+        tetris_display.draw_hold_shape(state.next_piece)
+        tetris_display.draw_score(state.score)
+        tetris_display.draw_current_song('Desert Stage.mp3')
+        tetris_display.draw_fps(60 + frame % 3)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main(frames=200):
+    pygame.font.init()
+    surface = pygame.Surface((S_WIDTH, S_HEIGHT))
+    tetris_display = display.TetrisDisplay(surface)
+    state = GameState()
+
+    cached = display.Text
+    display.Text = UncachedText
+    try:
+        uncached_ms = draw_frames(tetris_display, state, frames)
+    finally:
+        display.Text = cached
+    cached_ms = draw_frames(tetris_display, state, frames)
+    print(f'frame without text cache {uncached_ms:7.3f} ms   with text cache {cached_ms:7.3f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# benchmarks\fixtures.py
+"""
+Representative boards for the benchmark suite: empty, half-full, ragged and near-top-out.
+"""
+import random
+
+from tetris.constants import GRID_COLUMNS, GRID_ROWS
+from tetris.shapes import SHAPES, SHAPE_COLORS, Piece
+
+
+def _random_color(rng):
+    return SHAPE_COLORS[rng.randrange(len(SHAPE_COLORS))]
+
+
+def empty_board(rng):
+    """
+    An empty board, where placements and gravity have the most room.
+
+    Returns:
+        dict: No locked positions at all.
+    """
+    return {}
+
+
+def half_full_board(rng):
+    """
+    Fill the bottom half with one hole per row, except for two full rows that clear.
+
+    Returns:
+        dict: The locked positions of the board.
+    """
+    locked = {}
+    full_rows = set(rng.sample(range(GRID_ROWS // 2, GRID_ROWS), 2))
+    for y in range(GRID_ROWS // 2, GRID_ROWS):
+        hole = None if y in full_rows else rng.randrange(GRID_COLUMNS)
+        for x in range(GRID_COLUMNS):
+            if x != hole:
+                locked[(x, y)] = _random_color(rng)
+    return locked
+
+
+def ragged_board(rng):
+    """
+    Stack columns of random heights with a few holes and overhangs, like a messy game.
+
+    Returns:
+        dict: The locked positions of the board.
+    """
+    locked = {}
+    for x in range(GRID_COLUMNS):
+        height = rng.randrange(GRID_ROWS * 3 // 4)
+        for y in range(GRID_ROWS - height, GRID_ROWS):
+            if rng.random() < 0.85:
+                locked[(x, y)] = _random_color(rng)
+    return locked
+
+
+def near_top_out_board(rng):
+    """
+    Fill every row but the top two, one hole per row, so the next pieces barely fit.
+
+    Returns:
+        dict: The locked positions of the board.
+    """
+    locked = {}
+    for y in range(2, GRID_ROWS):
+        hole = rng.randrange(GRID_COLUMNS)
+        for x in range(GRID_COLUMNS):
+            if x != hole:
+                locked[(x, y)] = _random_color(rng)
+    return locked
+
+
+BOARDS = {
+    'empty': empty_board,
+    'half_full': half_full_board,
+    'ragged': ragged_board,
+    'near_top_out': near_top_out_board,
+}
+
+
+def build_board(name, seed=1):
+    """
+    Build one of the fixture boards.
+
+    Args:
+        name (str): One of the BOARDS names.
+        seed (int, optional): Seed for the random board. Defaults to 1.
+
+    Returns:
+        dict: The locked positions of the board.
+    """
+    return BOARDS[name](random.Random(seed))
+
+
+def build_pieces(seed=1):
+    """
+    Build pieces to test against the boards: every shape and rotation at the spawn
+    position, plus random positions in and around the board.
+
+    Args:
+        seed (int, optional): Seed for the random positions. Defaults to 1.
+
+    Returns:
+        list: The pieces.
+    """
+    rng = random.Random(seed)
+    pieces = [Piece(5, 0, shape, SHAPE_COLORS[i], rotation)
+              for i, shape in enumerate(SHAPES) for rotation in range(len(shape))]
+    pieces += [Piece(rng.randrange(-1, GRID_COLUMNS + 1), rng.randrange(-2, GRID_ROWS + 2), shape,
+                     SHAPE_COLORS[i], rng.randrange(4))
+               for i, shape in enumerate(SHAPES) for _ in range(4)]
+    return pieces
@@ -0,0 +1,250 @@
+# benchmarks\suite.py
+"""
+Benchmark suite of the engine and renderer hot paths on the fixture boards.
+
+Every case runs on every board of benchmarks.fixtures and reports microseconds
+per call. Results can be written as JSON, and compared against a previous JSON
+file: a case slower than the baseline by more than the threshold is a regression
+and makes the command exit with status 1.
+
+Run from the repository root with:
+    python -m benchmarks                                  # print the table
+    python -m benchmarks --json baseline.json             # save a baseline
+    python -m benchmarks --baseline baseline.json         # gate against it
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from tetris.engine import GameState
+from tetris.gameplay import (BitboardValidSpaceStrategy, ConvertShapeFormatStrategy, Grid, RowOperations,
+                             ValidSpaceStrategy)
+
+from .fixtures import BOARDS, build_board, build_pieces
+
+
+def valid_space(grid, pieces):
+    strategy = ValidSpaceStrategy()
+    return lambda: [strategy.execute(piece, grid.grid) for piece in pieces], len(pieces)
+
+
+def valid_space_bitboard(grid, pieces):
+    strategy = BitboardValidSpaceStrategy()
+    return lambda: [strategy.execute(piece, grid.bitboard) for piece in pieces], len(pieces)
+
+
+def convert_shape_format(grid, pieces):
+    strategy = ConvertShapeFormatStrategy()
+    return lambda: [strategy.execute(piece) for piece in pieces], len(pieces)
+
+
+def clear_rows(grid, pieces):
+    # clearing mutates the board, so every call works on a fresh copy (the copy is included)
+    row_operations = RowOperations()
+    locked = grid.locked_positions
+    rows = grid.grid
+    return lambda: row_operations.clear_rows([row[:] for row in rows], dict(locked)), 1
+
+
+def create_grid(grid, pieces):
+    locked = grid.locked_positions
+    return lambda: grid.create_grid(locked), 1
+
+
+def refresh(grid, pieces):
+    return grid.refresh, 1
+
+
+def game_on(grid):
+    state = GameState(seed=0)
+    state.locked_positions.update(grid.locked_positions)
+    state.grid.refresh()
+    return state
+
+
+def pack(grid, pieces):
+    return game_on(grid).pack, 1
+
+
+def unpack(grid, pieces):
+    state = game_on(grid)
+    data = state.pack()
+    return lambda: state.unpack(data), 1
+
+
+def ghost_piece_position(grid, pieces):
+    valid_space_func = ValidSpaceStrategy().execute
+    spawned = [piece for piece in pieces if (piece.x, piece.y) == (5, 0)]
+    return lambda: [piece.ghost_piece_position(grid.grid, valid_space_func) for piece in spawned], len(spawned)
+
+
+def drop_distance(grid, pieces):
+    spawned = [piece for piece in pieces if (piece.x, piece.y) == (5, 0)]
+    return lambda: [grid.drop_distance(piece) for piece in spawned], len(spawned)
+
+
+def draw_window(grid, pieces):
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    import pygame
+    from tetris.constants import S_HEIGHT, S_WIDTH
+    from tetris.display import TetrisDisplay
+
+    pygame.display.init()
+    pygame.font.init()
+    surface = pygame.display.set_mode((S_WIDTH, S_HEIGHT))
+    tetris_display = TetrisDisplay(surface)
+    convert = ConvertShapeFormatStrategy().execute
+    piece = pieces[0]
+    ghost_piece = piece.create_ghost_piece()
+    ghost_piece.y += max(grid.drop_distance(ghost_piece), 0)
+    view = grid.view(convert(piece), piece.color)
+    return lambda: tetris_display.draw_window(ghost_piece, view, convert), 1
+
+
+# name: factory taking (Grid, pieces) and returning (function, calls per run)
+CASES = {
+    'ValidSpaceStrategy.execute': valid_space,
+    'BitboardValidSpaceStrategy.execute': valid_space_bitboard,
+    'ConvertShapeFormatStrategy.execute': convert_shape_format,
+    'RowOperations.clear_rows': clear_rows,
+    'Grid.create_grid': create_grid,
+    'Grid.refresh': refresh,
+    'GameState.pack': pack,
+    'GameState.unpack': unpack,
+    'Piece.ghost_piece_position': ghost_piece_position,
+    'Grid.drop_distance': drop_distance,
+    'TetrisDisplay.draw_window': draw_window,
+}
+
+
+def measure(func, calls, repeat=5, min_time=0.05):
+    """
+    Time a function, calibrating the number of runs so each repeat lasts at least min_time.
+
+    Args:
+        func (function): The function to time.
+        calls (int): Number of calls of the benchmarked code per run of func.
+        repeat (int, optional): Number of repeats, the fastest is kept. Defaults to 5.
+        min_time (float, optional): Minimum seconds per repeat. Defaults to 0.05.
+
+    Returns:
+        float: Microseconds per call.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_time:
+            break
+        number *= 2
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return best / number / calls * 1e6
+
+
+def run(cases=CASES, boards=BOARDS, repeat=5, min_time=0.05, pattern=None):
+    """
+    Run the benchmark cases on the fixture boards.
+
+    Args:
+        cases (dict, optional): Case factories by name. Defaults to CASES.
+        boards (iterable, optional): Fixture board names. Defaults to all of BOARDS.
+        repeat (int, optional): Number of repeats per case. Defaults to 5.
+        min_time (float, optional): Minimum seconds per repeat. Defaults to 0.05.
+        pattern (str, optional): Only run the cases whose key contains this text.
+
+    Returns:
+        dict: Microseconds per call keyed by 'case[board]'. Cases that need a missing
+            optional dependency (pygame) are left out.
+    """
+    pieces = build_pieces()
+    results = {}
+    for name, factory in cases.items():
+        for board in boards:
+            key = f'{name}[{board}]'
+            if pattern and pattern not in key:
+                continue
+            try:
+                func, calls = factory(Grid(build_board(board)), pieces)
+            except ImportError as error:
+                print(f'skipping {key}: {error}', file=sys.stderr)
+                continue
+            results[key] = measure(func, calls, repeat, min_time)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline.
+
+    Args:
+        results (dict): Microseconds per call keyed by case.
+        baseline (dict): The baseline results.
+        threshold (float): Allowed relative slowdown, e.g. 0.1 for 10%.
+
+    Returns:
+        list: (key, baseline, result, ratio) of the regressed cases.
+    """
+    regressions = []
+    for key, value in results.items():
+        previous = baseline.get(key)
+        if previous and value / previous > 1 + threshold:
+            regressions.append((key, previous, value, value / previous))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the engine and renderer hot paths.')
+    parser.add_argument('--json', metavar='FILE', help="write the results as JSON to FILE ('-' for stdout)")
+    parser.add_argument('--baseline', metavar='FILE', help='compare against results saved with --json')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='relative slowdown counted as a regression (default: 0.15)')
+    parser.add_argument('--repeat', type=int, default=5, help='repeats per case, the fastest is kept (default: 5)')
+    parser.add_argument('--min-time', type=float, default=0.05, help='minimum seconds per repeat (default: 0.05)')
+    parser.add_argument('--filter', metavar='TEXT', help='only run the cases containing TEXT')
+    args = parser.parse_args(argv)
+
+    results = run(repeat=args.repeat, min_time=args.min_time, pattern=args.filter)
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+
+    out = sys.stderr if args.json == '-' else sys.stdout
+    for key, value in results.items():
+        line = f'{key:55s} {value:10.3f} us'
+        if key in baseline:
+            line += f'   baseline {baseline[key]:10.3f} us   x{value / baseline[key]:5.2f}'
+        print(line, file=out)
+
+    if args.json:
+        report = {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'unit': 'us/call',
+            'results': results,
+        }
+        if args.json == '-':
+            json.dump(report, sys.stdout, indent=2)
+            print()
+        else:
+            with open(args.json, 'w') as file:
+                json.dump(report, file, indent=2)
+
+    regressions = compare(results, baseline, args.threshold)
+    for key, previous, value, ratio in regressions:
+        print(f'REGRESSION {key}: {previous:.3f} us -> {value:.3f} us (x{ratio:.2f})', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
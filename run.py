@@ -1,11 +1,61 @@
 # run.py
+import time
+
+# measured from here, before pygame is imported, for the startup budget
+STARTED_AT = time.perf_counter()
+
+import argparse
 
 # Import the TetrisGame class from tetris_game
 from tetris_game import TetrisGame
+from tetris.replay import Replay, ReplayPlayer
 
 # Check if the script is being executed directly, rather than being imported as a module
 if __name__ == "__main__":
-    # Create an instance of the TetrisGame class
-    game = TetrisGame()
-    # Start the main menu of the game
-    game.main_menu()
+    parser = argparse.ArgumentParser(description='Tetris')
+    parser.add_argument('--autoplay', action='store_true', help='let the built-in AI play the game')
+    parser.add_argument('--fps', type=int, default=60, help='frame rate cap, 0 for uncapped (default: 60)')
+    parser.add_argument('--tick-rate', type=int, default=60, help='simulation ticks per second (default: 60)')
+    parser.add_argument('--vsync', action='store_true', help='pace frames with vsync when supported')
+    parser.add_argument('--seed', type=int, help='seed of the piece generator')
+    parser.add_argument('--record', metavar='FILE', help='save a replay of the game to FILE')
+    parser.add_argument('--replay', metavar='FILE', help='play back a replay saved with --record')
+    parser.add_argument('--speed', type=float, default=1, help='replay playback speed (default: 1)')
+    parser.add_argument('--headless', action='store_true', help='play the replay without a window, as fast as possible')
+    parser.add_argument('--profile', action='store_true', help='show p50/p95/p99 frame phase timings')
+    parser.add_argument('--profile-out', metavar='FILE', help='export the frame timings to FILE (.csv or .jsonl) on exit')
+    parser.add_argument('--startup-budget', type=float, default=1.0,
+                        help='warn when the main menu takes longer than this many seconds to show (default: 1.0)')
+    parser.add_argument('--das', type=float, default=167,
+                        help='milliseconds left/right is held before it repeats (default: 167)')
+    parser.add_argument('--arr', type=float, default=33,
+                        help='milliseconds between repeats, 0 to move to the wall at once (default: 33)')
+    parser.add_argument('--connect', metavar='HOST:PORT',
+                        help='play versus matches on a server started with python -m tetris.server')
+    parser.add_argument('--name', default='player', help='name shown to opponents (default: player)')
+    parser.add_argument('--spectate', metavar='HOST:PORT', help='watch a match on a server')
+    parser.add_argument('--match', type=int, help='id of the match to watch (default: any)')
+    parser.add_argument('--player', type=int, default=0, choices=(0, 1), help='player of the match to watch')
+    args = parser.parse_args()
+
+    if args.replay and args.headless:
+        state = ReplayPlayer(Replay.load(args.replay)).run()
+        print('score {}, lines {}, pieces {}'.format(state.score, state.lines_cleared, state.pieces_placed))
+    else:
+        # Create an instance of the TetrisGame class
+        game = TetrisGame(autoplay=args.autoplay, max_fps=args.fps, tick_rate=args.tick_rate, vsync=args.vsync,
+                          seed=args.seed, record_path=args.record,
+                          profile=args.profile or bool(args.profile_out), profile_path=args.profile_out,
+                          startup_budget=args.startup_budget, started_at=STARTED_AT,
+                          das_ms=args.das, arr_ms=args.arr)
+        if args.replay:
+            game.play_replay(Replay.load(args.replay), args.speed)
+        elif args.connect:
+            host, _, port = args.connect.rpartition(':')
+            game.play_online(host or '127.0.0.1', int(port), args.name)
+        elif args.spectate:
+            host, _, port = args.spectate.rpartition(':')
+            game.spectate(host or '127.0.0.1', int(port), args.match, args.player)
+        else:
+            # Start the main menu of the game
+            game.main_menu()
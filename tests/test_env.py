@@ -0,0 +1,55 @@
+# tests\test_env.py
+import unittest
+
+from tetris.env import TetrisEnv, placement_action
+
+
+def fallback_state(seed, moves):
+    """
+    Play placements, then drop the current piece where it is, as step does for a masked-out action.
+
+    Returns:
+        bytes: The packed state afterwards.
+    """
+    env = TetrisEnv('placement', seed=seed)
+    env.reset()
+    for action in moves:
+        env.step(action)
+    state = env.state
+    state.current_piece.y += state.grid.drop_distance(state.current_piece)
+    state.change_piece = True
+    state.lock_current_piece()
+    return state.pack()
+
+
+class PlacementActionMaskTest(unittest.TestCase):
+    def test_action_through_the_wall_is_not_placed(self):
+        env = TetrisEnv('placement', seed=5)
+        observation, _ = env.reset()
+        action = placement_action(0, 9)
+        self.assertFalse(observation['action_mask'][action])
+        env.step(action)
+        self.assertTrue(all(0 <= x < env.state.grid.columns for x, _ in env.state.locked_positions))
+        self.assertEqual(env.state.pack(), fallback_state(5, []))
+
+    def test_masked_out_actions_drop_the_piece_where_it_is(self):
+        for seed, moves in ((5, []), (7, [placement_action(1, 0), placement_action(0, 4, hold=True)])):
+            expected = fallback_state(seed, moves)
+            env = TetrisEnv('placement', seed=seed)
+            env.reset()
+            for action in moves:
+                env.step(action)
+            mask = env.observation['action_mask'].copy()
+            masked_out = [action for action in range(env.action_count) if not mask[action]]
+            self.assertTrue(masked_out)
+            for action in masked_out + [-1, env.action_count]:
+                env = TetrisEnv('placement', seed=seed)
+                env.reset()
+                for move in moves:
+                    env.step(move)
+                env.step(action)
+                self.assertEqual(env.state.pack(), expected, f'seed {seed}, action {action}')
+
+
+if __name__ == '__main__':
+    unittest.main()
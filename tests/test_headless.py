@@ -0,0 +1,22 @@
+# tests\test_headless.py
+import subprocess
+import sys
+import unittest
+
+# modules that simulate, search, store or serve games, which must run without a display
+HEADLESS_MODULES = ('ai', 'archive', 'batch', 'bitboard', 'client', 'engine', 'env', 'input', 'perft',
+                    'profiler', 'protocol', 'replay', 'server', 'shapes', 'spectate', 'timing', 'tuner')
+
+
+class HeadlessImportTest(unittest.TestCase):
+    def test_headless_modules_do_not_import_pygame(self):
+        # a fresh interpreter, so modules imported by other tests do not count
+        code = ('import sys\n'
+                + ''.join(f'import tetris.{name}\n' for name in HEADLESS_MODULES)
+                + 'print("pygame" in sys.modules)')
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), 'False')
+
+
+if __name__ == '__main__':
+    unittest.main()
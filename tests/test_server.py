@@ -0,0 +1,86 @@
+# tests\test_server.py
+import asyncio
+import unittest
+
+from tetris.server import MatchServer
+
+
+class HandleClientTest(unittest.TestCase):
+    """
+    Misbehaving clients must be ignored or disconnected without killing their handler task.
+    """
+    def run_server(self, scenario):
+        """
+        Run a scenario against a server on a free port.
+
+        Args:
+            scenario (function): Coroutine function called with the server and a connect coroutine function.
+
+        Returns:
+            list: The contexts of the exceptions the event loop reported.
+        """
+        errors = []
+
+        async def main():
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+            server = MatchServer(port=0, seed=1)
+            await server.start()
+            writers = []
+
+            async def connect():
+                reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+                writers.append(writer)
+                return reader, writer
+
+            try:
+                await scenario(server, connect)
+            finally:
+                for writer in writers:
+                    writer.close()
+                # let the handlers see the disconnections and finish
+                await asyncio.sleep(0.1)
+                server.server.close()
+                server._tick_task.cancel()
+
+        asyncio.run(main())
+        return errors
+
+    def test_repeated_join(self):
+        async def scenario(server, connect):
+            reader, writer = await connect()
+            for _ in range(3):
+                writer.write(b'{"type": "join", "name": "a"}\n')
+            await asyncio.sleep(0.1)
+            self.assertIs(server.waiting.writer.is_closing(), False)
+
+        self.assertEqual(self.run_server(scenario), [])
+
+    def test_oversized_line(self):
+        async def scenario(server, connect):
+            reader, writer = await connect()
+            writer.write(b'{"type": "join", "name": "' + b'a' * 100000 + b'"}\n')
+            self.assertEqual(await asyncio.wait_for(reader.read(), 5), b'')
+
+        self.assertEqual(self.run_server(scenario), [])
+
+    def test_join_while_spectating(self):
+        async def scenario(server, connect):
+            for name in (b'a', b'b'):
+                _, writer = await connect()
+                writer.write(b'{"type": "join", "name": "' + name + b'"}\n')
+            await asyncio.sleep(0.1)
+            reader, writer = await connect()
+            writer.write(b'{"type": "spectate"}\n')
+            await asyncio.sleep(0.1)
+            writer.write(b'{"type": "join", "name": "c"}\n')
+            await asyncio.sleep(0.1)
+            # the join is ignored: still a spectator, not a player waiting for a match
+            self.assertIsNone(server.waiting)
+            self.assertFalse(writer.is_closing())
+            self.assertTrue(await asyncio.wait_for(reader.read(1), 5))
+
+        self.assertEqual(self.run_server(scenario), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,320 @@
+# tetris\ai.py
+"""
+Placement search for an automatic player.
+"""
+from collections import OrderedDict, deque, namedtuple
+
+from .bitboard import WALL_PADDING
+from .gameplay import Skyline
+from .shapes import TEMPLATE_OFFSET_X, Piece
+
+# A final resting position of a piece, reachable from where it spawned
+Placement = namedtuple('Placement', ['rotation', 'x', 'y'])
+# The decision of the auto-player: where to put which piece
+Move = namedtuple('Move', ['placement', 'use_hold', 'score'])
+# Board features after a placement is locked and full rows are cleared
+BoardFeatures = namedtuple('BoardFeatures', ['aggregate_height', 'holes', 'bumpiness', 'lines_cleared', 'topped_out'])
+
+DEFAULT_WEIGHTS = {
+    'aggregate_height': -0.510066,
+    'holes': -0.35663,
+    'bumpiness': -0.184483,
+    'lines_cleared': 0.760666,
+}
+
+
+def lock_rows(rows, row_masks, x, y, full_row):
+    """
+    Lock a piece into a copy of bitboard rows and clear the full ones.
+
+    Args:
+        rows (list): The bitboard rows (walls included).
+        row_masks (tuple): The (row offset, mask) pairs of the piece rotation.
+        x (int): The x-coordinate (column) of the piece.
+        y (int): The y-coordinate (row) of the piece.
+        full_row (int): Bitmask of all playfield columns.
+
+    Returns:
+        tuple: (new rows, number of cleared rows, whether a block locked above the board)
+    """
+    rows = list(rows)
+    shift = x + WALL_PADDING - TEMPLATE_OFFSET_X
+    above = False
+    for offset, mask in row_masks:
+        row = y + offset
+        if row < 0:
+            above = True
+        else:
+            rows[row] |= mask << shift
+    kept = [row for row in rows if row & full_row != full_row]
+    cleared = len(rows) - len(kept)
+    if cleared:
+        empty_row = rows[0] & ~full_row
+        kept = [empty_row] * cleared + kept
+    return kept, cleared, above
+
+
+def board_features(rows, columns, full_row, lines_cleared=0, topped_out=False):
+    """
+    Measure the features the heuristics score a board by.
+
+    Args:
+        rows (list): The bitboard rows (walls included).
+        columns (int): Number of columns on the board.
+        full_row (int): Bitmask of all playfield columns.
+        lines_cleared (int, optional): Rows cleared by the placement. Defaults to 0.
+        topped_out (bool, optional): Whether the placement locked a block above the board.
+
+    Returns:
+        BoardFeatures: The features of the board.
+    """
+    row_count = len(rows)
+    heights = [0] * columns
+    seen = 0
+    holes = 0
+    for i, row in enumerate(rows):
+        row &= full_row
+        new = row & ~seen
+        if new:
+            for column in range(columns):
+                if new >> (column + WALL_PADDING) & 1:
+                    heights[column] = row_count - i
+            seen |= new
+        holes += bin(seen & ~row).count('1')
+    bumpiness = sum(abs(heights[i] - heights[i + 1]) for i in range(columns - 1))
+    return BoardFeatures(sum(heights), holes, bumpiness, lines_cleared, topped_out)
+
+
+class WeightedHeuristic:
+    """
+    Linear heuristic scoring a board from weighted BoardFeatures.
+    """
+    def __init__(self, weights=None):
+        """
+        Initialize the heuristic.
+
+        Args:
+            weights (dict, optional): Weight per BoardFeatures field. Defaults to DEFAULT_WEIGHTS.
+        """
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+
+    def __call__(self, features):
+        """
+        Score a board. Higher is better; topping out is never preferred.
+
+        Args:
+            features (BoardFeatures): The features of the board.
+
+        Returns:
+            float: The score of the board.
+        """
+        if features.topped_out:
+            return float('-inf')
+        return sum(weight * getattr(features, name) for name, weight in self.weights.items())
+
+
+class AutoPlayer:
+    """
+    Automatic player searching every reachable placement of the current and hold pieces.
+    """
+    def __init__(self, heuristic=None, use_hold=True, cache_size=50000):
+        """
+        Initialize the auto-player.
+
+        Args:
+            heuristic (function, optional): Scores BoardFeatures, higher is better. Defaults to WeightedHeuristic().
+            use_hold (bool, optional): Whether the hold piece is considered. Defaults to True.
+            cache_size (int, optional): Maximum number of entries per transposition cache.
+        """
+        self.heuristic = WeightedHeuristic() if heuristic is None else heuristic
+        self.use_hold = use_hold
+        self.cache_size = cache_size
+        self._placement_cache = OrderedDict()
+        self._move_cache = OrderedDict()
+
+    def _cached(self, cache, key):
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+    def _store(self, cache, key, value):
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def placements(self, board, piece):
+        """
+        Enumerate every final position the piece can reach from where it is by
+        moving left, right, rotating and soft dropping, including tucks under overhangs.
+
+        Args:
+            board (Bitboard): The board the piece moves on.
+            piece (Piece): The piece to place.
+
+        Returns:
+            tuple: The reachable Placement values.
+        """
+        tables = piece.rotation_tables
+        rotation_count = len(tables)
+        start = (piece.rotation % rotation_count, piece.x, piece.y)
+        key = (tuple(board.rows), id(piece.shape)) + start
+        placements = self._cached(self._placement_cache, key)
+        if placements is not None:
+            return placements
+
+        # keep the search inside the side walls: cells above the board are never checked
+        bounds = [(-table.bounding_box[0], board.column_count - 1 - table.bounding_box[2]) for table in tables]
+        fits = board.fits
+        seen = {start}
+        queue = deque([start])
+        found = []
+        while queue:
+            rotation, x, y = queue.popleft()
+            row_masks = tables[rotation].row_masks
+            if not fits(row_masks, x, y + 1):
+                found.append(Placement(rotation, x, y))
+            for state in ((rotation, x - 1, y), (rotation, x + 1, y),
+                          ((rotation + 1) % rotation_count, x, y), (rotation, x, y + 1)):
+                if state in seen:
+                    continue
+                rotation_next, x_next, y_next = state
+                low, high = bounds[rotation_next]
+                if low <= x_next <= high and fits(tables[rotation_next].row_masks, x_next, y_next):
+                    seen.add(state)
+                    queue.append(state)
+
+        placements = tuple(found)
+        self._store(self._placement_cache, key, placements)
+        return placements
+
+    def evaluate(self, board, piece, placement, skyline=None):
+        """
+        Score the board resulting from locking the piece at a placement.
+
+        When the placement clears no rows, the features are derived from the
+        board's skyline plus the piece's cells instead of scanning the board.
+
+        Args:
+            board (Bitboard): The board before the placement.
+            piece (Piece): The piece being placed.
+            placement (Placement): Where the piece locks.
+            skyline (Skyline, optional): The skyline of the board. Built from the board when omitted.
+
+        Returns:
+            float: The heuristic score of the resulting board.
+        """
+        table = piece.rotation_tables[placement.rotation]
+        x, y = placement.x, placement.y
+        rows = board.rows
+        full_row = board.full_row
+        shift = x + WALL_PADDING - TEMPLATE_OFFSET_X
+        above = False
+        for offset, mask in table.row_masks:
+            row = y + offset
+            if row < 0:
+                above = True
+            elif (rows[row] | mask << shift) & full_row == full_row:
+                rows, cleared, above = lock_rows(rows, table.row_masks, x, y, full_row)
+                return self.heuristic(board_features(rows, board.column_count, full_row, cleared, above))
+
+        after = (skyline or Skyline.from_bitboard(board)).copy()
+        for dx, dy in table.cells:
+            if y + dy > -1:
+                after.add_cell(x + dx, y + dy)
+        return self.heuristic(BoardFeatures(after.aggregate_height(), after.holes(), after.bumpiness(), 0, above))
+
+    def best_placement(self, board, piece, skyline=None):
+        """
+        Find the best scoring placement of a piece.
+
+        Args:
+            board (Bitboard): The board the piece moves on.
+            piece (Piece): The piece to place.
+            skyline (Skyline, optional): The skyline of the board. Built from the board when omitted.
+
+        Returns:
+            tuple: (Placement, score), or (None, -inf) when the piece cannot move at all.
+        """
+        if skyline is None:
+            skyline = Skyline.from_bitboard(board)
+        best, best_score = None, float('-inf')
+        for placement in self.placements(board, piece):
+            score = self.evaluate(board, piece, placement, skyline)
+            if best is None or score > best_score:
+                best, best_score = placement, score
+        return best, best_score
+
+    def best_move(self, state):
+        """
+        Choose the move for the current piece of a game, considering the hold piece.
+
+        Args:
+            state (GameState): The game to choose a move for.
+
+        Returns:
+            Move: The chosen placement, whether to hold first and its score.
+        """
+        board = state.board
+        piece = state.current_piece
+        can_hold = self.use_hold and not state.hold_switched
+        alternative = None
+        if can_hold:
+            alternative = state.hold_piece if state.hold_piece is not None else state.next_piece
+
+        alternative_key = None
+        if alternative is not None:
+            # a held piece comes back at the spawn position, keeping its rotation
+            x, y = (5, 0) if state.hold_piece is not None else (alternative.x, alternative.y)
+            alternative = Piece(x, y, alternative.shape, alternative.color, alternative.rotation)
+            alternative_key = (id(alternative.shape), alternative.rotation % len(alternative.rotation_tables), x, y)
+
+        key = (tuple(board.rows), id(piece.shape), piece.rotation % len(piece.rotation_tables), piece.x, piece.y,
+               alternative_key)
+        move = self._cached(self._move_cache, key)
+        if move is not None:
+            return move
+
+        skyline = state.grid.skyline
+        placement, score = self.best_placement(board, piece, skyline)
+        move = Move(placement, False, score)
+        if alternative is not None:
+            placement, score = self.best_placement(board, alternative, skyline)
+            if placement is not None and (move.placement is None or score > move.score):
+                move = Move(placement, True, score)
+
+        self._store(self._move_cache, key, move)
+        return move
+
+    def play_move(self, state):
+        """
+        Choose a move and play it on the game: hold if needed, then lock the piece at the placement.
+
+        Args:
+            state (GameState): The game to play on.
+
+        Returns:
+            int: The number of rows cleared.
+        """
+        move = self.best_move(state)
+        if move.use_hold:
+            state.hold()
+        if move.placement is not None:
+            piece = state.current_piece
+            piece.rotation, piece.x, piece.y = move.placement
+        return state.lock_current_piece()
+
+    def play_game(self, state, max_pieces=None):
+        """
+        Play a game until it is lost or max_pieces pieces were placed.
+
+        Args:
+            state (GameState): The game to play on.
+            max_pieces (int, optional): Stop after this many pieces. Defaults to no limit.
+
+        Returns:
+            GameState: The game that was played.
+        """
+        while not state.lost and (max_pieces is None or state.pieces_placed < max_pieces):
+            self.play_move(state)
+        return state
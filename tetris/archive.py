@@ -0,0 +1,446 @@
+# tetris\archive.py
+"""
+Archive of many recorded games in one append-only file, read through mmap.
+
+Every game is stored with a fixed layout: a header with its seed and final
+results, its final state packed by GameState.pack, its input records at a fixed
+size each, and packed keyframes taken every keyframe_interval ticks. A separate
+index file holds the offset of every game, so a reader jumps to game N, and to
+a tick inside it, without reading or parsing any other game.
+
+Data file layout (little endian):
+    header:    b'TRAR', version (u8)
+    per game:  seed (u64), tick rate (u16), end tick (u32), score (u32), lines cleared (u32),
+               pieces placed (u32), lost (u8), record count (u32), keyframe count (u32),
+               final state (PACKED_SIZE bytes),
+               records: tick (u32), code (u8), as in tetris.replay,
+               keyframes: tick (u32), record index (u32), soft drop (u8), state (PACKED_SIZE bytes)
+Index file layout:
+    header:    b'TRAI', version (u8), 3 padding bytes
+    per game:  offset of the game in the data file (u64)
+"""
+import argparse
+import csv
+import mmap
+import os
+import struct
+
+from .engine import PACKED_SIZE, GameState, packed_cells
+from .replay import SOFT_DROP_OFF, SOFT_DROP_ON, Replay, ReplayPlayer
+
+DATA_MAGIC = b'TRAR'
+INDEX_MAGIC = b'TRAI'
+VERSION = 1
+DATA_HEADER = struct.Struct('<4sB')
+INDEX_HEADER = struct.Struct('<4sB3x')
+OFFSET = struct.Struct('<Q')
+GAME_HEADER = struct.Struct('<QHIIIIBII')
+RECORD = struct.Struct('<IB')
+KEYFRAME = struct.Struct('<IIB')
+KEYFRAME_SIZE = KEYFRAME.size + PACKED_SIZE
+
+# one byte per cell of every bit pattern of a playfield row seen so far, 1 for a locked cell
+ROW_BYTES = {}
+# translation table from cell codes to digits
+CELL_DIGITS = bytes(range(ord('0'), ord('0') + 10)) + bytes(246)
+
+
+def index_path(path):
+    """
+    Get the path of the offset index of an archive.
+
+    Args:
+        path (str): The data file of an archive.
+
+    Returns:
+        str: Its index file.
+    """
+    return path + '.idx'
+
+
+def board_bytes(board):
+    """
+    Get the occupancy of a bitboard as one byte per cell.
+
+    Args:
+        board (Bitboard): The board.
+
+    Returns:
+        bytes: 1 for a locked cell, 0 for an empty one, row by row.
+    """
+    full_row = board.full_row
+    columns = board.column_count
+    padding = full_row.bit_length() - columns
+    parts = []
+    for row in board.rows:
+        pattern = (row & full_row) >> padding
+        cells = ROW_BYTES.get(pattern)
+        if cells is None:
+            cells = ROW_BYTES[pattern] = bytes(pattern >> x & 1 for x in range(columns))
+        parts.append(cells)
+    return b''.join(parts)
+
+
+class ArchiveWriter:
+    """
+    Appends games to an archive, creating it if needed.
+    """
+    def __init__(self, path, keyframe_interval=600):
+        """
+        Open an archive for appending.
+
+        Args:
+            path (str): The data file; the index is written next to it.
+            keyframe_interval (int, optional): Ticks between the keyframes of a game. Defaults to 600.
+
+        Raises:
+            ValueError: If the files exist but are not an archive of a supported version.
+        """
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self.data = open(path, 'ab')
+        self.index = open(index_path(path), 'ab')
+        if self.data.tell() == 0:
+            self.data.write(DATA_HEADER.pack(DATA_MAGIC, VERSION))
+        if self.index.tell() == 0:
+            self.index.write(INDEX_HEADER.pack(INDEX_MAGIC, VERSION))
+        self.data.flush()
+        self.index.flush()
+        with open(path, 'rb') as data, open(index_path(path), 'rb') as index:
+            if (data.read(DATA_HEADER.size) != DATA_HEADER.pack(DATA_MAGIC, VERSION)
+                    or index.read(INDEX_HEADER.size) != INDEX_HEADER.pack(INDEX_MAGIC, VERSION)):
+                raise ValueError('{} is not a version {} replay archive'.format(path, VERSION))
+        self.count = (self.index.tell() - INDEX_HEADER.size) // OFFSET.size
+
+    def add(self, replay):
+        """
+        Play a replay headless and append it, with its keyframes and final state.
+
+        Args:
+            replay (Replay): The game.
+
+        Returns:
+            int: The number of the game in the archive.
+        """
+        player = ReplayPlayer(replay, self.keyframe_interval)
+        state = player.run()
+        keyframes = player.keyframes()
+        records = replay.records
+
+        out = bytearray(GAME_HEADER.pack(replay.seed, replay.tick_rate, replay.end_tick, state.score,
+                                         state.lines_cleared, state.pieces_placed, state.lost,
+                                         len(records), len(keyframes)))
+        out += state.pack()
+        for tick, code in records:
+            out += RECORD.pack(tick, code)
+        for tick, packed, record_index, soft_drop in keyframes:
+            out += KEYFRAME.pack(tick, record_index, soft_drop) + packed
+
+        # the game is complete in the data file before the index points to it
+        offset = self.data.tell()
+        self.data.write(out)
+        self.data.flush()
+        self.index.write(OFFSET.pack(offset))
+        self.index.flush()
+        self.count += 1
+        return self.count - 1
+
+    def close(self):
+        """
+        Close the files.
+        """
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ArchivedGame:
+    """
+    One game of an archive, read lazily from the mapped file.
+    """
+    def __init__(self, buffer, offset, number):
+        """
+        Read the header of a game.
+
+        Args:
+            buffer (mmap.mmap): The mapped data file.
+            offset (int): Where the game starts.
+            number (int): The number of the game in the archive.
+        """
+        self.buffer = buffer
+        self.number = number
+        (self.seed, self.tick_rate, self.end_tick, self.score, self.lines_cleared, self.pieces_placed,
+         lost, self.record_count, self.keyframe_count) = GAME_HEADER.unpack_from(buffer, offset)
+        self.lost = bool(lost)
+        self._final = offset + GAME_HEADER.size
+        self._records = self._final + PACKED_SIZE
+        self._keyframes = self._records + self.record_count * RECORD.size
+
+    @property
+    def tick_ms(self):
+        """
+        Get the length of a simulation tick of the game.
+
+        Returns:
+            float: Milliseconds simulated per tick.
+        """
+        return 1000 / self.tick_rate
+
+    def final_cells(self):
+        """
+        Decode the final board without building a GameState.
+
+        Returns:
+            bytes: The cell codes of the final board, row by row (see tetris.engine.CODE_COLORS).
+        """
+        return packed_cells(self.buffer[self._final:self._final + PACKED_SIZE])
+
+    def final_state(self):
+        """
+        Restore the game as it ended from its packed state.
+
+        Returns:
+            GameState: The game as it ended.
+        """
+        state = GameState(seed=self.seed)
+        state.unpack(self.buffer[self._final:self._final + PACKED_SIZE])
+        return state
+
+    def record(self, index):
+        """
+        Read one record in place.
+
+        Args:
+            index (int): The number of the record.
+
+        Returns:
+            tuple: (tick, code) of the record.
+        """
+        return RECORD.unpack_from(self.buffer, self._records + index * RECORD.size)
+
+    def records(self, start=0):
+        """
+        Iterate over the records, decoding them as they are read.
+
+        Args:
+            start (int, optional): The first record. Defaults to 0.
+
+        Returns:
+            iterator: (tick, code) pairs.
+        """
+        return RECORD.iter_unpack(self.buffer[self._records + start * RECORD.size:self._keyframes])
+
+    def replay(self):
+        """
+        Decode the game into a Replay.
+
+        Returns:
+            Replay: The whole game as a replay.
+        """
+        return Replay(self.seed, self.tick_rate, list(self.records()), self.end_tick)
+
+    def keyframe(self, tick):
+        """
+        Find the last keyframe at or before a tick, by bisecting the fixed size keyframes.
+
+        Args:
+            tick (int): The tick.
+
+        Returns:
+            tuple: (keyframe tick, record index, soft drop, packed state).
+        """
+        low, high = 0, self.keyframe_count
+        while high - low > 1:
+            middle = (low + high) // 2
+            if KEYFRAME.unpack_from(self.buffer, self._keyframes + middle * KEYFRAME_SIZE)[0] <= tick:
+                low = middle
+            else:
+                high = middle
+        offset = self._keyframes + low * KEYFRAME_SIZE
+        keyframe_tick, record_index, soft_drop = KEYFRAME.unpack_from(self.buffer, offset)
+        offset += KEYFRAME.size
+        return keyframe_tick, record_index, bool(soft_drop), self.buffer[offset:offset + PACKED_SIZE]
+
+    def state_at(self, tick):
+        """
+        Get the game at a tick: restore the nearest earlier keyframe and play on from there.
+
+        Args:
+            tick (int): The tick, clamped to the length of the game.
+
+        Returns:
+            GameState: The game after that many ticks.
+        """
+        tick = max(0, min(tick, self.end_tick))
+        keyframe_tick, record_index, soft_drop, packed = self.keyframe(tick)
+        state = GameState(seed=self.seed)
+        state.unpack(packed)
+        for _ in self._play(state, keyframe_tick, tick, record_index, soft_drop):
+            pass
+        return state
+
+    def samples(self):
+        """
+        Play the game back, yielding what the player saw before every input.
+
+        Yields:
+            tuple: (board, piece, action): the locked cells as one byte per cell, row by row,
+                1 for a locked cell; the falling piece as GameState.piece_state values; the Input.
+        """
+        state = GameState(seed=self.seed)
+        return self._play(state, 0, self.end_tick, 0, False)
+
+    def _play(self, state, tick, end_tick, record_index, soft_drop):
+        # GameState.step split up, so the state before every input can be observed
+        tick_ms = self.tick_ms
+        records = self.records(record_index)
+        pending = next(records, None)
+        board = state.board
+        while tick < end_tick and not state.lost:
+            inputs = []
+            while pending is not None and pending[0] == tick:
+                code = pending[1]
+                if code == SOFT_DROP_ON:
+                    soft_drop = True
+                elif code == SOFT_DROP_OFF:
+                    soft_drop = False
+                else:
+                    inputs.append(code)
+                pending = next(records, None)
+            state.apply_gravity(tick_ms, soft_drop)
+            for code in inputs:
+                yield board_bytes(board), GameState.piece_state(state.current_piece), code
+                state.apply_input(code)
+            if state.change_piece:
+                state.lock_current_piece()
+            tick += 1
+
+
+class ReplayArchive:
+    """
+    Read-only view of an archive. Games are numbered in the order they were added.
+    """
+    def __init__(self, path):
+        """
+        Map an archive. Games appended afterwards are not seen.
+
+        Args:
+            path (str): The data file.
+
+        Raises:
+            ValueError: If the files are not an archive of a supported version.
+        """
+        self.path = path
+        with open(path, 'rb') as data, open(index_path(path), 'rb') as index:
+            self.data = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+            self.index = mmap.mmap(index.fileno(), 0, access=mmap.ACCESS_READ)
+        if (self.data[:DATA_HEADER.size] != DATA_HEADER.pack(DATA_MAGIC, VERSION)
+                or self.index[:INDEX_HEADER.size] != INDEX_HEADER.pack(INDEX_MAGIC, VERSION)):
+            self.close()
+            raise ValueError('{} is not a version {} replay archive'.format(path, VERSION))
+        self.count = (len(self.index) - INDEX_HEADER.size) // OFFSET.size
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, number):
+        """
+        Open a game by its number, reading its offset from the index.
+
+        Args:
+            number (int): The number of the game, negative to count from the end.
+
+        Returns:
+            ArchivedGame: The game.
+
+        Raises:
+            IndexError: If there is no such game.
+        """
+        if number < 0:
+            number += self.count
+        if not 0 <= number < self.count:
+            raise IndexError('game {} out of range'.format(number))
+        offset, = OFFSET.unpack_from(self.index, INDEX_HEADER.size + number * OFFSET.size)
+        return ArchivedGame(self.data, offset, number)
+
+    def __iter__(self):
+        return (self[number] for number in range(self.count))
+
+    def samples(self, games=None):
+        """
+        Stream the (board, piece, action) samples of many games, one game at a time.
+
+        Args:
+            games (iterable, optional): The numbers of the games. Defaults to all games in order.
+
+        Yields:
+            tuple: (board, piece, action), see ArchivedGame.samples.
+        """
+        for number in (range(self.count) if games is None else games):
+            yield from self[number].samples()
+
+    def export(self, path):
+        """
+        Write the final results and board of every game to a CSV file, without replaying any game.
+
+        Args:
+            path (str): The CSV file.
+        """
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['game', 'seed', 'ticks', 'score', 'lines', 'pieces', 'lost', 'board'])
+            for game in self:
+                # the board as one digit per cell, see tetris.engine.CODE_COLORS
+                board = game.final_cells().translate(CELL_DIGITS).decode()
+                writer.writerow([game.number, game.seed, game.end_tick, game.score, game.lines_cleared,
+                                 game.pieces_placed, int(game.lost), board])
+
+    def close(self):
+        """
+        Unmap the files.
+        """
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay archives')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='append replay files to an archive')
+    add.add_argument('archive')
+    add.add_argument('replays', nargs='+')
+    export = commands.add_parser('export', help='write the final boards and scores to a CSV file')
+    export.add_argument('archive')
+    export.add_argument('csv')
+    info = commands.add_parser('info', help='summarize an archive')
+    info.add_argument('archive')
+    args = parser.parse_args(argv)
+
+    if args.command == 'add':
+        with ArchiveWriter(args.archive) as writer:
+            for path in args.replays:
+                writer.add(Replay.load(path))
+            print(f'{args.archive}: {writer.count} games')
+    elif args.command == 'export':
+        with ReplayArchive(args.archive) as archive:
+            archive.export(args.csv)
+    else:
+        with ReplayArchive(args.archive) as archive:
+            ticks = sum(game.end_tick for game in archive)
+            size = os.path.getsize(args.archive) + os.path.getsize(index_path(args.archive))
+            print(f'{args.archive}: {len(archive)} games, {ticks} ticks, {size} bytes')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# tetris\batch.py
+"""
+Batched simulation of many boards in lockstep with NumPy.
+
+Boards are stored as one (N, rows, columns) uint8 array holding 0 for an empty
+cell and the shape index + 1 for a locked block. Every operation works on all
+boards at once. Requires numpy, which the rest of the game does not need.
+"""
+import numpy as np
+
+from .constants import GRID_ROWS, GRID_COLUMNS
+from .shapes import SHAPES, SHAPE_REGISTRY
+
+# (shape, rotation, block, dx/dy) offsets; shapes with fewer than four
+# rotations repeat them, matching Piece.rotation % len(shape)
+CELL_OFFSETS = np.array([[SHAPE_REGISTRY.rotations(shape)[rotation % len(shape)].cells
+                          for rotation in range(4)] for shape in SHAPES], dtype=np.int64)
+CELL_DX = CELL_OFFSETS[..., 0]
+CELL_DY = CELL_OFFSETS[..., 1]
+
+
+class BatchBoards:
+    """
+    N independent games advanced together, one placement per step.
+    """
+    def __init__(self, count, rows=GRID_ROWS, columns=GRID_COLUMNS, seed=None):
+        """
+        Initialize count empty boards.
+
+        Args:
+            count (int): Number of boards.
+            rows (int, optional): Number of rows per board. Defaults to GRID_ROWS.
+            columns (int, optional): Number of columns per board. Defaults to GRID_COLUMNS.
+            seed (int, optional): Seed for the piece generator.
+        """
+        self.count = count
+        self.rows = rows
+        self.columns = columns
+        self.rng = np.random.default_rng(seed)
+        self.index = np.arange(count)
+        self.boards = np.zeros((count, rows, columns), dtype=np.uint8)
+        self.pieces = np.zeros(count, dtype=np.int64)
+        self.next_pieces = np.zeros(count, dtype=np.int64)
+        self.scores = np.zeros(count, dtype=np.int64)
+        self.lines_cleared = np.zeros(count, dtype=np.int64)
+        self.pieces_placed = np.zeros(count, dtype=np.int64)
+        self.lost = np.zeros(count, dtype=bool)
+        self.reset()
+
+    def reset(self, mask=None):
+        """
+        Start new games on the selected boards.
+
+        Args:
+            mask (numpy.ndarray, optional): Boolean mask of the boards to reset. Defaults to all boards.
+        """
+        if mask is None:
+            mask = np.ones(self.count, dtype=bool)
+        selected = int(mask.sum())
+        self.boards[mask] = 0
+        self.pieces[mask] = self.rng.integers(0, len(SHAPES), selected)
+        self.next_pieces[mask] = self.rng.integers(0, len(SHAPES), selected)
+        self.scores[mask] = 0
+        self.lines_cleared[mask] = 0
+        self.pieces_placed[mask] = 0
+        self.lost[mask] = False
+
+    def cells(self, pieces, rotations, xs, ys):
+        """
+        Get the grid positions of one piece per board.
+
+        Args:
+            pieces (numpy.ndarray): Shape index per board.
+            rotations (numpy.ndarray): Rotation per board.
+            xs (numpy.ndarray): x-coordinate (column) per board.
+            ys (numpy.ndarray): y-coordinate (row) per board.
+
+        Returns:
+            tuple: (columns, rows) arrays of shape (N, 4).
+        """
+        rotations = rotations % 4
+        return (xs[:, None] + CELL_DX[pieces, rotations],
+                ys[:, None] + CELL_DY[pieces, rotations])
+
+    def collides(self, pieces, rotations, xs, ys):
+        """
+        Check every board's piece against walls, floor and locked blocks.
+        Cells above the top of the board never collide, like ValidSpaceStrategy.
+
+        Args:
+            pieces (numpy.ndarray): Shape index per board.
+            rotations (numpy.ndarray): Rotation per board.
+            xs (numpy.ndarray): x-coordinate (column) per board.
+            ys (numpy.ndarray): y-coordinate (row) per board.
+
+        Returns:
+            numpy.ndarray: Boolean array, True where the piece does not fit.
+        """
+        cols, rows = self.cells(pieces, rotations, xs, ys)
+        on_board = rows >= 0
+        outside = (cols < 0) | (cols >= self.columns) | (rows >= self.rows)
+        occupied = self.boards[self.index[:, None],
+                               np.clip(rows, 0, self.rows - 1),
+                               np.clip(cols, 0, self.columns - 1)] != 0
+        return (on_board & (outside | occupied)).any(axis=1)
+
+    def drop_distance(self, pieces, rotations, xs, ys):
+        """
+        Get how far each board's piece can fall, i.e. the ghost piece offset.
+
+        Args:
+            pieces (numpy.ndarray): Shape index per board.
+            rotations (numpy.ndarray): Rotation per board.
+            xs (numpy.ndarray): x-coordinate (column) per board.
+            ys (numpy.ndarray): y-coordinate (row) per board.
+
+        Returns:
+            numpy.ndarray: Number of rows each piece can move down.
+        """
+        distance = np.zeros(self.count, dtype=np.int64)
+        falling = ~self.collides(pieces, rotations, xs, ys + 1)
+        while falling.any():
+            distance += falling
+            falling &= ~self.collides(pieces, rotations, xs, ys + distance + 1)
+        return distance
+
+    def column_tops(self):
+        """
+        Get the highest occupied row of every column.
+
+        Returns:
+            numpy.ndarray: (N, columns) array, `rows` for empty columns.
+        """
+        occupied = self.boards != 0
+        return np.where(occupied.any(axis=1), occupied.argmax(axis=1), self.rows)
+
+    def lock(self, pieces, rotations, xs, ys, mask):
+        """
+        Write the selected boards' pieces into their boards.
+        A block locked above the top of a board ends that game.
+
+        Args:
+            pieces (numpy.ndarray): Shape index per board.
+            rotations (numpy.ndarray): Rotation per board.
+            xs (numpy.ndarray): x-coordinate (column) per board.
+            ys (numpy.ndarray): y-coordinate (row) per board.
+            mask (numpy.ndarray): Boolean mask of the boards to lock.
+        """
+        cols, rows = self.cells(pieces, rotations, xs, ys)
+        write = mask[:, None] & (rows >= 0)
+        board_index = np.broadcast_to(self.index[:, None], rows.shape)
+        colors = np.broadcast_to((pieces + 1)[:, None], rows.shape).astype(np.uint8)
+        self.boards[board_index[write], rows[write], cols[write]] = colors[write]
+        self.lost |= mask & (rows < 0).any(axis=1)
+
+    def clear_lines(self):
+        """
+        Remove full rows on every board and drop the rows above them.
+
+        Returns:
+            numpy.ndarray: Number of rows cleared per board.
+        """
+        full = (self.boards != 0).all(axis=2)
+        cleared = full.sum(axis=1)
+        changed = cleared > 0
+        if changed.any():
+            boards = self.boards[changed]
+            # stable sort puts the full rows on top and keeps the others in order
+            order = np.argsort(~full[changed], axis=1, kind='stable')
+            boards = np.take_along_axis(boards, order[:, :, None], axis=1)
+            boards[np.arange(self.rows)[None, :] < cleared[changed][:, None]] = 0
+            self.boards[changed] = boards
+        return cleared
+
+    def clamp_columns(self, pieces, rotations, xs):
+        """
+        Clamp each board's x-coordinate so its piece lies within the side walls.
+
+        Args:
+            pieces (numpy.ndarray): Shape index per board.
+            rotations (numpy.ndarray): Rotation per board.
+            xs (numpy.ndarray): Requested x-coordinate per board.
+
+        Returns:
+            numpy.ndarray: The clamped x-coordinates.
+        """
+        dx = CELL_DX[pieces, rotations % 4]
+        return np.clip(xs, -dx.min(axis=1), self.columns - 1 - dx.max(axis=1))
+
+    def step(self, rotations, xs):
+        """
+        Hard drop every running board's current piece with the given rotation and
+        column, lock it, clear lines and spawn the next piece. Columns outside the
+        walls are clamped; boards that lost are left untouched.
+
+        Args:
+            rotations (numpy.ndarray): Rotation per board.
+            xs (numpy.ndarray): x-coordinate (column) per board.
+
+        Returns:
+            numpy.ndarray: Number of rows cleared per board.
+        """
+        active = ~self.lost
+        pieces = self.pieces
+        rotations = np.asarray(rotations) % 4
+        xs = self.clamp_columns(pieces, rotations, np.asarray(xs))
+
+        # dropping in from above, the piece stops on the highest block of each column
+        cols = xs[:, None] + CELL_DX[pieces, rotations]
+        tops = np.take_along_axis(self.column_tops(), cols, axis=1)
+        ys = (tops - CELL_DY[pieces, rotations] - 1).min(axis=1)
+
+        self.lock(pieces, rotations, xs, ys, active)
+        cleared = np.where(active, self.clear_lines(), 0)
+        self.lost |= active & (self.boards[:, 0] != 0).any(axis=1)
+
+        self.scores += 10 * cleared
+        self.lines_cleared += cleared
+        self.pieces_placed += active
+        self.pieces = np.where(active, self.next_pieces, self.pieces)
+        self.next_pieces = np.where(active, self.rng.integers(0, len(SHAPES), self.count), self.next_pieces)
+        return cleared
@@ -0,0 +1,131 @@
+# tetris\bitboard.py
+from .constants import GRID_ROWS, GRID_COLUMNS
+from .shapes import TEMPLATE_OFFSET_X
+
+# Every board row is stored as an integer bitmask. Column c of the playfield
+# lives in bit (c + WALL_PADDING); the bits around the playfield are always set
+# so that a piece poking through a side wall collides like any locked block.
+WALL_PADDING = 4
+
+
+class Bitboard:
+    """
+    Board occupancy stored as one integer bitmask per row.
+    """
+    def __init__(self, rows=GRID_ROWS, columns=GRID_COLUMNS):
+        """
+        Initialize an empty bitboard.
+
+        Args:
+            rows (int, optional): Number of rows on the board. Defaults to GRID_ROWS.
+            columns (int, optional): Number of columns on the board. Defaults to GRID_COLUMNS.
+        """
+        self.row_count = rows
+        self.column_count = columns
+        self.full_row = ((1 << columns) - 1) << WALL_PADDING
+        self.empty_row = ((1 << (columns + 2 * WALL_PADDING)) - 1) & ~self.full_row
+        self.rows = [self.empty_row] * rows
+
+    @classmethod
+    def from_grid(cls, grid, empty=(0, 0, 0)):
+        """
+        Build a bitboard from a 2D color grid.
+
+        Args:
+            grid (list): A 2D list representing the grid.
+            empty (tuple, optional): The color of an empty cell. Defaults to (0, 0, 0).
+
+        Returns:
+            Bitboard: The bitboard with every non-empty cell set.
+        """
+        board = cls(len(grid), len(grid[0]))
+        rows = board.rows
+        for i, row in enumerate(grid):
+            mask = board.empty_row
+            for j, color in enumerate(row):
+                if color != empty:
+                    mask |= 1 << (j + WALL_PADDING)
+            rows[i] = mask
+        return board
+
+    @classmethod
+    def from_locked(cls, locked_positions, rows=GRID_ROWS, columns=GRID_COLUMNS):
+        """
+        Build a bitboard from a dictionary of locked positions.
+
+        Args:
+            locked_positions (dict): A dictionary containing locked_positions in the grid.
+            rows (int, optional): Number of rows on the board. Defaults to GRID_ROWS.
+            columns (int, optional): Number of columns on the board. Defaults to GRID_COLUMNS.
+
+        Returns:
+            Bitboard: The bitboard with every locked position set.
+        """
+        board = cls(rows, columns)
+        for x, y in locked_positions:
+            board.set_cell(x, y)
+        return board
+
+    def set_cell(self, x, y):
+        """
+        Mark a cell as occupied. Cells outside the board are ignored.
+
+        Args:
+            x (int): The column of the cell.
+            y (int): The row of the cell.
+        """
+        if 0 <= y < self.row_count and 0 <= x < self.column_count:
+            self.rows[y] |= 1 << (x + WALL_PADDING)
+
+    def clear_cell(self, x, y):
+        """
+        Mark a cell as empty. Cells outside the board are ignored.
+
+        Args:
+            x (int): The column of the cell.
+            y (int): The row of the cell.
+        """
+        if 0 <= y < self.row_count and 0 <= x < self.column_count:
+            self.rows[y] &= ~(1 << (x + WALL_PADDING))
+
+    def is_occupied(self, x, y):
+        """
+        Check whether a cell on the board is occupied.
+
+        Args:
+            x (int): The column of the cell.
+            y (int): The row of the cell.
+
+        Returns:
+            bool: True if the cell holds a block, False otherwise.
+        """
+        return bool(self.rows[y] >> (x + WALL_PADDING) & 1)
+
+    def fits(self, row_masks, x, y):
+        """
+        Check whether a piece fits on the board.
+
+        Cells above the top of the board are always accepted, matching the
+        behaviour of ValidSpaceStrategy.
+
+        Args:
+            row_masks (tuple): The (row offset, mask) pairs of the piece rotation,
+                see RotationTable.row_masks.
+            x (int): The x-coordinate (column) of the piece.
+            y (int): The y-coordinate (row) of the piece.
+
+        Returns:
+            bool: True if no block of the piece overlaps a wall, the floor or a locked cell.
+        """
+        shift = x + WALL_PADDING - TEMPLATE_OFFSET_X
+        if shift < 0:
+            return False
+        rows = self.rows
+        row_count = self.row_count
+        for offset, mask in row_masks:
+            row = y + offset
+            if row < 0:
+                continue
+            if row >= row_count or rows[row] & (mask << shift):
+                return False
+        return True
@@ -0,0 +1,120 @@
+# tetris\client.py
+"""
+Non-blocking connection to a match server for a game loop that must not wait on
+the network.
+"""
+import socket
+
+from .protocol import decode_message, encode_message
+from .spectate import LENGTH
+
+
+class MatchClient:
+    """
+    A TCP connection to a MatchServer, polled once per frame.
+    """
+    def __init__(self, host='127.0.0.1', port=7777):
+        """
+        Connect to a server.
+
+        Args:
+            host (str, optional): The server address. Defaults to '127.0.0.1'.
+            port (int, optional): The server port. Defaults to 7777.
+        """
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setblocking(False)
+        self.closed = False
+        self._incoming = b''
+        self._outgoing = b''
+
+    def send(self, message):
+        """
+        Send a message, buffering what the socket does not take right away.
+
+        Args:
+            message (dict): The message.
+        """
+        self._outgoing += encode_message(message)
+        self._flush()
+
+    def _flush(self):
+        try:
+            while self._outgoing:
+                sent = self.sock.send(self._outgoing)
+                self._outgoing = self._outgoing[sent:]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self.closed = True
+
+    def _receive(self):
+        self._flush()
+        while not self.closed:
+            try:
+                data = self.sock.recv(65536)
+            except BlockingIOError:
+                break
+            except OSError:
+                data = b''
+            if not data:
+                self.closed = True
+                break
+            self._incoming += data
+
+    def poll(self):
+        """
+        Get the messages that arrived since the previous call, without blocking.
+
+        Returns:
+            list: The messages in the order they arrived.
+        """
+        self._receive()
+        *lines, self._incoming = self._incoming.split(b'\n')
+        return [decode_message(line) for line in lines if line]
+
+    def close(self):
+        """
+        Close the connection.
+        """
+        self.closed = True
+        self.sock.close()
+
+
+class SpectatorClient(MatchClient):
+    """
+    A connection receiving the spectator stream of one board of a match.
+    """
+    def __init__(self, host='127.0.0.1', port=7777, match=None, player=0):
+        """
+        Connect to a server and ask for a board's stream.
+
+        Args:
+            host (str, optional): The server address. Defaults to '127.0.0.1'.
+            port (int, optional): The server port. Defaults to 7777.
+            match (int, optional): The id of the match. Defaults to any running match.
+            player (int, optional): Which player of the match to watch, 0 or 1. Defaults to 0.
+        """
+        super().__init__(host, port)
+        self.send({'type': 'spectate', 'match': match, 'player': player})
+
+    def poll(self):
+        """
+        Get the frames that arrived since the previous call, without blocking.
+
+        Returns:
+            list: The frames (see tetris.spectate) in the order they arrived.
+        """
+        self._receive()
+        frames = []
+        data = self._incoming
+        offset = 0
+        while len(data) - offset >= LENGTH.size:
+            length, = LENGTH.unpack_from(data, offset)
+            if len(data) - offset - LENGTH.size < length:
+                break
+            offset += LENGTH.size
+            frames.append(data[offset:offset + length])
+            offset += length
+        self._incoming = data[offset:]
+        return frames
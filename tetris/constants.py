@@ -6,6 +6,8 @@ S_HEIGHT = 750  # Screen height
 PLAY_WIDTH = 300  # Play area width
 PLAY_HEIGHT = 600  # Play area height
 BLOCK_SIZE = 30  # Size of each tetromino block
+GRID_ROWS = 20  # Number of rows in the play area
+GRID_COLUMNS = 10  # Number of columns in the play area
 
 # Coordinates for the top-left corner of the play area
 TOP_LEFT_X = (S_WIDTH - PLAY_WIDTH) // 2
@@ -17,8 +19,10 @@ WHITE = (255, 255, 255)  # White color
 GRID_COLOR = (112, 112, 112)  # Grid line color
 BORDER_COLOR = (255, 0, 0)  # Border color of the play area
 GHOST_PIECE_COLOR = (224, 224, 244)  # Ghost piece color
+GARBAGE_COLOR = (128, 128, 128)  # Color of garbage rows sent by an opponent
 
 # Positions for the "next shape", "hold shape", and "score" displays
 NEXT_SHAPE_POSITION = (TOP_LEFT_X + PLAY_WIDTH + 40, TOP_LEFT_Y + PLAY_HEIGHT // 2 - 100)  # Next shape display position
 HOLD_SHAPE_POSITION = (TOP_LEFT_X - PLAY_WIDTH // 2 - 40, TOP_LEFT_Y + PLAY_HEIGHT // 2 - 100)  # Hold shape display position
 SCORE_POSITION = (TOP_LEFT_X + PLAY_WIDTH + 60, TOP_LEFT_Y + PLAY_HEIGHT // 2 - 300)  # Score display position
+PROFILE_POSITION = (10, HOLD_SHAPE_POSITION[1] + 5 * BLOCK_SIZE + 20)  # Frame timing overlay position
@@ -1,8 +1,66 @@
 # tetris\display.py
 import pygame
 import os
+from collections import OrderedDict
 
 from .constants import *
+from .fonts import FontPathCache
+from .shapes import SHAPE_COLORS
+
+class TextCache:
+    """
+    Cache of fonts keyed by (name, size) and a bounded LRU of rendered labels,
+    so labels are only rendered again when their text, size or color changes.
+    Font files are resolved through a FontPathCache, which persists between runs.
+    """
+    max_labels = 256
+    font_paths = None
+    _fonts = {}
+    _labels = OrderedDict()
+
+    @classmethod
+    def font(cls, font_name, size):
+        """
+        Get a system font, opening it only the first time it is requested.
+
+        Args:
+            font_name (str): The font name.
+            size (int): The font size.
+
+        Returns:
+            pygame.font.Font: The font.
+        """
+        font = cls._fonts.get((font_name, size))
+        if font is None:
+            if cls.font_paths is None:
+                cls.font_paths = FontPathCache()
+            font = cls._fonts[(font_name, size)] = cls.font_paths.font(font_name, size)
+        return font
+
+    @classmethod
+    def render(cls, text, size, color, font_name):
+        """
+        Get the rendered surface of a label, rendering it only on a cache miss.
+
+        Args:
+            text (str): The text to be displayed.
+            size (int): The font size of the text.
+            color (tuple): The color of the text (R, G, B).
+            font_name (str): The font name.
+
+        Returns:
+            pygame.Surface: The rendered label. Shared between callers, must not be drawn on.
+        """
+        key = (text, size, color, font_name)
+        label = cls._labels.get(key)
+        if label is None:
+            label = cls._labels[key] = cls.font(font_name, size).render(text, 1, color)
+            if len(cls._labels) > cls.max_labels:
+                cls._labels.popitem(last=False)
+        else:
+            cls._labels.move_to_end(key)
+        return label
+
 
 class Text:
     """
@@ -18,8 +76,8 @@ class Text:
             color (tuple): The color of the text (R, G, B).
             font_name (str, optional): The font name. Defaults to 'forte'.
         """
-        self.font = pygame.font.SysFont(font_name, size)
-        self.label = self.font.render(text, 1, color)
+        self.font = TextCache.font(font_name, size)
+        self.label = TextCache.render(text, size, color, font_name)
 
     def draw(self, surface, position):
         """
@@ -31,6 +89,86 @@ class Text:
         """
         surface.blit(self.label, position)
 
+class RenderAssets:
+    """
+    Pre-rendered surfaces for drawing a frame with blits: the static background
+    (title, empty grid and border) and one block sprite per color plus the ghost outline.
+    """
+    GHOST_COLORKEY = (255, 0, 255)
+
+    def __init__(self):
+        """
+        Initialize the assets and pre-render the block of every shape color.
+        """
+        self._background = None
+        self._blocks = {}
+        self._ghost = None
+        for color in SHAPE_COLORS:
+            self.block(color)
+
+    @staticmethod
+    def _convert(surface, colorkey=None):
+        # match the display's pixel format once a window exists, blits are much faster that way
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        if colorkey is not None:
+            surface.set_colorkey(colorkey)
+        return surface
+
+    def background(self, size):
+        """
+        Get the static background, baking it again only when the size changes.
+
+        Args:
+            size (tuple): The (width, height) of the target surface.
+
+        Returns:
+            pygame.Surface: The background with the title, the empty grid and the border.
+        """
+        if self._background is None or self._background.get_size() != size:
+            background = pygame.Surface(size)
+            painter = TetrisDisplay(background)
+            background.fill(BG_COLOR)
+            painter.draw_title()
+            painter.draw_grid(GRID_ROWS, GRID_COLUMNS, [[BG_COLOR] * GRID_COLUMNS for _ in range(GRID_ROWS)])
+            pygame.draw.rect(background, BORDER_COLOR, (TOP_LEFT_X, TOP_LEFT_Y, PLAY_WIDTH, PLAY_HEIGHT), 5)
+            self._background = self._convert(background)
+        return self._background
+
+    def block(self, color):
+        """
+        Get the sprite of a locked block: the color with the grid lines on its top and left edges.
+
+        Args:
+            color (tuple): The color of the block (R, G, B).
+
+        Returns:
+            pygame.Surface: The block sprite.
+        """
+        block = self._blocks.get(color)
+        if block is None:
+            block = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE))
+            block.fill(color)
+            pygame.draw.line(block, GRID_COLOR, (0, 0), (BLOCK_SIZE - 1, 0))
+            pygame.draw.line(block, GRID_COLOR, (0, 0), (0, BLOCK_SIZE - 1))
+            block = self._blocks[color] = self._convert(block)
+        return block
+
+    def ghost(self):
+        """
+        Get the sprite of the ghost piece outline, transparent everywhere else.
+
+        Returns:
+            pygame.Surface: The ghost sprite.
+        """
+        if self._ghost is None:
+            ghost = pygame.Surface((BLOCK_SIZE, BLOCK_SIZE))
+            ghost.fill(self.GHOST_COLORKEY)
+            pygame.draw.rect(ghost, GHOST_PIECE_COLOR, (1, 1, BLOCK_SIZE - 2, BLOCK_SIZE - 2), 1)
+            self._ghost = self._convert(ghost, self.GHOST_COLORKEY)
+        return self._ghost
+
+
 class TetrisDisplay:
     """
     Class for handling the display of the Tetris game.
@@ -43,6 +181,7 @@ class TetrisDisplay:
             surface (pygame.Surface): The surface to display the Tetris game on.
         """
         self.surface = surface
+        self.assets = RenderAssets()
 
     def draw_text_middle(self, text, size, color):
         """
@@ -78,6 +217,13 @@ class TetrisDisplay:
                 if grid[i][j] == (0, 0, 0):  # Draw shape lines only for empty cells
                     pygame.draw.rect(self.surface, GRID_COLOR, (sx + j * BLOCK_SIZE, sy + i * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE), 1)
 
+    def draw_title(self):
+        """
+        Draw the 'TETRIS' title above the play area.
+        """
+        title = Text('TETRIS', 50, WHITE)
+        title.draw(self.surface, (TOP_LEFT_X + PLAY_WIDTH / 2 - (title.label.get_width() / 2), BLOCK_SIZE))
+
     def draw_window(self, ghost_piece, grid, convert_shape_format_func):
         """
         Draw the main game window including the grid, shapes, and ghost piece.
@@ -87,33 +233,28 @@ class TetrisDisplay:
             grid (list): A 2D list representing the grid.
             convert_shape_format_func (function): The function to convert the shape format for display.
         """
-        self.surface.fill(BG_COLOR)
-
-        title = Text('TETRIS', 50, WHITE)
-        title.draw(self.surface, (TOP_LEFT_X + PLAY_WIDTH / 2 - (title.label.get_width() / 2), BLOCK_SIZE))
-
+        self.surface.blit(self.assets.background(self.surface.get_size()), (0, 0))
         self.draw_pieces(grid, ghost_piece, convert_shape_format_func)
-        self.draw_grid(20, 10, grid)
         pygame.draw.rect(self.surface, BORDER_COLOR, (TOP_LEFT_X, TOP_LEFT_Y, PLAY_WIDTH, PLAY_HEIGHT), 5)
 
     def draw_pieces(self, grid, ghost_piece, convert_shape_format_func):
         """
-        Draw the pieces on the game screen, including the ghost piece.
+        Draw the locked and falling blocks and the ghost piece over the background in two blit batches.
 
         Args:
             grid (list): The 2D grid representing the game state.
             ghost_piece (Shape): The ghost piece to be displayed.
             convert_shape_format_func (function): The function to convert the shape format for display.
         """
-        for i in range(len(grid)):
-            for j in range(len(grid[i])):
-                pygame.draw.rect(self.surface, grid[i][j], (TOP_LEFT_X + j * BLOCK_SIZE, TOP_LEFT_Y + i * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE), 0)
+        block = self.assets.block
+        self.surface.blits([(block(color), (TOP_LEFT_X + j * BLOCK_SIZE, TOP_LEFT_Y + i * BLOCK_SIZE))
+                            for i, row in enumerate(grid) for j, color in enumerate(row) if color != BG_COLOR],
+                           doreturn=False)
 
-        ghost_piece_positions = convert_shape_format_func(ghost_piece)
-        for i in range(len(ghost_piece_positions)):
-            x, y = ghost_piece_positions[i]
-            if y > -1:
-                pygame.draw.rect(self.surface, GHOST_PIECE_COLOR, (TOP_LEFT_X + x * BLOCK_SIZE + 1, TOP_LEFT_Y + y * BLOCK_SIZE + 1, BLOCK_SIZE - 2, BLOCK_SIZE - 2), 1)
+        ghost = self.assets.ghost()
+        self.surface.blits([(ghost, (TOP_LEFT_X + x * BLOCK_SIZE, TOP_LEFT_Y + y * BLOCK_SIZE))
+                            for x, y in convert_shape_format_func(ghost_piece) if y > -1],
+                           doreturn=False)
 
     def draw_next_shape(self, shape):
         """
@@ -147,13 +288,8 @@ class TetrisDisplay:
             position (tuple): The position (x, y) to draw the shape.
         """
         sx, sy = position
-        format = shape.shape[shape.rotation % len(shape.shape)]
-
-        for i, line in enumerate(format):
-            row = list(line)
-            for j, column in enumerate(row):
-                if column == '0':
-                    pygame.draw.rect(self.surface, shape.color, (sx + j * BLOCK_SIZE, sy + i * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE), 0)
+        for j, i in shape.rotation_table.blocks:
+            pygame.draw.rect(self.surface, shape.color, (sx + j * BLOCK_SIZE, sy + i * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE), 0)
 
     def draw_score(self, score):
         """
@@ -186,3 +322,151 @@ class TetrisDisplay:
         label = Text(f"FPS: {int(fps)}", 30, WHITE)
         label.draw(self.surface, (10, 10))
 
+
+class DirtyRectDisplay(TetrisDisplay):
+    """
+    Tetris display that only redraws the cells, panels and labels that changed since
+    the previous frame and reports their rectangles for pygame.display.update.
+    """
+    def __init__(self, surface):
+        """
+        Initialize the display with the specified surface.
+
+        Args:
+            surface (pygame.Surface): The surface to display the Tetris game on.
+        """
+        super().__init__(surface)
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Force the next frame to be redrawn completely, e.g. after drawing a menu over the game.
+        """
+        self._full_redraw = True
+        self._cells = None
+        self._ghost = set()
+        self._panels = {}
+        self._labels = {}
+
+    def draw_frame(self, ghost_piece, grid, convert_shape_format_func, next_piece, hold_piece, score, current_song, fps,
+                   input_latency=None):
+        """
+        Draw a game frame, redrawing only what changed since the previous one.
+
+        Args:
+            ghost_piece (Shape): The ghost piece to be displayed.
+            grid (list): A 2D list representing the grid with the falling piece drawn.
+            convert_shape_format_func (function): The function to convert the shape format for display.
+            next_piece (Shape): The next shape to be displayed.
+            hold_piece (Shape): The hold shape to be displayed, or None.
+            score (int): The current score of the game.
+            current_song (str): The file name of the current song.
+            fps (float): The current frames per second (FPS) of the game, or None to leave it out,
+                e.g. when the frame timing overlay shows it.
+            input_latency (tuple, optional): Median and 95th percentile input-to-display latency
+                in milliseconds, shown under the FPS. Defaults to not shown.
+
+        Returns:
+            list: The rectangles of the surface that were redrawn.
+        """
+        ghost = {(x, y) for x, y in convert_shape_format_func(ghost_piece) if y > -1}
+        if self._full_redraw:
+            self.draw_window(ghost_piece, grid, convert_shape_format_func)
+            dirty = [self.surface.get_rect()]
+        else:
+            dirty = self._draw_changed_cells(grid, ghost)
+        self._cells = [row[:] for row in grid]
+        self._ghost = ghost
+
+        dirty += self._draw_panel('next', next_piece, NEXT_SHAPE_POSITION, 'Next Shape')
+        dirty += self._draw_panel('hold', hold_piece, HOLD_SHAPE_POSITION, 'Hold')
+        dirty += self._draw_label('score', f'Score: {score}', 30, lambda label: SCORE_POSITION)
+        song_name, _ = os.path.splitext(current_song)
+        dirty += self._draw_label('song', f'Now Playing: {song_name}', 20,
+                                  lambda label: (S_WIDTH // 2 - label.get_width() // 2, S_HEIGHT - 40))
+        if fps is not None:
+            dirty += self._draw_label('fps', f"FPS: {int(fps)}", 30, lambda label: (10, 10))
+        if input_latency is not None:
+            dirty += self._draw_label('latency', 'Input: {:.0f} ms (p95 {:.0f})'.format(*input_latency), 20,
+                                      lambda label: (10, 40))
+
+        self._full_redraw = False
+        return dirty
+
+    def draw_profile(self, lines):
+        """
+        Draw the frame timing overlay, one label per line, redrawing only the lines that changed.
+
+        Args:
+            lines (list): The lines of text, e.g. from FrameProfiler.hud_lines.
+
+        Returns:
+            list: The rectangles of the surface that were redrawn.
+        """
+        dirty = []
+        for i, line in enumerate(lines):
+            dirty += self._draw_label(f'profile{i}', line, 16,
+                                      lambda label, i=i: (PROFILE_POSITION[0], PROFILE_POSITION[1] + i * 16))
+        return dirty
+
+    def _draw_changed_cells(self, grid, ghost):
+        previous = self._cells
+        previous_ghost = self._ghost
+        dirty = []
+        for i, row in enumerate(grid):
+            previous_row = previous[i]
+            for j, color in enumerate(row):
+                in_ghost = (j, i) in ghost
+                if color != previous_row[j] or in_ghost != ((j, i) in previous_ghost):
+                    dirty.append(self._draw_cell(i, j, color, in_ghost))
+        return dirty
+
+    def _draw_cell(self, i, j, color, in_ghost):
+        """
+        Redraw one cell exactly as draw_window would: background, block, ghost and the border over it.
+        """
+        rect = pygame.Rect(TOP_LEFT_X + j * BLOCK_SIZE, TOP_LEFT_Y + i * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
+        self.surface.blit(self.assets.background(self.surface.get_size()), rect, rect)
+        if color != BG_COLOR:
+            self.surface.blit(self.assets.block(color), rect)
+        if in_ghost:
+            self.surface.blit(self.assets.ghost(), rect)
+        self.surface.set_clip(rect)
+        pygame.draw.rect(self.surface, BORDER_COLOR, (TOP_LEFT_X, TOP_LEFT_Y, PLAY_WIDTH, PLAY_HEIGHT), 5)
+        self.surface.set_clip(None)
+        return rect
+
+    def _draw_panel(self, key, shape, position, title):
+        """
+        Redraw a next/hold panel when its shape changed.
+        """
+        state = None if shape is None else (id(shape.shape), shape.rotation % len(shape.rotation_tables), shape.color)
+        if key in self._panels and self._panels[key] == state:
+            return []
+        self._panels[key] = state
+        label = Text(title, 30, WHITE)
+        label_position = (position[0] + 10, position[1] - 30)
+        rect = pygame.Rect(position, (5 * BLOCK_SIZE, 5 * BLOCK_SIZE)).union(
+            pygame.Rect(label_position, label.label.get_size()))
+        self.surface.fill(BG_COLOR, rect)
+        if shape is not None:
+            label.draw(self.surface, label_position)
+            self.draw_shape(shape, position)
+        return [rect]
+
+    def _draw_label(self, key, text, size, position_func):
+        """
+        Redraw a text label when its text changed, clearing the previous one.
+        """
+        previous = self._labels.get(key)
+        if previous is not None and previous[0] == text:
+            return []
+        label = Text(text, size, WHITE)
+        rect = pygame.Rect(position_func(label.label), label.label.get_size())
+        dirty = rect
+        if previous is not None:
+            self.surface.fill(BG_COLOR, previous[1])
+            dirty = rect.union(previous[1])
+        label.draw(self.surface, rect.topleft)
+        self._labels[key] = (text, rect)
+        return [dirty]
@@ -0,0 +1,422 @@
+# tetris\engine.py
+"""
+Headless game rules. Nothing in this module (or the modules it imports) touches
+pygame, so games can be simulated without a window or mixer.
+"""
+import struct
+from itertools import chain
+
+from .gameplay import EMPTY, ShapeOperations, FallSpeedCalculator, Grid
+from .constants import GARBAGE_COLOR, GRID_COLUMNS, GRID_ROWS
+from .shapes import SHAPES, SHAPE_COLORS, Piece, PieceGenerator
+
+# cell codes of packed states: 0 empty, 1 to 7 the shape colors, 8 garbage
+CODE_COLORS = [EMPTY] + list(SHAPE_COLORS) + [GARBAGE_COLOR]
+COLOR_CODES = {color: code for code, color in enumerate(CODE_COLORS)}
+
+# Packed state layout (little endian): version (u8), current, next and hold piece
+# as (shape index (u8), x (i8), y (i8), rotation (u8)) with shape index 0xFF for
+# no piece, fall time (f64), lock delay time (f64), score (u32), lines cleared (u32),
+# pieces placed (u32), lock delay resets (u8), flags (u8), piece generator state (u64),
+# then the board with two 4-bit cell codes per byte, row by row.
+PACKED_VERSION = 1
+PACKED_HEADER = struct.Struct('<BBbbBBbbBBbbBddIIIBBQ')
+NO_PIECE = 0xFF
+HOLD_SWITCHED = 1
+CHANGE_PIECE = 2
+LOST = 4
+HAS_GENERATOR = 8
+PACKED_SIZE = PACKED_HEADER.size + GRID_ROWS * GRID_COLUMNS // 2
+# the low nibble of every byte of a packed board
+LOW_NIBBLES = int.from_bytes(b'\x0f' * (GRID_ROWS * GRID_COLUMNS // 2), 'big')
+
+
+def packed_cells(data):
+    """
+    Read the board of a packed state.
+
+    Args:
+        data (bytes): A state packed by GameState.pack.
+
+    Returns:
+        bytes: One cell code per cell, row by row.
+    """
+    size = len(data) - PACKED_HEADER.size
+    packed = int.from_bytes(data[PACKED_HEADER.size:], 'big')
+    cells = bytearray(2 * size)
+    cells[0::2] = (packed >> 4 & LOW_NIBBLES).to_bytes(size, 'big')
+    cells[1::2] = (packed & LOW_NIBBLES).to_bytes(size, 'big')
+    return bytes(cells)
+
+
+def board_cells(grid):
+    """
+    Get the cell codes of a grid's locked cells, row by row, as packed states store them.
+
+    Args:
+        grid (Grid): The grid.
+
+    Returns:
+        bytes: One code per cell.
+    """
+    return bytes(map(COLOR_CODES.__getitem__, chain.from_iterable(grid.grid)))
+
+
+def packed_piece(piece):
+    """
+    Get the values a piece is packed as, in packed states and spectator frames.
+
+    Args:
+        piece (Piece): The piece, or None.
+
+    Returns:
+        tuple: (shape index, x, y, rotation), with NO_PIECE as shape index for no piece.
+    """
+    if piece is None:
+        return NO_PIECE, 0, 0, 0
+    return SHAPES.index(piece.shape), piece.x, piece.y, piece.rotation % len(piece.rotation_tables)
+
+
+def unpacked_piece(values):
+    """
+    Build a piece from the values returned by packed_piece.
+
+    Args:
+        values (tuple): (shape index, x, y, rotation).
+
+    Returns:
+        Piece: The piece, or None for NO_PIECE.
+    """
+    if values[0] == NO_PIECE:
+        return None
+    return GameState.piece_from_state(values)
+
+
+class Input:
+    """
+    Discrete player inputs understood by GameState.
+    """
+    LEFT = 0
+    RIGHT = 1
+    ROTATE = 2
+    HARD_DROP = 3
+    HOLD = 4
+
+
+class GameState:
+    """
+    The complete state of a single game, advanced by explicit inputs and elapsed time.
+    """
+    SOFT_DROP_MULTIPLIER = 5
+
+    def __init__(self, piece_source=None, seed=None):
+        """
+        Initialize a new game.
+
+        Args:
+            piece_source (function, optional): Returns the next Piece to spawn.
+                Defaults to a PieceGenerator, which makes the game reproducible from its seed.
+            seed (int, optional): Seed of the default PieceGenerator. Defaults to a random seed.
+        """
+        self.piece_generator = None
+        if piece_source is None:
+            self.piece_generator = PieceGenerator(seed)
+            piece_source = self.piece_generator.next_piece
+        self.piece_source = piece_source
+        self.shape_operations = ShapeOperations()
+        self.locked_positions = {}  # (x,y):(255,0,0)
+        self.grid = Grid(self.locked_positions)
+        self.board = self.grid.bitboard
+
+        self.current_piece = piece_source()
+        self.next_piece = piece_source()
+        self.hold_piece = None
+        self.hold_switched = False
+        self.change_piece = False
+
+        self.fall_time = 0
+        self.fall_speed = FallSpeedCalculator.calculate_fall_speed(0)
+        self.score = 0
+        self.lines_cleared = 0
+        self.pieces_placed = 0
+        self.lost = False
+
+        #lock delay variables
+        self.ld_time = 0
+        self.ld_limit = 20
+        self.ld_resets = 0
+        self.ld_max_resets = 10
+
+    def step(self, inputs=(), elapsed=0, soft_drop=False):
+        """
+        Advance the game: apply gravity for the elapsed time, then the inputs,
+        then lock the piece and clear rows if it landed.
+
+        Args:
+            inputs (list, optional): Input values to apply in order.
+            elapsed (int, optional): Milliseconds since the previous step.
+            soft_drop (bool, optional): Whether the soft drop key is held.
+
+        Returns:
+            int: The number of rows cleared during this step.
+        """
+        if self.lost:
+            return 0
+        self.apply_gravity(elapsed, soft_drop)
+        for action in inputs:
+            self.apply_input(action)
+        if self.change_piece:
+            return self.lock_current_piece()
+        return 0
+
+    def apply_gravity(self, elapsed, soft_drop=False):
+        """
+        Move the current piece down once enough time has passed, running the lock delay when it lands.
+
+        Args:
+            elapsed (int): Milliseconds since the previous step.
+            soft_drop (bool, optional): Whether the soft drop key is held.
+        """
+        self.fall_time += elapsed
+        fall_speed_multiplier = self.SOFT_DROP_MULTIPLIER if soft_drop else 1
+        if self.fall_time / 1000 < self.fall_speed / fall_speed_multiplier:
+            return
+
+        piece = self.current_piece
+        self.fall_time = 0
+        piece.y += 1
+        if not self.valid(piece) and piece.y > 0:
+            piece.y -= 1
+            if self.ld_time >= self.ld_limit or self.ld_resets >= self.ld_max_resets:
+                self.change_piece = True
+            else:
+                self.ld_time += elapsed
+        else:
+            self.ld_time = 0
+            self.ld_resets = 0
+
+    def apply_input(self, action):
+        """
+        Apply a single player input to the current piece.
+
+        Args:
+            action (int): One of the Input values.
+        """
+        piece = self.current_piece
+        if action == Input.LEFT:
+            self._try_move(piece, 'x', -1)
+        elif action == Input.RIGHT:
+            self._try_move(piece, 'x', 1)
+        elif action == Input.ROTATE:
+            self._try_move(piece, 'rotation', 1)
+        elif action == Input.HARD_DROP:
+            piece.y += self.grid.drop_distance(piece)
+            self.change_piece = True
+        elif action == Input.HOLD:
+            self.hold()
+
+    def _try_move(self, piece, attribute, delta):
+        setattr(piece, attribute, getattr(piece, attribute) + delta)
+        if not self.valid(piece):
+            setattr(piece, attribute, getattr(piece, attribute) - delta)
+        else:
+            self.ld_time = 0
+            self.ld_resets += 1
+
+    def hold(self):
+        """
+        Swap the current piece with the hold piece, once per locked piece.
+        """
+        if self.hold_switched:
+            return
+        if self.hold_piece is None:
+            self.hold_piece = self.current_piece
+            self.current_piece = self.next_piece
+            self.next_piece = self.piece_source()
+        else:
+            self.hold_piece, self.current_piece = self.current_piece, self.hold_piece
+            self.current_piece.x = 5
+            self.current_piece.y = 0
+        self.hold_switched = True
+
+    def lock_current_piece(self):
+        """
+        Lock the current piece, spawn the next one, clear full rows and update the score.
+
+        Returns:
+            int: The number of rows cleared.
+        """
+        piece = self.current_piece
+        self.grid.lock_piece(self.shape_operations.convert_shape_format(piece), piece.color)
+        self.current_piece = self.next_piece
+        self.next_piece = self.piece_source()
+        self.change_piece = False
+        self.hold_switched = False
+        self.pieces_placed += 1
+
+        cleared_rows = self.grid.clear_full_rows()
+        if cleared_rows:
+            self.lines_cleared += cleared_rows
+            self.score += 10 * cleared_rows
+            self.fall_speed = FallSpeedCalculator.calculate_fall_speed(self.score)
+
+        self.lost = self.grid.topped_out()
+        return cleared_rows
+
+    def add_garbage(self, lines, hole_column):
+        """
+        Raise garbage rows sent by an opponent under the locked blocks. The game is
+        lost when that pushes blocks to the top or into the current piece.
+
+        Args:
+            lines (int): Number of garbage rows.
+            hole_column (int): The column left empty in the garbage rows.
+        """
+        self.grid.add_garbage_rows(lines, hole_column, GARBAGE_COLOR)
+        if self.grid.topped_out() or not self.valid(self.current_piece):
+            self.lost = True
+
+    def valid(self, piece):
+        """
+        Check if a piece fits on the board.
+
+        Args:
+            piece (Piece): The piece to check.
+
+        Returns:
+            bool: True if the piece occupies a valid space, False otherwise.
+        """
+        return self.shape_operations.valid_space(piece, self.board)
+
+    def ghost_piece(self):
+        """
+        Get the ghost piece showing where the current piece would land.
+
+        Returns:
+            Piece: The ghost piece.
+        """
+        ghost_piece = self.current_piece.create_ghost_piece()
+        ghost_piece.y += self.grid.drop_distance(ghost_piece)
+        return ghost_piece
+
+    def view(self):
+        """
+        Get the grid with the current piece drawn on it, for rendering.
+
+        Returns:
+            list: A 2D list representing the grid. Must be treated as read-only.
+        """
+        piece = self.current_piece
+        return self.grid.view(self.shape_operations.convert_shape_format(piece), piece.color)
+
+    def snapshot(self):
+        """
+        Capture the complete state of the game, including the piece generator.
+
+        Returns:
+            dict: The snapshot, to be passed to restore.
+        """
+        return {
+            'locked_positions': dict(self.locked_positions),
+            'pieces': [self.piece_state(piece) for piece in (self.current_piece, self.next_piece, self.hold_piece)],
+            'flags': (self.hold_switched, self.change_piece, self.lost),
+            'counters': (self.fall_time, self.score, self.lines_cleared, self.pieces_placed, self.ld_time, self.ld_resets),
+            'generator': self.piece_generator.getstate() if self.piece_generator else None,
+        }
+
+    def restore(self, snapshot):
+        """
+        Return the game to a state captured by snapshot.
+
+        Args:
+            snapshot (dict): A snapshot of this or another game.
+        """
+        self.locked_positions.clear()
+        self.locked_positions.update(snapshot['locked_positions'])
+        self.grid.refresh()
+        self.current_piece, self.next_piece, self.hold_piece = (self.piece_from_state(piece_state)
+                                                                for piece_state in snapshot['pieces'])
+        self.hold_switched, self.change_piece, self.lost = snapshot['flags']
+        (self.fall_time, self.score, self.lines_cleared, self.pieces_placed,
+         self.ld_time, self.ld_resets) = snapshot['counters']
+        self.fall_speed = FallSpeedCalculator.calculate_fall_speed(self.score)
+        if self.piece_generator is not None and snapshot['generator'] is not None:
+            self.piece_generator.setstate(snapshot['generator'])
+
+    def pack(self):
+        """
+        Capture the complete state of the game like snapshot, as about 150 bytes.
+        Locked cells above the board, which only exist once the game is lost, are left out.
+
+        Returns:
+            bytes: The packed state, to be passed to unpack.
+        """
+        cells = board_cells(self.grid)
+        # two codes per byte: every code is below 16, so the even cells shifted by a nibble
+        # never carry into the odd ones
+        packed = ((int.from_bytes(cells[0::2], 'big') << 4 | int.from_bytes(cells[1::2], 'big'))
+                  .to_bytes(len(cells) // 2, 'big'))
+        flags = ((self.hold_switched and HOLD_SWITCHED) | (self.change_piece and CHANGE_PIECE)
+                 | (self.lost and LOST) | (self.piece_generator is not None and HAS_GENERATOR))
+        return PACKED_HEADER.pack(
+            PACKED_VERSION, *packed_piece(self.current_piece), *packed_piece(self.next_piece),
+            *packed_piece(self.hold_piece), self.fall_time, self.ld_time, self.score, self.lines_cleared,
+            self.pieces_placed, self.ld_resets, flags,
+            self.piece_generator.getstate() if self.piece_generator else 0) + packed
+
+    def unpack(self, data):
+        """
+        Return the game to a state captured by pack.
+
+        Args:
+            data (bytes): A packed state of this or another game.
+
+        Raises:
+            ValueError: If the data was packed in an unknown format.
+        """
+        values = PACKED_HEADER.unpack_from(data)
+        if values[0] != PACKED_VERSION:
+            raise ValueError('Unsupported packed state version {}'.format(values[0]))
+        self.current_piece, self.next_piece, self.hold_piece = (
+            unpacked_piece(values[i:i + 4]) for i in (1, 5, 9))
+        (self.fall_time, self.ld_time, self.score, self.lines_cleared, self.pieces_placed,
+         self.ld_resets, flags, generator) = values[13:]
+        self.hold_switched = bool(flags & HOLD_SWITCHED)
+        self.change_piece = bool(flags & CHANGE_PIECE)
+        self.lost = bool(flags & LOST)
+        self.fall_speed = FallSpeedCalculator.calculate_fall_speed(self.score)
+        if self.piece_generator is not None and flags & HAS_GENERATOR:
+            self.piece_generator.setstate(generator)
+
+        self.grid.load_cells(packed_cells(data), CODE_COLORS)
+
+    @staticmethod
+    def piece_state(piece):
+        """
+        Describe a piece with plain values, for snapshots and network messages.
+
+        Args:
+            piece (Piece): The piece, or None.
+
+        Returns:
+            tuple: (shape index, x, y, rotation), or None.
+        """
+        if piece is None:
+            return None
+        return SHAPES.index(piece.shape), piece.x, piece.y, piece.rotation
+
+    @staticmethod
+    def piece_from_state(piece_state):
+        """
+        Build a piece from the values returned by piece_state.
+
+        Args:
+            piece_state (tuple): (shape index, x, y, rotation), or None.
+
+        Returns:
+            Piece: The piece, or None.
+        """
+        if piece_state is None:
+            return None
+        shape_index, x, y, rotation = piece_state
+        return Piece(x, y, SHAPES[shape_index], SHAPE_COLORS[shape_index], rotation)
@@ -0,0 +1,559 @@
+# tetris\env.py
+"""
+Reinforcement learning environments on top of tetris.engine, with the reset/step
+interface of gym.
+
+Observations are NumPy arrays allocated once and updated in place every step:
+only the board rows that changed are rewritten, from the bitboard rather than
+the color grid. The arrays returned by reset and step are those buffers, so
+they are overwritten by the next step; copy them to keep them.
+
+Two action spaces are available:
+    'input':     one Action per step, played over ticks_per_step ticks
+    'placement': one locked piece per step, chosen by its rotation, the column of its
+                 leftmost block and whether to hold first (see placement_action); the
+                 observation includes a mask of the possible placements
+
+Vector environments step many games per call, in this process (VectorTetrisEnv)
+or in worker processes writing to shared memory (SubprocessVectorEnv).
+Requires numpy, which the rest of the game does not need.
+"""
+import multiprocessing
+import random
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .bitboard import WALL_PADDING
+from .constants import GRID_COLUMNS, GRID_ROWS
+from .engine import GameState, Input
+from .shapes import SHAPES
+
+
+class Action:
+    """
+    Actions of the 'input' action space.
+    """
+    LEFT = 0
+    RIGHT = 1
+    ROTATE = 2
+    SOFT_DROP = 3
+    HARD_DROP = 4
+    HOLD = 5
+
+
+ACTION_INPUTS = {Action.LEFT: Input.LEFT, Action.RIGHT: Input.RIGHT, Action.ROTATE: Input.ROTATE,
+                 Action.HARD_DROP: Input.HARD_DROP, Action.HOLD: Input.HOLD}
+INPUT_ACTIONS = 6
+ROTATIONS = 4
+
+# board values
+EMPTY_CELL = 0
+LOCKED_CELL = 1
+PIECE_CELL = 2
+# entries of the pieces observation, -1 for no piece
+CURRENT_SHAPE, ROTATION, PIECE_X, PIECE_Y, NEXT_SHAPE, HOLD_SHAPE, HOLD_SWITCHED = range(7)
+PIECE_VALUES = 7
+
+# LOCKED_CELL at column j of the playfield for every bit pattern of a row
+ROW_CELLS = ((np.arange(1 << GRID_COLUMNS)[:, None] >> np.arange(GRID_COLUMNS)) & 1).astype(np.uint8)
+
+
+def placement_action(rotation, column, hold=False, columns=GRID_COLUMNS):
+    """
+    Get the action of the 'placement' action space that locks a piece.
+
+    Args:
+        rotation (int): The rotation of the piece, 0 to 3.
+        column (int): The column of the leftmost block of the piece.
+        hold (bool, optional): Whether the piece is swapped with the hold piece first. Defaults to False.
+        columns (int, optional): Number of columns on the board. Defaults to GRID_COLUMNS.
+
+    Returns:
+        int: The action.
+    """
+    return (int(hold) * ROTATIONS + rotation) * columns + column
+
+
+def observation_specs(mode='input', rows=GRID_ROWS, columns=GRID_COLUMNS):
+    """
+    Describe the observation arrays of one environment.
+
+    Args:
+        mode (str, optional): 'input' or 'placement'. Defaults to 'input'.
+        rows (int, optional): Number of rows on the board. Defaults to GRID_ROWS.
+        columns (int, optional): Number of columns on the board. Defaults to GRID_COLUMNS.
+
+    Returns:
+        dict: (shape, dtype) by observation name. 'board' holds EMPTY_CELL, LOCKED_CELL and
+            PIECE_CELL values, 'pieces' the values named by CURRENT_SHAPE to HOLD_SWITCHED,
+            and in placement mode 'action_mask' which placement actions are possible.
+    """
+    specs = {'board': ((rows, columns), np.uint8), 'pieces': ((PIECE_VALUES,), np.int16)}
+    if mode == 'placement':
+        specs['action_mask'] = ((2 * ROTATIONS * columns,), np.bool_)
+    return specs
+
+
+def vector_specs(count, mode='input', rows=GRID_ROWS, columns=GRID_COLUMNS):
+    """
+    Describe the arrays of a vector of environments: the observations plus one
+    action, reward, termination flags and score per environment.
+
+    Args:
+        count (int): Number of environments.
+        mode (str, optional): 'input' or 'placement'. Defaults to 'input'.
+        rows (int, optional): Number of rows on the board. Defaults to GRID_ROWS.
+        columns (int, optional): Number of columns on the board. Defaults to GRID_COLUMNS.
+
+    Returns:
+        dict: (shape, dtype) by array name.
+    """
+    specs = {name: ((count,) + shape, dtype) for name, (shape, dtype) in observation_specs(mode, rows, columns).items()}
+    specs.update({
+        'actions': ((count,), np.int64),
+        'rewards': ((count,), np.float32),
+        'terminated': ((count,), np.bool_),
+        'truncated': ((count,), np.bool_),
+        'score': ((count,), np.int64),
+        'lines_cleared': ((count,), np.int64),
+    })
+    return specs
+
+
+def buffer_size(specs):
+    """
+    Get the size of a shared buffer holding arrays, each aligned to 8 bytes.
+
+    Args:
+        specs (dict): (shape, dtype) by array name.
+
+    Returns:
+        int: The bytes needed to lay the arrays out with allocate_arrays.
+    """
+    size = 0
+    for shape, dtype in specs.values():
+        size = -(-size // 8) * 8 + int(np.prod(shape)) * np.dtype(dtype).itemsize
+    return size
+
+
+def allocate_arrays(specs, buffer=None):
+    """
+    Lay arrays out one after the other, 8-byte aligned, in a buffer.
+
+    Args:
+        specs (dict): (shape, dtype) by array name.
+        buffer (buffer, optional): Memory of at least buffer_size(specs) bytes, e.g. a shared
+            memory block. Defaults to new memory.
+
+    Returns:
+        dict: The arrays by name, views of the buffer.
+    """
+    if buffer is None:
+        buffer = bytearray(buffer_size(specs))
+    arrays = {}
+    offset = 0
+    for name, (shape, dtype) in specs.items():
+        offset = -(-offset // 8) * 8
+        arrays[name] = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        offset += arrays[name].nbytes
+    return arrays
+
+
+class TetrisEnv:
+    """
+    One game as a reinforcement learning environment.
+
+    The reward of a step is the number of rows it cleared. An episode terminates
+    when the game is lost and is truncated after max_steps steps.
+    """
+    def __init__(self, mode='input', ticks_per_step=1, tick_ms=1000 / 60, max_steps=None, seed=None,
+                 observation=None):
+        """
+        Initialize the environment. Call reset before the first step.
+
+        Args:
+            mode (str, optional): 'input' for one Action per step, 'placement' for one
+                locked piece per step. Defaults to 'input'.
+            ticks_per_step (int, optional): Gravity ticks after every input action. Defaults to 1.
+            tick_ms (float, optional): Milliseconds per tick. Defaults to 60 ticks per second.
+            max_steps (int, optional): Steps after which an episode is truncated. Defaults to no limit.
+            seed (int, optional): Seed of the games' piece sequences. Defaults to a random seed.
+            observation (dict, optional): Arrays to write the observation into, as described
+                by observation_specs, e.g. rows of a vector environment's buffers. Defaults to new arrays.
+
+        Raises:
+            ValueError: If mode is not 'input' or 'placement'.
+        """
+        if mode not in ('input', 'placement'):
+            raise ValueError('Unknown action space {!r}'.format(mode))
+        self.mode = mode
+        self.ticks_per_step = ticks_per_step
+        self.tick_ms = tick_ms
+        self.max_steps = max_steps
+        self.rng = random.Random(seed)
+        specs = observation_specs(mode)
+        self.observation = observation if observation is not None else allocate_arrays(specs)
+        self.action_count = INPUT_ACTIONS if mode == 'input' else specs['action_mask'][0][0]
+        self.state = None
+        self.steps = 0
+        self._rows = None
+        self._overlay = []
+
+    def reset(self, seed=None):
+        """
+        Start a new game.
+
+        Args:
+            seed (int, optional): Reseed the environment. Defaults to continuing its sequence of games.
+
+        Returns:
+            tuple: (observation, info).
+        """
+        if seed is not None:
+            self.rng.seed(seed)
+        self.state = GameState(seed=self.rng.getrandbits(64))
+        self.steps = 0
+        self._rows = [None] * self.state.grid.rows
+        self._overlay = []
+        self._observe()
+        return self.observation, self.info()
+
+    def step(self, action):
+        """
+        Play one action.
+
+        Args:
+            action (int): An Action in 'input' mode, a placement_action in 'placement' mode.
+                A placement outside the action mask drops the piece where it is.
+
+        Returns:
+            tuple: (observation, reward, terminated, truncated, info).
+        """
+        state = self.state
+        if self.mode == 'input':
+            cleared = self._step_input(int(action))
+        else:
+            cleared = self._step_placement(int(action))
+        self.steps += 1
+        self._observe()
+        truncated = self.max_steps is not None and self.steps >= self.max_steps
+        return self.observation, float(cleared), state.lost, truncated and not state.lost, self.info()
+
+    def info(self):
+        """
+        Get the statistics of the game, the info returned by step.
+
+        Returns:
+            dict: The score, rows cleared and pieces placed of the game.
+        """
+        state = self.state
+        return {'score': state.score, 'lines_cleared': state.lines_cleared, 'pieces_placed': state.pieces_placed}
+
+    def _step_input(self, action):
+        state = self.state
+        soft_drop = action == Action.SOFT_DROP
+        inputs = [ACTION_INPUTS[action]] if action in ACTION_INPUTS else []
+        cleared = 0
+        for _ in range(self.ticks_per_step):
+            cleared += state.step(inputs, self.tick_ms, soft_drop)
+            inputs = []
+        return cleared
+
+    def _step_placement(self, action):
+        state = self.state
+        # the mask of the current observation, valid until the piece moves
+        if 0 <= action < self.action_count and self.observation['action_mask'][action]:
+            columns = state.grid.columns
+            hold, rest = divmod(action, ROTATIONS * columns)
+            rotation, column = divmod(rest, columns)
+            if hold:
+                state.hold()
+            piece = state.current_piece
+            piece.rotation = rotation
+            piece.x = column - piece.rotation_table.bounding_box[0]
+        # otherwise not a possible placement: drop the piece where it is
+        piece = state.current_piece
+        piece.y += state.grid.drop_distance(piece)
+        state.change_piece = True
+        return state.lock_current_piece()
+
+    def _observe(self):
+        state = self.state
+        observation = self.observation
+        board = observation['board']
+        rows = state.board.rows
+        full_row = state.board.full_row
+
+        # rewrite the rows that changed since the previous observation
+        previous_rows = self._rows
+        for y, row in enumerate(rows):
+            if row != previous_rows[y]:
+                board[y] = ROW_CELLS[(row & full_row) >> WALL_PADDING]
+                previous_rows[y] = row
+        for x, y in self._overlay:
+            board[y, x] = rows[y] >> (x + WALL_PADDING) & 1
+        piece = state.current_piece
+        overlay = [(x, y) for x, y in state.shape_operations.convert_shape_format(piece) if y >= 0]
+        for x, y in overlay:
+            board[y, x] = PIECE_CELL
+        self._overlay = overlay
+
+        pieces = observation['pieces']
+        pieces[CURRENT_SHAPE] = SHAPES.index(piece.shape)
+        pieces[ROTATION] = piece.rotation % len(piece.rotation_tables)
+        pieces[PIECE_X] = piece.x
+        pieces[PIECE_Y] = piece.y
+        pieces[NEXT_SHAPE] = SHAPES.index(state.next_piece.shape)
+        pieces[HOLD_SHAPE] = -1 if state.hold_piece is None else SHAPES.index(state.hold_piece.shape)
+        pieces[HOLD_SWITCHED] = state.hold_switched
+        if self.mode == 'placement':
+            self._observe_action_mask(observation['action_mask'])
+
+    def _observe_action_mask(self, mask):
+        state = self.state
+        board = state.board
+        columns = board.column_count
+        mask[:] = False
+        candidates = [(0, state.current_piece)]
+        if not state.hold_switched:
+            held = state.hold_piece
+            # a held piece comes back at the spawn position, the next piece spawns where it is
+            candidates.append((1, state.next_piece if held is None else held))
+        for hold, piece in candidates:
+            y = 0 if hold and state.hold_piece is not None else piece.y
+            for rotation, table in enumerate(piece.rotation_tables):
+                left, _, right, _ = table.bounding_box
+                start = (hold * ROTATIONS + rotation) * columns
+                for column in range(columns - (right - left)):
+                    if board.fits(table.row_masks, column - left, y):
+                        mask[start + column] = True
+
+
+class VectorTetrisEnv:
+    """
+    Many environments stepped together in this process, reset automatically when
+    their episode ends. Observations, rewards and flags are (count, ...) arrays
+    updated in place.
+    """
+    def __init__(self, count, mode='input', seed=None, arrays=None, indices=None, **kwargs):
+        """
+        Initialize the environments. Call reset before the first step.
+
+        Args:
+            count (int): Number of environments.
+            mode (str, optional): 'input' or 'placement'. Defaults to 'input'.
+            seed (int, optional): Seed of environment 0, environment i uses seed + i.
+                Defaults to random seeds.
+            arrays (dict, optional): Arrays as described by vector_specs. Defaults to new arrays.
+            indices (range, optional): The environments to create, when the others are
+                stepped by other processes sharing the arrays. Defaults to all of them.
+            **kwargs: Further TetrisEnv arguments.
+        """
+        self.count = count
+        self.mode = mode
+        self.arrays = arrays if arrays is not None else allocate_arrays(vector_specs(count, mode))
+        names = list(observation_specs(mode))
+        self.observation = {name: self.arrays[name] for name in names}
+        self.envs = [None] * count
+        for i in (range(count) if indices is None else indices):
+            self.envs[i] = TetrisEnv(mode, seed=None if seed is None else seed + i,
+                                     observation={name: self.arrays[name][i] for name in names}, **kwargs)
+        self.action_count = INPUT_ACTIONS if mode == 'input' else self.arrays['action_mask'].shape[1]
+
+    def reset(self, seed=None):
+        """
+        Start a new game in every environment.
+
+        Args:
+            seed (int, optional): Reseed environment i with seed + i. Defaults to continuing their sequences.
+
+        Returns:
+            tuple: (observation, info) with the arrays of every environment.
+        """
+        self.reset_range(0, self.count, seed)
+        return self.observation, self._info()
+
+    def reset_range(self, start, stop, seed=None):
+        """
+        Start a new game in the environments start to stop - 1.
+
+        Args:
+            start (int): The first environment.
+            stop (int): The environment after the last one.
+            seed (int, optional): Reseed environment i with seed + i. Defaults to continuing their sequences.
+        """
+        arrays = self.arrays
+        for i in range(start, stop):
+            self.envs[i].reset(None if seed is None else seed + i)
+        for name in ('rewards', 'terminated', 'truncated', 'score', 'lines_cleared'):
+            arrays[name][start:stop] = 0
+
+    def step(self, actions=None):
+        """
+        Play one action in every environment. An environment whose episode ended
+        starts a new one; 'score' and 'lines_cleared' of the info then hold the
+        results of the finished episode until its next step.
+
+        Args:
+            actions (numpy.ndarray, optional): One action per environment. Defaults to the
+                'actions' array, which callers sharing the arrays write into.
+
+        Returns:
+            tuple: (observation, rewards, terminated, truncated, info).
+        """
+        arrays = self.arrays
+        if actions is not None:
+            arrays['actions'][:] = actions
+        self.step_range(0, self.count)
+        return self.observation, arrays['rewards'], arrays['terminated'], arrays['truncated'], self._info()
+
+    def step_range(self, start, stop):
+        """
+        Step the environments start to stop - 1 with the actions in the 'actions' array.
+
+        Args:
+            start (int): The first environment.
+            stop (int): The environment after the last one.
+        """
+        arrays = self.arrays
+        actions, rewards = arrays['actions'], arrays['rewards']
+        terminated, truncated = arrays['terminated'], arrays['truncated']
+        scores, lines_cleared = arrays['score'], arrays['lines_cleared']
+        for i in range(start, stop):
+            env = self.envs[i]
+            _, rewards[i], terminated[i], truncated[i], _ = env.step(actions[i])
+            scores[i] = env.state.score
+            lines_cleared[i] = env.state.lines_cleared
+            if terminated[i] or truncated[i]:
+                env.reset()
+
+    def _info(self):
+        return {'score': self.arrays['score'], 'lines_cleared': self.arrays['lines_cleared']}
+
+    def close(self):
+        """
+        Release the environments. Nothing to release in this process.
+        """
+
+
+def _worker(connection, memory_name, count, mode, start, stop, seed, kwargs):
+    memory = shared_memory.SharedMemory(name=memory_name)
+    try:
+        arrays = allocate_arrays(vector_specs(count, mode), memory.buf)
+        vector = VectorTetrisEnv(count, mode, seed, arrays, range(start, stop), **kwargs)
+        while True:
+            command, argument = connection.recv()
+            if command == 'step':
+                vector.step_range(start, stop)
+            elif command == 'reset':
+                vector.reset_range(start, stop, argument)
+            elif command == 'close':
+                break
+            connection.send(None)
+        # the views must go before the shared memory can be closed
+        del arrays, vector
+    finally:
+        memory.close()
+
+
+class SubprocessVectorEnv:
+    """
+    Many environments split across worker processes. The observations, actions,
+    rewards and flags live in one shared memory block that the workers write
+    into directly, so no observation is pickled or copied between processes.
+    """
+    def __init__(self, count, workers=None, mode='input', seed=None, context=None, **kwargs):
+        """
+        Start the workers. Call reset before the first step, and close when done.
+
+        Args:
+            count (int): Number of environments.
+            workers (int, optional): Number of worker processes. Defaults to the CPU count.
+            mode (str, optional): 'input' or 'placement'. Defaults to 'input'.
+            seed (int, optional): Seed of environment 0, environment i uses seed + i.
+                Defaults to random seeds.
+            context (str, optional): The multiprocessing start method. Defaults to the platform default.
+            **kwargs: Further TetrisEnv arguments.
+        """
+        self.count = count
+        self.mode = mode
+        workers = max(1, min(workers or multiprocessing.cpu_count(), count))
+        specs = vector_specs(count, mode)
+        self.memory = shared_memory.SharedMemory(create=True, size=buffer_size(specs))
+        self.arrays = allocate_arrays(specs, self.memory.buf)
+        self.observation = {name: self.arrays[name] for name in observation_specs(mode)}
+        self.action_count = INPUT_ACTIONS if mode == 'input' else self.arrays['action_mask'].shape[1]
+        context = multiprocessing.get_context(context)
+        self.connections = []
+        self.processes = []
+        bounds = np.linspace(0, count, workers + 1).astype(int)
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            parent, child = context.Pipe()
+            process = context.Process(target=_worker, daemon=True,
+                                      args=(child, self.memory.name, count, mode, int(start), int(stop), seed, kwargs))
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def _broadcast(self, command, argument=None):
+        for connection in self.connections:
+            connection.send((command, argument))
+        for connection in self.connections:
+            connection.recv()
+
+    def reset(self, seed=None):
+        """
+        Start a new game in every environment.
+
+        Args:
+            seed (int, optional): Reseed environment i with seed + i. Defaults to continuing their sequences.
+
+        Returns:
+            tuple: (observation, info) with the arrays of every environment.
+        """
+        self._broadcast('reset', seed)
+        return self.observation, self._info()
+
+    def step(self, actions=None):
+        """
+        Play one action in every environment, in parallel across the workers.
+        Like VectorTetrisEnv.step.
+
+        Args:
+            actions (numpy.ndarray, optional): One action per environment. Defaults to the
+                'actions' array.
+
+        Returns:
+            tuple: (observation, rewards, terminated, truncated, info).
+        """
+        arrays = self.arrays
+        if actions is not None:
+            arrays['actions'][:] = actions
+        self._broadcast('step')
+        return self.observation, arrays['rewards'], arrays['terminated'], arrays['truncated'], self._info()
+
+    def _info(self):
+        return {'score': self.arrays['score'], 'lines_cleared': self.arrays['lines_cleared']}
+
+    def close(self):
+        """
+        Stop the workers and free the shared memory.
+        """
+        if not self.processes:
+            return
+        for connection in self.connections:
+            connection.send(('close', None))
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.observation = self.arrays = None
+        self.memory.close()
+        self.memory.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,137 @@
+# tetris\fonts.py
+"""
+Font file resolution cached on disk between runs.
+
+pygame.font.SysFont scans every installed font the first time it is called
+(running fc-list on Linux), which can take seconds. The file a font name
+resolves to rarely changes, so it is remembered in a small JSON file and the
+font is then opened directly with pygame.font.Font. A font that was not found
+is remembered along with the state of the font directories, and looked for
+again once they change.
+"""
+import json
+import os
+import shutil
+
+import pygame
+
+CACHE_VERSION = 2
+# where fonts get installed, and the fontconfig caches rebuilt when they are
+FONT_DIRS = (
+    '/usr/share/fonts', '/usr/local/share/fonts', '/var/cache/fontconfig', '~/.local/share/fonts', '~/.fonts',
+    '~/.cache/fontconfig', '/Library/Fonts', '/System/Library/Fonts', '~/Library/Fonts',
+    os.path.join(os.environ.get('WINDIR', r'C:\Windows'), 'Fonts'),
+    os.path.join(os.environ.get('LOCALAPPDATA', '~'), 'Microsoft', 'Windows', 'Fonts'),
+)
+
+
+def default_cache_dir():
+    """
+    Get the directory for the game's cache files: $TETRIS_CACHE_DIR when set,
+    otherwise the platform's user cache directory.
+
+    Returns:
+        str: The cache directory.
+    """
+    if os.environ.get('TETRIS_CACHE_DIR'):
+        return os.environ['TETRIS_CACHE_DIR']
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA', os.path.expanduser('~'))
+    else:
+        base = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'tetris')
+
+
+def font_dirs_state():
+    """
+    Get a fingerprint of the installed fonts that changes when fonts are installed:
+    the latest modification time of the font directories, and whether fc-list is
+    available for pygame to find fonts with.
+
+    Returns:
+        list: The fingerprint, JSON serializable.
+    """
+    latest = 0
+    for directory in FONT_DIRS:
+        try:
+            latest = max(latest, os.stat(os.path.expanduser(directory)).st_mtime)
+        except OSError:
+            pass
+    return [latest, shutil.which('fc-list') is not None]
+
+
+class FontPathCache:
+    """
+    Maps font names to font files, persisted as JSON, and remembers the names that were not found.
+    """
+    def __init__(self, path=None):
+        """
+        Initialize the cache, reading it from disk when it exists.
+
+        Args:
+            path (str, optional): The cache file. Defaults to fonts.json in default_cache_dir().
+        """
+        self.path = path or os.path.join(default_cache_dir(), 'fonts.json')
+        self.paths = {}
+        self.missing = {}  # font name: font_dirs_state() when it was not found
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+            if data.get('version') == CACHE_VERSION:
+                self.paths = data['fonts']
+                self.missing = data['missing']
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    def resolve(self, font_name):
+        """
+        Get the file of a system font, scanning the installed fonts only when the
+        name is not cached, its cached file disappeared, or it was not found
+        before and fonts were installed since.
+
+        Args:
+            font_name (str): The font name.
+
+        Returns:
+            str: The path of the font file, or None when the font is not installed.
+        """
+        path = self.paths.get(font_name)
+        if path is not None and os.path.exists(path):
+            return path
+        if path is None and self.missing.get(font_name) == font_dirs_state():
+            return None
+        path = pygame.font.match_font(font_name)
+        if path is None:
+            self.paths.pop(font_name, None)
+            self.missing[font_name] = font_dirs_state()
+        else:
+            self.paths[font_name] = path
+            self.missing.pop(font_name, None)
+        self.save()
+        return path
+
+    def font(self, font_name, size):
+        """
+        Open a system font like pygame.font.SysFont, without the font scan when the name is cached.
+
+        Args:
+            font_name (str): The font name.
+            size (int): The font size.
+
+        Returns:
+            pygame.font.Font: The font, pygame's default font when it is not installed.
+        """
+        return pygame.font.Font(self.resolve(font_name), size)
+
+    def save(self):
+        """
+        Write the cache to disk. A cache that cannot be written is only kept in memory.
+        """
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temporary = self.path + '.tmp'
+            with open(temporary, 'w') as file:
+                json.dump({'version': CACHE_VERSION, 'fonts': self.paths, 'missing': self.missing}, file)
+            os.replace(temporary, self.path)
+        except OSError:
+            pass
@@ -1,18 +1,149 @@
 # tetris\gameplay.py
 from abc import ABC, abstractmethod
 
+from .bitboard import Bitboard, WALL_PADDING
+from .constants import GRID_ROWS, GRID_COLUMNS
+
+EMPTY = (0, 0, 0)  # color of an empty cell
+OCCUPIED_DIGITS = b'0' + b'1' * 255  # translation table from cell codes to '0' (empty) or '1'
+
+class Skyline:
+    """
+    Column height index of a board: the highest occupied row and the number of
+    occupied cells of every column. Heights, holes and bumpiness are read from it
+    without scanning the board.
+    """
+    def __init__(self, rows=GRID_ROWS, columns=GRID_COLUMNS):
+        """
+        Initialize the skyline of an empty board.
+
+        Args:
+            rows (int, optional): Number of rows on the board. Defaults to GRID_ROWS.
+            columns (int, optional): Number of columns on the board. Defaults to GRID_COLUMNS.
+        """
+        self.rows = rows
+        self.tops = [rows] * columns  # highest occupied row, rows for an empty column
+        self.fill = [0] * columns  # occupied cells per column
+
+    @classmethod
+    def from_bitboard(cls, bitboard):
+        """
+        Build the skyline of a board by scanning its rows once.
+
+        Args:
+            bitboard (Bitboard): The board.
+
+        Returns:
+            Skyline: The skyline of the board.
+        """
+        skyline = cls(bitboard.row_count, bitboard.column_count)
+        tops = skyline.tops
+        fill = skyline.fill
+        for i, row in enumerate(bitboard.rows):
+            row &= bitboard.full_row
+            if not row:
+                continue
+            for x in range(bitboard.column_count):
+                if row >> (x + WALL_PADDING) & 1:
+                    fill[x] += 1
+                    if tops[x] > i:
+                        tops[x] = i
+        return skyline
+
+    def copy(self):
+        """
+        Copy the skyline, e.g. before trying a placement on it.
+
+        Returns:
+            Skyline: An independent copy of the skyline.
+        """
+        skyline = Skyline.__new__(Skyline)
+        skyline.rows = self.rows
+        skyline.tops = self.tops[:]
+        skyline.fill = self.fill[:]
+        return skyline
+
+    def add_cell(self, x, y):
+        """
+        Account for a newly occupied cell.
+
+        Args:
+            x (int): The column of the cell.
+            y (int): The row of the cell.
+        """
+        self.fill[x] += 1
+        if y < self.tops[x]:
+            self.tops[x] = y
+
+    def heights(self):
+        """
+        Get the height of every column.
+
+        Returns:
+            list: The height of every column, 0 for an empty column.
+        """
+        rows = self.rows
+        return [rows - top for top in self.tops]
+
+    def aggregate_height(self):
+        """
+        Get the total height of the columns, a feature of the auto-player heuristic.
+
+        Returns:
+            int: The sum of the column heights.
+        """
+        return self.rows * len(self.tops) - sum(self.tops)
+
+    def holes(self):
+        """
+        Count the holes: empty cells covered by an occupied cell in their column.
+
+        Returns:
+            int: The number of empty cells below the top of their column.
+        """
+        return self.aggregate_height() - sum(self.fill)
+
+    def bumpiness(self):
+        """
+        Measure how uneven the surface is.
+
+        Returns:
+            int: The sum of the height differences between neighbouring columns.
+        """
+        tops = self.tops
+        return sum(abs(tops[i] - tops[i + 1]) for i in range(len(tops) - 1))
+
+
 class Grid:
     """
     Class representing the game grid.
+
+    The grid is kept up to date incrementally: locked cells are written when a
+    piece locks and full rows are compacted away in place.
     """
-    def __init__(self, locked_positions={}):
+    def __init__(self, locked_positions=None, rows=GRID_ROWS, columns=GRID_COLUMNS):
         """
         Initialize the grid with locked_positions.
 
         Args:
-            locked_positions (dict): A dictionary containing locked_positions in the grid.
+            locked_positions (dict, optional): A dictionary containing locked_positions in the grid.
+                The grid keeps a reference to it and updates it as pieces lock and rows clear.
+            rows (int, optional): Number of rows in the grid. Defaults to GRID_ROWS.
+            columns (int, optional): Number of columns in the grid. Defaults to GRID_COLUMNS.
         """
+        if locked_positions is None:
+            locked_positions = {}
+        self.locked_positions = locked_positions
+        self.rows = rows
+        self.columns = columns
         self.grid = self.create_grid(locked_positions)
+        self.bitboard = Bitboard(rows, columns)
+        self.frame = [row[:] for row in self.grid]
+        self.row_fill = [0] * rows
+        self.overflow = {}  # locked positions above the top of the grid
+        self.skyline = Skyline(rows, columns)
+        self._overlay = []
+        self.refresh()
 
     def create_grid(self, locked_positions):
         """
@@ -24,7 +155,7 @@ class Grid:
         Returns:
             list: A 2D list representing the grid.
         """
-        grid = [[(0, 0, 0) for _ in range(10)] for _ in range(20)]
+        grid = [[EMPTY for _ in range(self.columns)] for _ in range(self.rows)]
 
         for i in range(len(grid)):
             for j in range(len(grid[i])):
@@ -33,6 +164,256 @@ class Grid:
                     grid[i][j] = c
         return grid
 
+    def lock_piece(self, positions, color):
+        """
+        Lock a piece into the grid, updating the locked positions, grid, bitboard and skyline in place.
+
+        Args:
+            positions (list): The grid positions of the piece.
+            color (tuple): The color of the piece (R, G, B).
+        """
+        grid = self.grid
+        for x, y in positions:
+            self.locked_positions[(x, y)] = color
+            if y > -1:
+                if grid[y][x] == EMPTY:
+                    self.row_fill[y] += 1
+                    self.skyline.add_cell(x, y)
+                grid[y][x] = color
+                self.frame[y][x] = color
+                self.bitboard.set_cell(x, y)
+            else:
+                self.overflow[(x, y)] = color
+
+    def clear_full_rows(self):
+        """
+        Remove every full row and compact the rows above it down in a single pass.
+
+        Full rows are found with the per-row fill counters; the locked positions
+        are rekeyed only for the rows that moved.
+
+        Returns:
+            int: The number of cleared rows.
+        """
+        columns = self.columns
+        row_fill = self.row_fill
+        full_rows = [i for i, filled in enumerate(row_fill) if filled == columns]
+        if not full_rows:
+            return 0
+
+        grid = self.grid
+        bit_rows = self.bitboard.rows
+        locked = self.locked_positions
+        lowest = full_rows[-1]
+        cleared = len(full_rows)
+
+        # every row from the lowest cleared one up either disappears or moves down
+        for i in range(lowest + 1):
+            if row_fill[i]:
+                for j, color in enumerate(grid[i]):
+                    if color != EMPTY:
+                        del locked[(j, i)]
+
+        write = lowest
+        for read in range(lowest, -1, -1):
+            if row_fill[read] != columns:
+                grid[write] = grid[read]
+                bit_rows[write] = bit_rows[read]
+                row_fill[write] = row_fill[read]
+                write -= 1
+        for i in range(cleared):
+            grid[i] = [EMPTY] * columns
+            bit_rows[i] = self.bitboard.empty_row
+            row_fill[i] = 0
+
+        # cells locked above the grid come down into the freed rows
+        overflow = self.overflow
+        self.overflow = {}
+        for pos in overflow:
+            del locked[pos]
+        for (x, y), color in overflow.items():
+            y += cleared
+            if y > -1:
+                if grid[y][x] == EMPTY:
+                    row_fill[y] += 1
+                grid[y][x] = color
+                self.bitboard.set_cell(x, y)
+            else:
+                self.overflow[(x, y)] = color
+                locked[(x, y)] = color
+
+        for i in range(lowest + 1):
+            row = grid[i]
+            self.frame[i][:] = row
+            if row_fill[i]:
+                for j, color in enumerate(row):
+                    if color != EMPTY:
+                        locked[(j, i)] = color
+        self.skyline = Skyline.from_bitboard(self.bitboard)
+        return cleared
+
+    def add_garbage_rows(self, count, hole_column, color):
+        """
+        Push every locked cell up and fill the bottom rows with garbage, leaving one hole per row.
+
+        Args:
+            count (int): Number of garbage rows.
+            hole_column (int): The column left empty in every garbage row.
+            color (tuple): The color of the garbage blocks (R, G, B).
+        """
+        if count <= 0:
+            return
+        locked = self.locked_positions
+        shifted = {(x, y - count): cell_color for (x, y), cell_color in locked.items()}
+        for y in range(self.rows - count, self.rows):
+            for x in range(self.columns):
+                if x != hole_column:
+                    shifted[(x, y)] = color
+        locked.clear()
+        locked.update(shifted)
+        self.refresh()
+
+    def topped_out(self):
+        """
+        Check if any locked cell reached the top row, like ShapeOperations.check_lost
+        does for the locked positions, but without scanning them.
+
+        Returns:
+            bool: True if the game is lost, False otherwise.
+        """
+        return bool(self.row_fill[0] or self.overflow)
+
+    def drop_distance(self, piece):
+        """
+        Get how many rows a piece can fall before it lands, like moving it down
+        until valid_space fails. Computed from the skyline and the piece's
+        bottom profile when the piece is above every column it covers, otherwise
+        by stepping it down on the bitboard (e.g. when tucked under an overhang).
+
+        Args:
+            piece (Piece): The piece to drop.
+
+        Returns:
+            int: The number of rows; -1 if the piece does not fit where it is.
+        """
+        tops = self.skyline.tops
+        x, y = piece.x, piece.y
+        distance = None
+        for dx, dy in piece.rotation_table.bottom_profile:
+            column = x + dx
+            if not 0 <= column < self.columns:
+                break
+            below = tops[column] - (y + dy) - 1
+            if below < 0:
+                break
+            if distance is None or below < distance:
+                distance = below
+        else:
+            return distance
+
+        row_masks = piece.rotation_table.row_masks
+        fits = self.bitboard.fits
+        distance = 0
+        while fits(row_masks, x, y + distance):
+            distance += 1
+        return distance - 1
+
+    def refresh(self):
+        """
+        Rebuild the grid, bitboard, fill counters, skyline and frame in place from the locked positions.
+        Used after the locked positions were changed outside of the grid.
+        """
+        rows, columns = self.rows, self.columns
+        # one pass over the locked positions fills every index, as restoring snapshots calls this often
+        grid = [[EMPTY] * columns for _ in range(rows)]
+        masks = [0] * rows
+        row_fill = [0] * rows
+        skyline = Skyline(rows, columns)
+        tops, fill = skyline.tops, skyline.fill
+        overflow = {}
+        for (x, y), color in self.locked_positions.items():
+            if y < 0:
+                overflow[(x, y)] = color
+            elif y < rows and 0 <= x < columns:
+                grid[y][x] = color
+                masks[y] |= 1 << (x + WALL_PADDING)
+                row_fill[y] += 1
+                fill[x] += 1
+                if y < tops[x]:
+                    tops[x] = y
+        self._set_rows(grid, masks, row_fill, skyline)
+        self.overflow = overflow
+
+    def load_cells(self, cells, colors):
+        """
+        Replace the locked positions with cells given as codes, rebuilding everything like refresh
+        but in a single pass over the cells.
+
+        Args:
+            cells (bytes): One code per cell, row by row, 0 for an empty cell.
+            colors (list): The color of every code.
+        """
+        rows, columns = self.rows, self.columns
+        locked_positions = self.locked_positions
+        locked_positions.clear()
+        grid = []
+        masks = [0] * rows
+        row_fill = [0] * rows
+        empty = bytes(columns)
+        for y in range(rows):
+            codes = cells[y * columns:(y + 1) * columns]
+            if codes == empty:
+                grid.append([EMPTY] * columns)
+                continue
+            row = list(map(colors.__getitem__, codes))
+            grid.append(row)
+            # '0' and '1' per cell, read as a binary number with column 0 as the lowest bit
+            digits = codes.translate(OCCUPIED_DIGITS)
+            masks[y] = int(digits[::-1], 2) << WALL_PADDING
+            row_fill[y] = digits.count(b'1')
+            locked_positions.update({(x, y): row[x] for x in range(columns) if codes[x]})
+        skyline = Skyline(rows, columns)
+        for x in range(columns):
+            column = cells[x:rows * columns:columns]
+            skyline.fill[x] = rows - column.count(0)
+            skyline.tops[x] = rows - len(column.lstrip(b'\0'))
+        self._set_rows(grid, masks, row_fill, skyline)
+        self.overflow = {}
+
+    def _set_rows(self, grid, masks, row_fill, skyline):
+        self.grid[:] = grid
+        empty_row = self.bitboard.empty_row
+        self.bitboard.rows[:] = [empty_row | mask for mask in masks]
+        self.row_fill[:] = row_fill
+        self.skyline = skyline
+        for frame_row, row in zip(self.frame, grid):
+            frame_row[:] = row
+        self._overlay = []
+
+    def view(self, positions=(), color=None):
+        """
+        Get the grid with a falling piece drawn on top of the locked cells.
+
+        Only the cells covered by the previous and the new piece are touched, the
+        returned grid is shared between calls and must be treated as read-only.
+
+        Args:
+            positions (list, optional): The grid positions of the falling piece.
+            color (tuple, optional): The color of the falling piece (R, G, B).
+
+        Returns:
+            list: A 2D list representing the grid with the piece drawn.
+        """
+        frame = self.frame
+        grid = self.grid
+        for x, y in self._overlay:
+            frame[y][x] = grid[y][x]
+        overlay = [(x, y) for x, y in positions if y > -1]
+        for x, y in overlay:
+            frame[y][x] = color
+        self._overlay = overlay
+        return frame
+
 
 class ShapeOperationStrategy(ABC):
     """
@@ -54,19 +435,8 @@ class ConvertShapeFormatStrategy(ShapeOperationStrategy):
     Strategy to convert a shape's format.
     """
     def execute(self, shape, grid=None):
-        positions = []
-        format = shape.shape[shape.rotation % len(shape.shape)]
-
-        for i, line in enumerate(format):
-            row = list(line)
-            for j, column in enumerate(row):
-                if column == '0':
-                    positions.append((shape.x + j, shape.y + i))
-
-        for i, pos in enumerate(positions):
-            positions[i] = (pos[0] - 2, pos[1] - 4)
-
-        return positions
+        x, y = shape.x, shape.y
+        return [(x + dx, y + dy) for dx, dy in shape.rotation_table.cells]
 
 class ValidSpaceStrategy(ShapeOperationStrategy):
     """
@@ -84,6 +454,14 @@ class ValidSpaceStrategy(ShapeOperationStrategy):
 
         return True
 
+class BitboardValidSpaceStrategy(ShapeOperationStrategy):
+    """
+    Strategy to check if a shape occupies a valid space using row bitmasks.
+    """
+    def execute(self, shape, grid):
+        board = grid if isinstance(grid, Bitboard) else Bitboard.from_grid(grid)
+        return board.fits(shape.rotation_table.row_masks, shape.x, shape.y)
+
 class CheckLostStrategy(ShapeOperationStrategy):
     """
     Strategy to check if the game is lost due to a shape occupying the top row.
@@ -104,7 +482,7 @@ class ShapeOperations:
         Initialize strategies for shape operations.
         """
         self.convert_shape_format_strategy = ConvertShapeFormatStrategy()
-        self.valid_space_strategy = ValidSpaceStrategy()
+        self.valid_space_strategy = BitboardValidSpaceStrategy()
         self.check_lost_strategy = CheckLostStrategy()
 
     def convert_shape_format(self, shape):
@@ -125,7 +503,7 @@ class ShapeOperations:
 
         Args:
             shape (Shape): A Shape object.
-            grid (list): A 2D list representing the grid.
+            grid (list or Bitboard): A 2D list representing the grid, or its Bitboard.
 
         Returns:
             bool: True if the shape occupies a valid space, False otherwise.
@@ -170,10 +548,7 @@ class RowOperations:
                 inc += 1
                 full_rows.append(i)
                 for j in range(len(row)):
-                    try:
-                        del locked[(j, i)]
-                    except:
-                        continue
+                    locked.pop((j, i), None)
 
         # shift rows
         for key in sorted(list(locked), key=lambda x: x[1])[::-1]:
@@ -0,0 +1,147 @@
+# tetris\input.py
+"""
+Keyboard input with delayed auto shift (DAS) and auto repeat rate (ARR), timed by
+the timestamps of the key events rather than by the frames they were read in.
+
+Key presses and releases are queued with the time they happened. At the start of
+every simulation tick the game loop drains the events that happened before the
+tick's deadline, in order, along with the auto repeats that fell due in between,
+so an input lands on the tick it belongs to however long the frame it was read in
+took. The game loop reads the window's events while it sleeps between frames too,
+which stamps them to within a millisecond instead of once per frame.
+
+The time from a key press to the frame showing its effect is kept in a ring
+buffer for the FPS overlay.
+"""
+import math
+from collections import deque
+
+from .constants import GRID_COLUMNS
+from .engine import Input
+from .profiler import RingBuffer
+
+# held key besides the Input values 0-4
+SOFT_DROP = 5
+# inputs repeated while their key is held
+REPEATING = (Input.LEFT, Input.RIGHT)
+
+
+class InputHandler:
+    """
+    Turns timestamped key presses and releases into the inputs of every simulation tick.
+    """
+    def __init__(self, das_ms=167, arr_ms=33, window=120, columns=GRID_COLUMNS):
+        """
+        Initialize the handler with no keys held.
+
+        Args:
+            das_ms (float, optional): Milliseconds left or right must be held before it repeats. Defaults to 167.
+            arr_ms (float, optional): Milliseconds between repeats, 0 to move to the wall at once. Defaults to 33.
+            window (int, optional): Number of latency samples kept. Defaults to 120.
+            columns (int, optional): Number of columns on the board, the most moves a repeat can make.
+                Defaults to GRID_COLUMNS.
+        """
+        self.das = das_ms / 1000
+        self.arr = arr_ms / 1000
+        self.columns = columns
+        self.latencies = RingBuffer(window)
+        self._queue = deque()  # (timestamp, action, pressed) in the order they happened
+        self._held = set()
+        self._shift = None  # (action, time of its next repeat) of the direction being repeated
+        self._soft_drop = False
+        self._pending = []  # timestamps of the presses applied since the last frame was shown
+
+    def press(self, action, timestamp):
+        """
+        Queue a key press.
+
+        Args:
+            action (int): An Input value or SOFT_DROP.
+            timestamp (float): When the key was pressed, in seconds.
+        """
+        self._queue.append((timestamp, action, True))
+
+    def release(self, action, timestamp):
+        """
+        Queue a key release.
+
+        Args:
+            action (int): An Input value or SOFT_DROP.
+            timestamp (float): When the key was released, in seconds.
+        """
+        self._queue.append((timestamp, action, False))
+
+    def poll(self, deadline):
+        """
+        Drain the events that happened before a tick's deadline.
+
+        Args:
+            deadline (float): When the tick ends, on the clock of the event timestamps.
+
+        Returns:
+            tuple: (list of Input values to apply this tick, whether soft drop was held during it).
+        """
+        inputs = []
+        soft_drop = self._soft_drop
+        queue = self._queue
+        while queue and queue[0][0] <= deadline:
+            timestamp, action, pressed = queue.popleft()
+            self._repeat(timestamp, inputs)
+            if pressed:
+                if action in self._held:
+                    continue
+                self._held.add(action)
+                self._pending.append(timestamp)
+                if action == SOFT_DROP:
+                    self._soft_drop = soft_drop = True
+                    continue
+                inputs.append(action)
+                if action in REPEATING:
+                    self._shift = (action, timestamp + self.das)
+            elif action in self._held:
+                self._held.discard(action)
+                if action == SOFT_DROP:
+                    self._soft_drop = False
+                elif self._shift and self._shift[0] == action:
+                    # the other direction, if still held, charges again from here
+                    other = next((held for held in REPEATING if held in self._held), None)
+                    self._shift = None if other is None else (other, timestamp + self.das)
+        self._repeat(deadline, inputs)
+        return inputs, soft_drop
+
+    def _repeat(self, until, inputs):
+        if self._shift is None or self._shift[1] > until:
+            return
+        action, due = self._shift
+        if self.arr:
+            count = int((until - due) // self.arr) + 1
+            due += count * self.arr
+        else:
+            count = self.columns
+            due = math.nextafter(until, math.inf)
+        # moving more than the width of the board only bumps into the wall
+        inputs.extend([action] * min(count, self.columns))
+        self._shift = (action, due)
+
+    def displayed(self, timestamp):
+        """
+        Record the latency of the presses applied since the previous frame, once a frame showing them is up.
+
+        Args:
+            timestamp (float): When the frame was shown, on the clock of the event timestamps.
+        """
+        for pressed in self._pending:
+            self.latencies.append((timestamp - pressed) * 1000)
+        self._pending.clear()
+
+    def latency_ms(self):
+        """
+        Summarize the recent input-to-display latencies for the FPS overlay.
+
+        Returns:
+            tuple: The median and 95th percentile of the recent input-to-display latencies
+                in milliseconds, or None before the first key press was shown.
+        """
+        if not self.latencies.count:
+            return None
+        return self.latencies.percentiles(50, 95)
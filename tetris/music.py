@@ -31,42 +31,106 @@ class MusicPlayerInterface(ABC):
     @abstractmethod
     def check_music(self):
         """
-        Check if the music is playing, and restart it if it has stopped.
+        Get the song that is playing. Track changes are driven by handle_event, not by polling.
 
         Returns:
             str: The filename of the currently playing song.
         """
         pass
 
+    @abstractmethod
+    def handle_event(self, event):
+        """
+        Handle the end-of-track event posted by pygame.mixer.music.
+
+        Args:
+            event (pygame.event.Event): An event from the event queue.
+
+        Returns:
+            bool: True if the event was a music event and was handled.
+        """
+        pass
+
 
 class MusicPlayer(MusicPlayerInterface):
     """
     Class for managing music playback in the game.
+
+    The next track is always queued with pygame.mixer.music.queue while the current one
+    plays, so the mixer switches tracks by itself and the end event only has to queue
+    the one after it. By default the current song is queued again, looping it.
     """
-    def __init__(self):
+    def __init__(self, music_path="assets/music"):
         """
         Initialize the MusicPlayer instance.
+
+        Args:
+            music_path (str, optional): The directory holding the songs. Defaults to "assets/music".
         """
+        self.music_path = music_path
         self.current_song = ""
+        self.queued_song = None
+        self.end_event = pygame.event.custom_type()
+        self._songs = []
+        self._songs_mtime = None
 
     def load_songs(self):
-        songs = []
-        music_path = "assets/music"
-        for song in os.listdir(music_path):
-            if song.endswith('.mp3') or song.endswith('.ogg'):
-                songs.append(os.path.join(music_path, song))
-        return songs
+        # list the directory again only when its contents changed
+        mtime = os.stat(self.music_path).st_mtime
+        if mtime != self._songs_mtime:
+            self._songs = [os.path.join(self.music_path, song) for song in sorted(os.listdir(self.music_path))
+                           if song.endswith('.mp3') or song.endswith('.ogg')]
+            self._songs_mtime = mtime
+        return list(self._songs)
+
+    def play_song(self, song, next_song=None):
+        """
+        Play the specified song and queue the one after it.
 
-    def play_song(self, song):
+        Args:
+            song (str): The path to the song file.
+            next_song (str, optional): The song to queue after it. Defaults to the same song.
+        """
+        if not pygame.mixer.get_init():
+            # deferred from startup until music is first needed
+            pygame.mixer.init()
         self.current_song = song
         pygame.mixer.music.load(self.current_song)
+        pygame.mixer.music.set_endevent(self.end_event)
         pygame.mixer.music.play(0)
+        self.queue_song(next_song or song)
+
+    def queue_song(self, song):
+        """
+        Queue a song to start as soon as the current one ends.
+
+        Args:
+            song (str): The path to the song file.
+        """
+        pygame.mixer.music.queue(song)
+        self.queued_song = song
 
     def check_music(self):
-        if not pygame.mixer.music.get_busy():
-            self.play_song(self.current_song)
         return os.path.basename(self.current_song)
 
+    def handle_event(self, event, next_song=None):
+        """
+        Handle the end-of-track event: the queued song is playing now, queue the next one.
+
+        Args:
+            event (pygame.event.Event): An event from the event queue.
+            next_song (str, optional): The song to queue next. Defaults to looping the current one.
+
+        Returns:
+            bool: True if the event was a music event and was handled.
+        """
+        if event.type != self.end_event:
+            return False
+        # play_song always queues a song, so the end event means the queued one started
+        self.current_song = self.queued_song
+        self.queue_song(next_song or self.current_song)
+        return True
+
 
 class RandomSongDecorator(MusicPlayerInterface):
     """
@@ -80,8 +144,17 @@ class RandomSongDecorator(MusicPlayerInterface):
             music_player (MusicPlayer): A MusicPlayer instance.
         """
         self.music_player = music_player
-        self.songs = self.music_player.load_songs()
-    
+
+    @property
+    def songs(self):
+        """
+        Get the available songs, from the decorated player's playlist cache.
+
+        Returns:
+            list: The paths of the available songs.
+        """
+        return self.music_player.load_songs()
+
     @property
     def current_song(self):
         """
@@ -96,20 +169,32 @@ class RandomSongDecorator(MusicPlayerInterface):
         return self.music_player.load_songs()
 
     def play_song(self, song):
-        self.music_player.play_song(song)
+        self.music_player.play_song(song, self.random_song())
+
+    def random_song(self):
+        """
+        Pick a random song from the available songs.
+
+        Returns:
+            str: The path of the chosen song.
+        """
+        return random.choice(self.songs)
 
     def play_random_song(self):
         """
-        Play a random song from the available songs.
+        Play a random song from the available songs and queue another random one.
 
         Returns:
             str: The filename of the randomly chosen song.
         """
-        song = random.choice(self.songs)
+        song = self.random_song()
         self.play_song(song)
         return os.path.basename(song)
 
     def check_music(self):
-        if not pygame.mixer.music.get_busy():
-            self.play_random_song()
-        return os.path.basename(self.current_song)
+        return self.music_player.check_music()
+
+    def handle_event(self, event):
+        if event.type != self.music_player.end_event:
+            return False
+        return self.music_player.handle_event(event, self.random_song())
@@ -0,0 +1,164 @@
+# tetris\perft.py
+"""
+Move tree enumeration, like perft in chess engines: from a board and a known
+piece sequence, count the distinct boards reachable after every number of
+placements. The counts verify the placement search and the collision and
+clear logic, and their speed is a benchmark of them.
+
+Placements are the final positions a piece reaches from its spawn position by
+moving left, right, rotating and soft dropping (AutoPlayer.placements). Boards
+reached by different placement sequences are merged in a transposition table,
+so every board is expanded once per depth; a placement that tops out ends its
+game and is not counted.
+
+Run with: python -m tetris.perft --seed 1 --depth 3
+"""
+import argparse
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .ai import AutoPlayer, lock_rows
+from .bitboard import Bitboard
+from .constants import GRID_COLUMNS, GRID_ROWS
+from .shapes import SHAPES, PieceGenerator, Piece
+
+# Counts after a number of placements: distinct boards, and placement sequences leading to them
+PerftLevel = namedtuple('PerftLevel', ['depth', 'positions', 'paths'])
+# nodes: placements in the tree, work: placements generated, more than nodes when workers expand shared boards
+PerftResult = namedtuple('PerftResult', ['levels', 'nodes', 'seconds', 'work'])
+
+
+def piece_sequence(seed, count):
+    """
+    Get the shapes a PieceGenerator deals for a seed, as GameState would spawn them.
+
+    Args:
+        seed (int): The seed.
+        count (int): Number of pieces.
+
+    Returns:
+        list: The shape indices.
+    """
+    generator = PieceGenerator(seed)
+    return [SHAPES.index(generator.next_piece().shape) for _ in range(count)]
+
+
+def expand(frontier, shape_index, player, rows=GRID_ROWS, columns=GRID_COLUMNS, expanded=None):
+    """
+    Place one piece on every board of a level.
+
+    Args:
+        frontier (dict): Number of placement sequences by board, a board being its tuple of bitboard rows.
+        shape_index (int): The piece placed on every board.
+        player (AutoPlayer): Enumerates the placements.
+        rows (int, optional): Number of rows on the board. Defaults to GRID_ROWS.
+        columns (int, optional): Number of columns on the board. Defaults to GRID_COLUMNS.
+        expanded (dict, optional): Receives the number of placements generated from every board.
+            Defaults to not recording them.
+
+    Returns:
+        tuple: (the next level as a dict like frontier, number of placements generated).
+    """
+    board = Bitboard(rows, columns)
+    full_row = board.full_row
+    shape = SHAPES[shape_index]
+    piece = Piece(5, 0, shape, None)
+    tables = piece.rotation_tables
+    level = {}
+    nodes = 0
+    for key, paths in frontier.items():
+        board.rows = key
+        start = nodes
+        for rotation, x, y in player.placements(board, piece):
+            nodes += 1
+            after, _, above = lock_rows(key, tables[rotation].row_masks, x, y, full_row)
+            if above or after[0] & full_row:
+                continue
+            after = tuple(after)
+            level[after] = level.get(after, 0) + paths
+        if expanded is not None:
+            expanded[key] = nodes - start
+    return level, nodes
+
+
+def _search(frontier, shapes, rows, columns, record=False):
+    # cache_size=0: boards are merged already, and the placement search is what is measured
+    player = AutoPlayer(cache_size=0)
+    levels = []
+    expansions = [] if record else None
+    nodes = 0
+    for shape_index in shapes:
+        expanded = {} if record else None
+        frontier, generated = expand(frontier, shape_index, player, rows, columns, expanded)
+        nodes += generated
+        levels.append(frontier)
+        if record:
+            expansions.append(expanded)
+    return levels, nodes, expansions
+
+
+def perft(board, shapes, depth, workers=1):
+    """
+    Count the boards reachable after 1 to depth placements.
+
+    Args:
+        board (Bitboard): The starting board.
+        shapes (list): The shape indices of the pieces to place, at least depth of them.
+        depth (int): Number of placements.
+        workers (int, optional): Processes the subtrees of the first placements are split
+            across. Boards shared between subtrees are then expanded once per subtree:
+            the counts and nodes do not change, the work does. Defaults to 1, no extra processes.
+
+    Returns:
+        PerftResult: The counts per depth, the placements in the tree (as generated by one
+            process), the time taken and the placements actually generated.
+    """
+    start = time.perf_counter()
+    rows, columns = board.row_count, board.column_count
+    shapes = list(shapes[:depth])
+    root = {tuple(board.rows): 1}
+    if workers <= 1 or depth < 2:
+        levels, nodes, _ = _search(root, shapes, rows, columns)
+        work = nodes
+    else:
+        first, nodes, _ = _search(root, shapes[:1], rows, columns)
+        work = nodes
+        levels = first + [{} for _ in shapes[1:]]
+        # placements generated per board of every depth, each board counted once as in one process
+        expansions = [{} for _ in shapes[1:]]
+        with ProcessPoolExecutor(workers) as executor:
+            futures = [executor.submit(_search, {key: paths}, shapes[1:], rows, columns, True)
+                       for key, paths in first[0].items()]
+            for future in futures:
+                subtree, generated, expanded = future.result()
+                work += generated
+                for merged, level in zip(levels[1:], subtree):
+                    for key, paths in level.items():
+                        merged[key] = merged.get(key, 0) + paths
+                for merged, level in zip(expansions, expanded):
+                    merged.update(level)
+        nodes += sum(sum(expanded.values()) for expanded in expansions)
+    counts = [PerftLevel(i + 1, len(level), sum(level.values())) for i, level in enumerate(levels)]
+    return PerftResult(counts, nodes, time.perf_counter() - start, work)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Count the boards reachable after a number of placements')
+    parser.add_argument('--depth', type=int, default=3, help='number of placements (default: 3)')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the piece sequence (default: 1)')
+    parser.add_argument('--workers', type=int, default=1, help='processes to split the search across (default: 1)')
+    args = parser.parse_args(argv)
+
+    shapes = piece_sequence(args.seed, args.depth)
+    result = perft(Bitboard(), shapes, args.depth, args.workers)
+    print('pieces: ' + ' '.join(str(shape) for shape in shapes))
+    for level in result.levels:
+        print(f'depth {level.depth}: {level.positions} positions, {level.paths} paths')
+    print(f'{result.nodes} nodes in {result.seconds:.2f}s, {result.nodes / result.seconds:.0f} nodes/s')
+    if result.work != result.nodes:
+        print(f'{result.work} placements generated across workers, {result.work / result.seconds:.0f}/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+# tetris\profiler.py
+"""
+Per-frame phase timing with rolling percentiles.
+
+The game loop marks the end of each sequential phase with lap(); functions
+nested inside a phase (collision checks, line clears, draw calls) are timed
+by instrument(), which wraps them on the instance. Nested calls are reported
+as sub-phases of the phase they ran in, named 'phase/sub-phase', and their
+time is taken out of the phase, so the phases of a frame add up to its total.
+NullProfiler has the same interface but never wraps anything, so a disabled
+profiler costs nothing beyond an empty method call per phase.
+"""
+import csv
+import json
+import time
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of the most recent samples.
+    """
+    def __init__(self, size):
+        """
+        Initialize an empty buffer.
+
+        Args:
+            size (int): The number of samples kept.
+        """
+        self.size = size
+        self.samples = [0.0] * size
+        self.count = 0
+
+    def append(self, value):
+        """
+        Add a sample, overwriting the oldest one when the buffer is full.
+
+        Args:
+            value (float): The sample.
+        """
+        self.samples[self.count % self.size] = value
+        self.count += 1
+
+    def values(self):
+        """
+        Get the kept samples in the order they were added.
+
+        Returns:
+            list: The kept samples, oldest first.
+        """
+        if self.count <= self.size:
+            return self.samples[:self.count]
+        start = self.count % self.size
+        return self.samples[start:] + self.samples[:start]
+
+    def percentiles(self, *percents):
+        """
+        Get percentiles of the kept samples (nearest rank).
+
+        Args:
+            *percents (float): The percentiles to compute, from 0 to 100.
+
+        Returns:
+            tuple: One value per percentile, 0 when the buffer is empty.
+        """
+        values = sorted(self.values())
+        if not values:
+            return tuple(0.0 for _ in percents)
+        last = len(values) - 1
+        return tuple(values[min(last, int(round(percent / 100 * last)))] for percent in percents)
+
+
+class FrameProfiler:
+    """
+    Times the phases of every frame and keeps the last frames of each phase in ring buffers.
+    """
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self, window=600, clock=time.perf_counter):
+        """
+        Initialize the profiler.
+
+        Args:
+            window (int, optional): Number of frames the percentiles are computed over. Defaults to 600.
+            clock (function, optional): Returns the current time in seconds. Defaults to time.perf_counter.
+        """
+        self.window = window
+        self.clock = clock
+        self.phases = {}
+        self.frames = RingBuffer(window)
+        self.frame_count = 0
+        self._current = {}
+        self._nested = {}  # milliseconds of the instrumented calls since the previous lap
+        self._depth = 0
+        self._frame_start = None
+        self._lap_start = None
+
+    def __bool__(self):
+        return True
+
+    def begin_frame(self):
+        """
+        Start timing a frame.
+        """
+        self._frame_start = self._lap_start = self.clock()
+        self._current = {}
+        self._nested = {}
+
+    def lap(self, phase):
+        """
+        End a sequential phase of the frame: the time since the previous lap (or
+        the start of the frame) is added to the phase, less the instrumented calls
+        made meanwhile, which become its sub-phases.
+
+        Args:
+            phase (str): The name of the phase that just ended.
+        """
+        now = self.clock()
+        milliseconds = (now - self._lap_start) * 1000
+        current = self._current
+        for nested, nested_milliseconds in self._nested.items():
+            name = f'{phase}/{nested}'
+            current[name] = current.get(name, 0.0) + nested_milliseconds
+            milliseconds -= nested_milliseconds
+        self._nested = {}
+        current[phase] = current.get(phase, 0.0) + milliseconds
+        self._lap_start = now
+
+    def add(self, phase, milliseconds):
+        """
+        Add time to a phase of the current frame.
+
+        Args:
+            phase (str): The name of the phase.
+            milliseconds (float): The time spent.
+        """
+        self._current[phase] = self._current.get(phase, 0.0) + milliseconds
+
+    def instrument(self, obj, attribute, phase):
+        """
+        Time every call of a method of an object as a sub-phase of the phase it runs in,
+        by wrapping it on the instance. A call made from another instrumented call
+        counts towards the outer one only.
+
+        Args:
+            obj (object): The object whose method is timed.
+            attribute (str): The name of the method.
+            phase (str): The name of the sub-phase the calls are added to.
+        """
+        method = getattr(obj, attribute)
+        clock = self.clock
+
+        def timed(*args, **kwargs):
+            if self._depth:
+                return method(*args, **kwargs)
+            self._depth = 1
+            start = clock()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._nested[phase] = self._nested.get(phase, 0.0) + (clock() - start) * 1000
+                self._depth = 0
+
+        setattr(obj, attribute, timed)
+
+    def end_frame(self):
+        """
+        Finish the frame and push its phase times into the ring buffers.
+        """
+        current = self._current
+        current['total'] = (self.clock() - self._frame_start) * 1000
+        # instrumented calls after the last lap did not run in any phase
+        for phase, milliseconds in self._nested.items():
+            current[phase] = current.get(phase, 0.0) + milliseconds
+        self._nested = {}
+        for phase in self.phases.keys() - current.keys():
+            self.phases[phase].append(0.0)
+        for phase, milliseconds in current.items():
+            buffer = self.phases.get(phase)
+            if buffer is None:
+                buffer = self.phases[phase] = RingBuffer(self.window)
+                # a phase seen for the first time took no time in the earlier frames
+                for _ in range(min(self.frame_count, self.window)):
+                    buffer.append(0.0)
+            buffer.append(milliseconds)
+        self.frames.append(self.frame_count)
+        self.frame_count += 1
+
+    def percentiles(self, phase):
+        """
+        Get the p50/p95/p99 times of a phase over the window.
+
+        Args:
+            phase (str): The name of the phase.
+
+        Returns:
+            tuple: (p50, p95, p99) in milliseconds.
+        """
+        return self.phases[phase].percentiles(*self.PERCENTILES)
+
+    def summary(self):
+        """
+        Get the percentiles of every phase, slowest p99 first.
+
+        Returns:
+            list: (phase, p50, p95, p99) tuples.
+        """
+        rows = [(phase,) + self.percentiles(phase) for phase in self.phases]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def hud_lines(self, fps=None):
+        """
+        Get the overlay text, one line per phase, every phase followed by its sub-phases.
+
+        Args:
+            fps (float, optional): The frame rate, shown on a first line. Defaults to no frame rate.
+
+        Returns:
+            list: The lines, a header coming before the phases.
+        """
+        rows = self.summary()
+        lines = [] if fps is None else [f'FPS: {int(fps)}']
+        lines.append('phase         p50   p95   p99 ms')
+        for phase, p50, p95, p99 in rows:
+            if '/' in phase:
+                continue
+            lines.append(f'{phase[:12]:<12}{p50:6.2f}{p95:6.2f}{p99:6.2f}')
+            lines += [f'  {name.split("/", 1)[1][:10]:<10}{p50:6.2f}{p95:6.2f}{p99:6.2f}'
+                      for name, p50, p95, p99 in rows if name.startswith(phase + '/')]
+        return lines
+
+    def records(self):
+        """
+        Get the phase times of the frames in the window.
+
+        Returns:
+            list: One dict per frame with the frame number and the milliseconds of every phase.
+        """
+        phases = sorted(self.phases)
+        columns = [self.phases[phase].values() for phase in phases]
+        return [dict(frame=frame, **{phase: column[i] for phase, column in zip(phases, columns)})
+                for i, frame in enumerate(self.frames.values())]
+
+    def export(self, path):
+        """
+        Write the frames in the window to a file: CSV when the path ends in .csv, JSON lines otherwise.
+        The last line of a JSON lines file holds the percentiles of every phase.
+
+        Args:
+            path (str): The file to write.
+        """
+        records = self.records()
+        with open(path, 'w', newline='') as file:
+            if path.lower().endswith('.csv'):
+                writer = csv.DictWriter(file, ['frame'] + sorted(self.phases))
+                writer.writeheader()
+                writer.writerows(records)
+            else:
+                for record in records:
+                    file.write(json.dumps(record) + '\n')
+                summary = {phase: dict(zip(('p50', 'p95', 'p99'), values))
+                           for phase, *values in self.summary()}
+                file.write(json.dumps({'percentiles': summary}) + '\n')
+
+
+class NullProfiler:
+    """
+    Disabled profiler with the interface of FrameProfiler: nothing is timed or wrapped.
+    """
+    def __bool__(self):
+        return False
+
+    def begin_frame(self):
+        pass
+
+    def lap(self, phase):
+        pass
+
+    def add(self, phase, milliseconds):
+        pass
+
+    def instrument(self, obj, attribute, phase):
+        pass
+
+    def end_frame(self):
+        pass
+
+    def export(self, path):
+        pass
@@ -0,0 +1,124 @@
+# tetris\protocol.py
+"""
+Messages exchanged between the match server and its clients: one JSON object
+per line. Boards travel as a 200 character string with one character per cell,
+so a state message stays a few hundred bytes.
+
+Client to server:
+    {"type": "join", "name": str}
+    {"type": "input", "inputs": [Input values], "soft_drop": bool}
+    {"type": "stats"}
+    {"type": "matches"}
+    {"type": "spectate", "match": int, "player": int}, answered with the binary frames of tetris.spectate
+Server to client:
+    {"type": "start", "match": int, "player": int, "opponent": str, "seed": int, "tick_rate": int}
+    {"type": "state", "tick": int, "you": state, "opponent": summary}
+    {"type": "end", "winner": int or null}
+    {"type": "stats", ...}
+    {"type": "matches", "matches": [{"match": int, "players": [str, str]}]}
+"""
+import json
+from itertools import chain
+
+from .constants import GARBAGE_COLOR
+from .engine import GameState
+from .gameplay import EMPTY
+from .shapes import SHAPE_COLORS
+
+EMPTY_CELL = '.'
+GARBAGE_CELL = 'G'
+# cell characters: '.' empty, '0'-'6' the shape colors, 'G' garbage
+CELL_COLORS = {str(i): color for i, color in enumerate(SHAPE_COLORS)}
+CELL_COLORS[GARBAGE_CELL] = GARBAGE_COLOR
+COLOR_CELLS = {color: cell for cell, color in CELL_COLORS.items()}
+COLOR_CELLS[EMPTY] = EMPTY_CELL
+
+
+def encode_message(message):
+    """
+    Encode a message as one line of JSON.
+
+    Args:
+        message (dict): The message.
+
+    Returns:
+        bytes: The encoded line, including the newline.
+    """
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def decode_message(line):
+    """
+    Decode a line of JSON.
+
+    Args:
+        line (bytes): The line, with or without the newline.
+
+    Returns:
+        dict: The message.
+    """
+    return json.loads(line)
+
+
+def encode_board(grid):
+    """
+    Encode the locked cells of a grid, one character per cell, row by row.
+
+    Args:
+        grid (Grid): The grid.
+
+    Returns:
+        str: The encoded board.
+    """
+    return ''.join(map(COLOR_CELLS.__getitem__, chain.from_iterable(grid.grid)))
+
+
+def decode_board(board, columns):
+    """
+    Decode a board into locked positions.
+
+    Args:
+        board (str): The encoded board.
+        columns (int): Number of columns on the board.
+
+    Returns:
+        dict: The locked positions.
+    """
+    return {(i % columns, i // columns): CELL_COLORS[cell] for i, cell in enumerate(board) if cell != EMPTY_CELL}
+
+
+def encode_state(state, board=None):
+    """
+    Encode what a client needs to draw a game.
+
+    Args:
+        state (GameState): The game.
+        board (str, optional): The board, when the caller already encoded it. Defaults to encoding it.
+
+    Returns:
+        dict: The encoded state.
+    """
+    return {
+        'board': board if board is not None else encode_board(state.grid),
+        'pieces': [GameState.piece_state(piece) for piece in (state.current_piece, state.next_piece, state.hold_piece)],
+        'score': state.score,
+        'lines': state.lines_cleared,
+        'lost': state.lost,
+    }
+
+
+def apply_state(state, encoded):
+    """
+    Overwrite a client-side game with a state from the server.
+
+    Args:
+        state (GameState): The client's copy of the game.
+        encoded (dict): A state made by encode_state.
+    """
+    snapshot = state.snapshot()
+    snapshot['locked_positions'] = decode_board(encoded['board'], state.grid.columns)
+    snapshot['pieces'] = encoded['pieces']
+    snapshot['flags'] = (state.hold_switched, False, encoded['lost'])
+    fall_time, _, _, pieces_placed, ld_time, ld_resets = snapshot['counters']
+    snapshot['counters'] = (fall_time, encoded['score'], encoded['lines'], pieces_placed, ld_time, ld_resets)
+    state.restore(snapshot)
@@ -0,0 +1,337 @@
+# tetris\replay.py
+"""
+Recording and deterministic playback of games.
+
+A replay is the seed of the game's PieceGenerator plus the inputs of every
+simulation tick. Since GameState is deterministic for a seed, a fixed tick
+length and the same inputs, that is all it takes to reproduce a session.
+
+Binary layout (little endian):
+    header:  b'TRPL', version (u8), seed (u64), tick rate (u16)
+    records: varint of (ticks since previous record << 3 | code)
+where code is an Input value, SOFT_DROP_ON, SOFT_DROP_OFF or END.
+"""
+import struct
+import sys
+import time
+
+from .engine import GameState
+
+MAGIC = b'TRPL'
+VERSION = 1
+HEADER = struct.Struct('<4sBQH')
+
+# record codes besides the Input values 0-4
+SOFT_DROP_ON = 5
+SOFT_DROP_OFF = 6
+END = 7
+CODE_BITS = 3
+
+
+def encode_varint(value, out):
+    """
+    Append an unsigned LEB128 varint to a bytearray.
+
+    Args:
+        value (int): The non-negative number to encode.
+        out (bytearray): The buffer to append to.
+    """
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, offset):
+    """
+    Read an unsigned LEB128 varint.
+
+    Args:
+        data (bytes): The buffer to read from.
+        offset (int): Where the varint starts.
+
+    Returns:
+        tuple: (value, offset after the varint)
+    """
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+class Replay:
+    """
+    A recorded session: the seed, the tick rate and the (tick, code) records.
+    """
+    def __init__(self, seed, tick_rate=60, records=None, end_tick=0):
+        """
+        Initialize a replay.
+
+        Args:
+            seed (int): Seed of the game's PieceGenerator.
+            tick_rate (int, optional): Simulation ticks per second. Defaults to 60.
+            records (list, optional): (tick, code) pairs in tick order.
+            end_tick (int, optional): Number of ticks in the session.
+        """
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.records = records if records is not None else []
+        self.end_tick = end_tick
+
+    @property
+    def tick_ms(self):
+        """
+        Get the length of a simulation tick.
+
+        Returns:
+            float: Milliseconds simulated per tick.
+        """
+        return 1000 / self.tick_rate
+
+    def to_bytes(self):
+        """
+        Encode the replay in the binary format.
+
+        Returns:
+            bytes: The encoded replay.
+        """
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.seed, self.tick_rate))
+        previous = 0
+        for tick, code in self.records:
+            encode_varint((tick - previous) << CODE_BITS | code, out)
+            previous = tick
+        encode_varint((self.end_tick - previous) << CODE_BITS | END, out)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Decode a replay from the binary format.
+
+        Args:
+            data (bytes): The encoded replay.
+
+        Returns:
+            Replay: The decoded replay.
+
+        Raises:
+            ValueError: If the data is not a replay of a supported version.
+        """
+        if len(data) < HEADER.size:
+            raise ValueError('Replay data is truncated')
+        magic, version, seed, tick_rate = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a version {} replay'.format(VERSION))
+
+        records = []
+        tick = 0
+        offset = HEADER.size
+        while offset < len(data):
+            value, offset = decode_varint(data, offset)
+            tick += value >> CODE_BITS
+            code = value & (1 << CODE_BITS) - 1
+            if code == END:
+                return cls(seed, tick_rate, records, tick)
+            records.append((tick, code))
+        raise ValueError('Replay data is truncated')
+
+    def save(self, path):
+        """
+        Write the replay to a file.
+
+        Args:
+            path (str): The file to write.
+        """
+        with open(path, 'wb') as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read a replay from a file.
+
+        Args:
+            path (str): The file to read.
+
+        Returns:
+            Replay: The loaded replay.
+        """
+        with open(path, 'rb') as file:
+            return cls.from_bytes(file.read())
+
+
+class ReplayRecorder:
+    """
+    Builds a Replay from the inputs a game receives, one call per simulation tick.
+    """
+    def __init__(self, seed, tick_rate=60):
+        """
+        Initialize the recorder.
+
+        Args:
+            seed (int): Seed of the recorded game's PieceGenerator.
+            tick_rate (int, optional): Simulation ticks per second. Defaults to 60.
+        """
+        self.replay = Replay(seed, tick_rate)
+        self.tick = 0
+        self.soft_drop = False
+
+    def record(self, inputs, soft_drop):
+        """
+        Record the inputs of one tick, right before they are passed to GameState.step.
+
+        Args:
+            inputs (list): Input values applied this tick.
+            soft_drop (bool): Whether the soft drop key is held.
+        """
+        records = self.replay.records
+        soft_drop = bool(soft_drop)
+        if soft_drop != self.soft_drop:
+            records.append((self.tick, SOFT_DROP_ON if soft_drop else SOFT_DROP_OFF))
+            self.soft_drop = soft_drop
+        for action in inputs:
+            records.append((self.tick, action))
+        self.tick += 1
+        self.replay.end_tick = self.tick
+
+    def save(self, path):
+        """
+        Write what was recorded so far to a file.
+
+        Args:
+            path (str): The file to write.
+        """
+        self.replay.save(path)
+
+
+class ReplayPlayer:
+    """
+    Plays a Replay back on a GameState, tick by tick or as fast as possible,
+    taking keyframe snapshots on the way so any tick can be sought quickly.
+    """
+    def __init__(self, replay, keyframe_interval=600):
+        """
+        Initialize the player at tick 0.
+
+        Args:
+            replay (Replay): The replay to play.
+            keyframe_interval (int, optional): Ticks between keyframe snapshots. Defaults to 600.
+        """
+        self.replay = replay
+        self.keyframe_interval = keyframe_interval
+        self.state = GameState(seed=replay.seed)
+        self.tick = 0
+        self.soft_drop = False
+        self._record_index = 0
+        self._keyframes = {}
+        self._save_keyframe()
+
+    @property
+    def finished(self):
+        """
+        Check whether playback reached the end of the replay.
+
+        Returns:
+            bool: Whether the whole replay was played.
+        """
+        return self.tick >= self.replay.end_tick
+
+    def _save_keyframe(self):
+        self._keyframes[self.tick] = (self.state.pack(), self._record_index, self.soft_drop)
+
+    def keyframes(self):
+        """
+        Get the keyframes taken so far.
+
+        Returns:
+            list: (tick, packed state, record index, soft drop) in tick order, where the
+                packed state is made by GameState.pack and the record index is the first
+                record of the tick.
+        """
+        return [(tick,) + self._keyframes[tick] for tick in sorted(self._keyframes)]
+
+    def advance(self, ticks=1):
+        """
+        Play the next ticks of the replay.
+
+        Args:
+            ticks (int, optional): Number of ticks to play. Defaults to 1.
+
+        Returns:
+            int: The number of rows cleared.
+        """
+        records = self.replay.records
+        tick_ms = self.replay.tick_ms
+        state = self.state
+        cleared = 0
+        end = min(self.tick + ticks, self.replay.end_tick)
+        while self.tick < end:
+            inputs = []
+            while self._record_index < len(records) and records[self._record_index][0] == self.tick:
+                code = records[self._record_index][1]
+                if code == SOFT_DROP_ON:
+                    self.soft_drop = True
+                elif code == SOFT_DROP_OFF:
+                    self.soft_drop = False
+                else:
+                    inputs.append(code)
+                self._record_index += 1
+            cleared += state.step(inputs, tick_ms, self.soft_drop)
+            self.tick += 1
+            if self.tick % self.keyframe_interval == 0 and self.tick not in self._keyframes:
+                self._save_keyframe()
+        return cleared
+
+    def run(self):
+        """
+        Play the rest of the replay headless, as fast as possible.
+
+        Returns:
+            GameState: The game at the end of the replay.
+        """
+        self.advance(self.replay.end_tick - self.tick)
+        return self.state
+
+    def seek(self, tick):
+        """
+        Move to a tick, restoring the nearest earlier keyframe and playing on from there.
+
+        Args:
+            tick (int): The tick to move to, clamped to the length of the replay.
+
+        Returns:
+            GameState: The game at that tick.
+        """
+        tick = max(0, min(tick, self.replay.end_tick))
+        keyframe_tick = max(keyframe for keyframe in self._keyframes if keyframe <= tick)
+        if tick < self.tick or keyframe_tick > self.tick:
+            packed, self._record_index, self.soft_drop = self._keyframes[keyframe_tick]
+            self.state.unpack(packed)
+            self.tick = keyframe_tick
+        self.advance(tick - self.tick)
+        return self.state
+
+
+def main(argv=None):
+    """
+    Play replay files headless and print how each game ended.
+
+    Args:
+        argv (list, optional): The replay files. Defaults to the command line arguments.
+    """
+    for path in (sys.argv[1:] if argv is None else argv):
+        replay = Replay.load(path)
+        start = time.perf_counter()
+        state = ReplayPlayer(replay).run()
+        seconds = time.perf_counter() - start
+        print('{}: {} ticks ({:.1f}s of play) in {:.2f}s, score {}, lines {}, pieces {}{}'.format(
+            path, replay.end_tick, replay.end_tick / replay.tick_rate, seconds,
+            state.score, state.lines_cleared, state.pieces_placed, ', lost' if state.lost else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,461 @@
+# tetris\server.py
+"""
+Authoritative versus match server hosting many matches in one asyncio process.
+
+Players connect over TCP and are paired in the order they join. Every match
+runs one GameState per player on the server; clients only send inputs and
+draw the states the server sends back each tick. Clearing two or more rows
+sends garbage rows to the opponent, which rise under their board when their
+next piece locks. Clients are not trusted: inputs are validated and capped per
+message and per tick, and a client that stops reading what is sent to it is
+disconnected rather than buffered for without limit.
+
+Run with: python -m tetris.server --port 7777
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+from .engine import GameState, Input
+from .profiler import RingBuffer
+from .protocol import decode_message, encode_board, encode_message, encode_state
+from .spectate import DeltaEncoder, end_frame, frame_bytes
+
+# garbage rows sent for the rows cleared at once
+GARBAGE_LINES = {0: 0, 1: 0, 2: 1, 3: 2, 4: 4}
+VALID_INPUTS = frozenset((Input.LEFT, Input.RIGHT, Input.ROTATE, Input.HARD_DROP, Input.HOLD))
+# inputs accepted from one message, queued for a player and applied in one tick; the rest are dropped
+MAX_MESSAGE_INPUTS = 32
+MAX_QUEUED_INPUTS = 64
+MAX_TICK_INPUTS = 16
+# longest message line read from a client, longer lines disconnect it
+MAX_LINE = 4096
+# bytes waiting to be sent to a client after which it is considered stalled and disconnected
+MAX_WRITE_BUFFER = 256 * 1024
+
+
+def send_bytes(writer, data):
+    """
+    Queue data to a client, disconnecting it instead when it stopped reading what was sent.
+
+    Args:
+        writer (asyncio.StreamWriter): The connection to the client.
+        data (bytes): The data.
+
+    Returns:
+        bool: Whether the data was queued.
+    """
+    if writer.is_closing():
+        return False
+    if writer.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+        # close() would wait for the buffer to be sent, which a stalled client never lets happen
+        writer.transport.abort()
+        return False
+    writer.write(data)
+    return True
+
+
+class Player:
+    """
+    A connected client and, once matched, its game.
+    """
+    def __init__(self, name, writer):
+        """
+        Initialize a player that is not in a match yet.
+
+        Args:
+            name (str): The name the player joined with.
+            writer (asyncio.StreamWriter): The connection to the client.
+        """
+        self.name = name
+        self.writer = writer
+        self.inputs = []
+        self.soft_drop = False
+        self.match = None
+        self.index = None
+        self.state = None
+        self.pending_garbage = 0
+        self.spectators = []  # writers of the spectator streams of this player's board
+        self.encoder = None
+        self._board = (None, None)
+
+    def encoded_board(self):
+        """
+        Get the encoded board of the player's game, encoding it again only after a piece
+        locked (which is also when rows clear and garbage rises).
+
+        Returns:
+            str: The encoded board.
+        """
+        key, board = self._board
+        if key != (self.state, self.state.pieces_placed):
+            key = (self.state, self.state.pieces_placed)
+            board = encode_board(self.state.grid)
+            self._board = (key, board)
+        return board
+
+    def send(self, message):
+        """
+        Queue a message to the client, unless the connection is closing or stalled.
+
+        Args:
+            message (dict): The message.
+        """
+        send_bytes(self.writer, encode_message(message))
+
+    def queue_inputs(self, inputs):
+        """
+        Queue the inputs of an input message for the next ticks. Unknown inputs and
+        inputs past the per-message and queue limits are dropped.
+
+        Args:
+            inputs (list): The inputs of the message.
+
+        Raises:
+            ValueError: If inputs is not a list.
+        """
+        if not isinstance(inputs, list):
+            raise ValueError('inputs must be a list')
+        room = MAX_QUEUED_INPUTS - len(self.inputs)
+        valid = [action for action in inputs[:MAX_MESSAGE_INPUTS]
+                 if type(action) is int and action in VALID_INPUTS]
+        self.inputs.extend(valid[:room])
+
+
+class Match:
+    """
+    A versus match between two players, advanced one fixed tick at a time.
+    """
+    def __init__(self, match_id, players, seed, tick_rate):
+        """
+        Initialize the match. Both players get the same piece sequence.
+
+        Args:
+            match_id (int): The id of the match.
+            players (list): The two Player objects.
+            seed (int): Seed of the piece generators and garbage holes.
+            tick_rate (int): Simulation ticks per second.
+        """
+        self.id = match_id
+        self.players = players
+        self.seed = seed
+        self.tick_rate = tick_rate
+        self.tick_ms = 1000 / tick_rate
+        self.tick = 0
+        self.finished = False
+        self.winner = None
+        self.rng = random.Random(seed)
+        for index, player in enumerate(players):
+            player.match = self
+            player.index = index
+            player.state = GameState(seed=seed)
+            player.pending_garbage = 0
+            player.encoder = DeltaEncoder()
+
+    def opponent(self, player):
+        """
+        Get the player a player is matched against.
+
+        Args:
+            player (Player): A player of the match.
+
+        Returns:
+            Player: The other player.
+        """
+        return self.players[1 - player.index]
+
+    def start(self):
+        """
+        Tell both players the match started.
+        """
+        for player in self.players:
+            player.send({'type': 'start', 'match': self.id, 'player': player.index,
+                         'opponent': self.opponent(player).name, 'seed': self.seed, 'tick_rate': self.tick_rate})
+
+    def step(self):
+        """
+        Advance both games by one tick with the inputs received since the previous
+        one, then exchange garbage.
+        """
+        for player in self.players:
+            state = player.state
+            inputs, player.inputs = player.inputs[:MAX_TICK_INPUTS], player.inputs[MAX_TICK_INPUTS:]
+            pieces_placed = state.pieces_placed
+            cleared = state.step(inputs, self.tick_ms, player.soft_drop)
+
+            # garbage sent first cancels the garbage waiting to rise under the sender
+            attack = GARBAGE_LINES.get(cleared, cleared)
+            cancelled = min(attack, player.pending_garbage)
+            player.pending_garbage -= cancelled
+            self.opponent(player).pending_garbage += attack - cancelled
+
+            if state.pieces_placed > pieces_placed and player.pending_garbage and not state.lost:
+                state.add_garbage(player.pending_garbage, self.rng.randrange(state.grid.columns))
+                player.pending_garbage = 0
+        self.tick += 1
+
+        losers = [player.index for player in self.players if player.state.lost]
+        if losers:
+            self.finish(None if len(losers) == 2 else 1 - losers[0])
+
+    def finish(self, winner):
+        """
+        End the match and tell both players who won.
+
+        Args:
+            winner (int): Index of the winner, or None for a draw.
+        """
+        self.finished = True
+        self.winner = winner
+        for player in self.players:
+            player.send({'type': 'end', 'winner': winner})
+            player.match = None
+            frame = frame_bytes(end_frame(winner == player.index))
+            for writer in player.spectators:
+                send_bytes(writer, frame)
+                writer.close()
+            player.spectators = []
+
+    def broadcast(self):
+        """
+        Send every player its game and a summary of the opponent's.
+        """
+        for player in self.players:
+            opponent = self.opponent(player).state
+            player.send({
+                'type': 'state',
+                'tick': self.tick,
+                'garbage': player.pending_garbage,
+                'you': encode_state(player.state, player.encoded_board()),
+                'opponent': {'score': opponent.score, 'lines': opponent.lines_cleared,
+                             'height': max(opponent.grid.skyline.heights()), 'lost': opponent.lost},
+            })
+            if player.spectators:
+                # encoded once, however many spectators watch
+                frame = frame_bytes(player.encoder.encode(player.state, self.tick))
+                for writer in player.spectators:
+                    send_bytes(writer, frame)
+
+    def spectate(self, index, writer):
+        """
+        Add a spectator of a player's board. It receives a keyframe on the next tick.
+
+        Args:
+            index (int): Index of the watched player.
+            writer (asyncio.StreamWriter): The spectator's connection.
+        """
+        player = self.players[index]
+        player.spectators.append(writer)
+        player.encoder.request_keyframe()
+
+    def stop_spectating(self, writer):
+        """
+        Remove a spectator that disconnected.
+
+        Args:
+            writer (asyncio.StreamWriter): The spectator's connection.
+        """
+        for player in self.players:
+            if writer in player.spectators:
+                player.spectators.remove(writer)
+
+
+class MatchServer:
+    """
+    Accepts players, pairs them into matches and ticks every match from a single loop.
+    """
+    def __init__(self, host='127.0.0.1', port=7777, tick_rate=60, seed=None):
+        """
+        Initialize the server.
+
+        Args:
+            host (str, optional): The address to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): The TCP port, 0 for any free port. Defaults to 7777.
+            tick_rate (int, optional): Simulation ticks per second. Defaults to 60.
+            seed (int, optional): Seed for the match seeds. Defaults to a random seed.
+        """
+        self.host = host
+        self.port = port
+        self.tick_rate = tick_rate
+        self.rng = random.Random(seed)
+        self.waiting = None
+        self.matches = {}
+        self.match_ids = itertools.count(1)
+        self.matches_played = 0
+        self.tick_times = RingBuffer(600)  # milliseconds spent ticking every match
+        self.tick_lateness = RingBuffer(600)  # milliseconds a tick started after it was due
+        self.server = None
+        self._tick_task = None
+
+    async def start(self):
+        """
+        Start listening and ticking. The port is updated when 0 was requested.
+        """
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port, limit=MAX_LINE)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._tick_task = asyncio.get_running_loop().create_task(self.run_ticks())
+
+    async def handle_client(self, reader, writer):
+        """
+        Read the messages of one client until it disconnects.
+
+        Args:
+            reader (asyncio.StreamReader): The incoming side of the connection.
+            writer (asyncio.StreamWriter): The outgoing side of the connection.
+        """
+        player = None
+        watching = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = decode_message(line)
+                    kind = message['type']
+                except (ValueError, KeyError, TypeError):
+                    break
+                if kind == 'input' and player is not None:
+                    try:
+                        player.queue_inputs(message.get('inputs', []))
+                    except ValueError:
+                        break
+                    player.soft_drop = bool(message.get('soft_drop'))
+                elif kind == 'join' and player is None and watching is None:
+                    player = Player(str(message.get('name', 'player'))[:32], writer)
+                    self.join(player)
+                elif kind == 'join' and player is not None and player.match is None and self.waiting is not player:
+                    self.join(player)
+                elif kind == 'stats':
+                    send_bytes(writer, encode_message(self.stats()))
+                elif kind == 'matches':
+                    send_bytes(writer, encode_message({'type': 'matches', 'matches': [
+                        {'match': match.id, 'players': [player.name for player in match.players]}
+                        for match in self.matches.values()]}))
+                elif kind == 'spectate' and player is None and watching is None:
+                    # from here on the connection carries the binary frames of tetris.spectate
+                    match_id = message.get('match')
+                    watching = (self.matches.get(match_id) if match_id is not None
+                                else next(iter(self.matches.values()), None))
+                    if watching is None:
+                        break
+                    watching.spectate(1 if message.get('player') == 1 else 0, writer)
+        except (ConnectionError, ValueError):
+            # ValueError: readline got a line longer than MAX_LINE
+            pass
+        finally:
+            if watching is not None:
+                watching.stop_spectating(writer)
+            self.leave(player)
+            writer.close()
+
+    def join(self, player):
+        """
+        Pair a player with the one waiting, or make it wait.
+
+        Args:
+            player (Player): The player looking for a match.
+        """
+        if self.waiting is None or self.waiting.writer.is_closing():
+            self.waiting = player
+            return
+        match = Match(next(self.match_ids), [self.waiting, player], self.rng.getrandbits(63), self.tick_rate)
+        self.waiting = None
+        self.matches[match.id] = match
+        match.start()
+
+    def leave(self, player):
+        """
+        Remove a disconnected player; its opponent wins.
+
+        Args:
+            player (Player): The player that left, or None if it never joined.
+        """
+        if player is None:
+            return
+        if self.waiting is player:
+            self.waiting = None
+        match = player.match
+        if match is not None and not match.finished:
+            match.finish(1 - player.index)
+
+    async def run_ticks(self):
+        """
+        Tick every match at the tick rate, measuring how long ticks take and how late they start.
+        """
+        loop = asyncio.get_running_loop()
+        tick_seconds = 1 / self.tick_rate
+        next_tick = loop.time()
+        while True:
+            next_tick += tick_seconds
+            delay = next_tick - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                # let the connections be served even when ticks run behind
+                await asyncio.sleep(0)
+            start = loop.time()
+            self.tick_lateness.append(max(start - next_tick, 0) * 1000)
+            self.tick_all()
+            self.tick_times.append((loop.time() - start) * 1000)
+            if start - next_tick > 10 * tick_seconds:
+                # too far behind to catch up: drop the missed ticks
+                next_tick = start
+
+    def tick_all(self):
+        """
+        Advance every match by one tick and send the new states.
+        """
+        for match in list(self.matches.values()):
+            if not match.finished:
+                match.step()
+                match.broadcast()
+            if match.finished:
+                del self.matches[match.id]
+                self.matches_played += 1
+
+    def stats(self):
+        """
+        Get the load of the server.
+
+        Returns:
+            dict: The stats message.
+        """
+        tick_p50, tick_p95, tick_p99 = self.tick_times.percentiles(50, 95, 99)
+        late_p50, late_p95, late_p99 = self.tick_lateness.percentiles(50, 95, 99)
+        return {
+            'type': 'stats',
+            'matches': len(self.matches),
+            'matches_played': self.matches_played,
+            'tick_budget_ms': 1000 / self.tick_rate,
+            'tick_ms': {'p50': tick_p50, 'p95': tick_p95, 'p99': tick_p99},
+            'late_ms': {'p50': late_p50, 'p95': late_p95, 'p99': late_p99},
+            'cpu_seconds': time.process_time(),
+            'wall_seconds': time.perf_counter(),
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tetris versus match server')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=7777, help='TCP port, 0 for any free port (default: 7777)')
+    parser.add_argument('--tick-rate', type=int, default=60, help='simulation ticks per second (default: 60)')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = MatchServer(args.host, args.port, args.tick_rate)
+        await server.start()
+        print(f'listening on {server.host}:{server.port}', flush=True)
+        async with server.server:
+            await server.server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 # tetris\shapes.py
 import random
+from collections import namedtuple
 
 # SHAPE FORMATS
 S = [['.....',
@@ -107,24 +108,176 @@ T = [['.....',
 SHAPES = [S, Z, I, O, J, L, T]
 SHAPE_COLORS = [(0, 255, 0), (255, 0, 0), (0, 255, 255), (255, 255, 0), (255, 165, 0), (0, 0, 255), (128, 0, 128)]
 
+# Offset between a 5x5 template and the piece's (x, y) position on the grid
+TEMPLATE_OFFSET_X = 2
+TEMPLATE_OFFSET_Y = 4
+
+# Precompiled data for one rotation of a shape:
+#   cells          (dx, dy) offsets of the blocks relative to the piece position
+#   blocks         (column, row) of the blocks inside the 5x5 template
+#   bounding_box   (min_dx, min_dy, max_dx, max_dy) of the cells
+#   bottom_profile (dx, lowest dy) for every column the rotation covers
+#   row_masks      (dy, mask) per occupied row, bit j set for template column j
+RotationTable = namedtuple('RotationTable', ['cells', 'blocks', 'bounding_box', 'bottom_profile', 'row_masks'])
+
+
+def compile_rotation(shape_format):
+    """
+    Compile a single 5x5 shape template into a RotationTable.
+
+    Args:
+        shape_format (list): The template strings of a single rotation.
+
+    Returns:
+        RotationTable: The precompiled lookup data for the rotation.
+    """
+    blocks = tuple((j, i) for i, line in enumerate(shape_format)
+                   for j, column in enumerate(line) if column == '0')
+    cells = tuple((j - TEMPLATE_OFFSET_X, i - TEMPLATE_OFFSET_Y) for j, i in blocks)
+
+    xs = [dx for dx, _ in cells]
+    ys = [dy for _, dy in cells]
+    bounding_box = (min(xs), min(ys), max(xs), max(ys))
+
+    lowest = {}
+    masks = {}
+    for dx, dy in cells:
+        lowest[dx] = max(lowest.get(dx, dy), dy)
+        masks[dy] = masks.get(dy, 0) | 1 << (dx + TEMPLATE_OFFSET_X)
+    bottom_profile = tuple(sorted(lowest.items()))
+    row_masks = tuple(sorted(masks.items()))
+
+    return RotationTable(cells, blocks, bounding_box, bottom_profile, row_masks)
+
+
+class ShapeRegistry:
+    """
+    Registry of precompiled rotation tables, keyed by shape definition.
+    """
+    def __init__(self, shapes=()):
+        """
+        Initialize the registry and compile the given shapes.
+
+        Args:
+            shapes (list, optional): Shape definitions to compile up front.
+        """
+        self._tables = {}
+        self._shapes = []
+        for shape in shapes:
+            self.rotations(shape)
+
+    def rotations(self, shape):
+        """
+        Get the rotation tables of a shape, compiling them on first use.
+
+        Args:
+            shape (list): A shape definition (list of rotation templates).
+
+        Returns:
+            tuple: One RotationTable per rotation of the shape.
+        """
+        tables = self._tables.get(id(shape))
+        if tables is None:
+            tables = tuple(compile_rotation(shape_format) for shape_format in shape)
+            self._tables[id(shape)] = tables
+            # keep a reference to the shape so its id cannot be reused
+            self._shapes.append(shape)
+        return tables
+
+
+SHAPE_REGISTRY = ShapeRegistry(SHAPES)
+
+
+class PieceGenerator:
+    """
+    Seedable source of random shapes (SplitMix64), so a game can be replayed
+    from its seed. The whole generator state is a single 64-bit integer.
+    """
+    MASK = (1 << 64) - 1
+
+    def __init__(self, seed=None):
+        """
+        Initialize the generator.
+
+        Args:
+            seed (int, optional): The seed. Defaults to a random 64-bit seed.
+        """
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed & self.MASK
+        self.state = self.seed
+
+    def next_int(self):
+        """
+        Advance the generator by one SplitMix64 step.
+
+        Returns:
+            int: The next 64-bit random number.
+        """
+        self.state = (self.state + 0x9E3779B97F4A7C15) & self.MASK
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & self.MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & self.MASK
+        return z ^ (z >> 31)
+
+    def choice(self, sequence):
+        """
+        Pick a random element, like random.choice.
+
+        Args:
+            sequence (list): The elements to pick from.
+
+        Returns:
+            object: The picked element.
+        """
+        return sequence[self.next_int() % len(sequence)]
+
+    def next_piece(self):
+        """
+        Get the next random piece at the spawn position.
+
+        Returns:
+            Piece: The new tetromino piece.
+        """
+        return ShapeFactory.create_piece(5, 0, self)
+
+    def getstate(self):
+        """
+        Get the position in the sequence, like random.getstate.
+
+        Returns:
+            int: The generator state, to be passed to setstate.
+        """
+        return self.state
+
+    def setstate(self, state):
+        """
+        Restore a state returned by getstate.
+
+        Args:
+            state (int): The generator state.
+        """
+        self.state = state
+
 
 class ShapeFactory:
     """
     A factory class for creating random tetromino shapes.
     """
     @staticmethod
-    def create_piece(column, row):
+    def create_piece(column, row, rng=None):
         """
         Create a random tetromino piece at the specified column and row.
 
         Args:
             column (int): The starting column for the piece.
             row (int): The starting row for the piece.
+            rng (PieceGenerator, optional): Source of randomness with a choice method. Defaults to the random module.
 
         Returns:
             Piece: The randomly created tetromino piece.
         """
-        shape = random.choice(SHAPES)
+        shape = (rng or random).choice(SHAPES)
         return Piece(column, row, shape, SHAPE_COLORS[SHAPES.index(shape)])
 
 
@@ -148,6 +301,17 @@ class Piece:
         self.shape = shape
         self.color = color
         self.rotation = rotation
+        self.rotation_tables = SHAPE_REGISTRY.rotations(shape)
+
+    @property
+    def rotation_table(self):
+        """
+        Get the precompiled table of the current rotation.
+
+        Returns:
+            RotationTable: The cells, bounding box, bottom profile and row masks of the current rotation.
+        """
+        return self.rotation_tables[self.rotation % len(self.rotation_tables)]
 
     def ghost_piece_position(self, grid, valid_space_func):
         """
@@ -0,0 +1,275 @@
+# tetris\spectate.py
+"""
+Compact binary stream of one board for spectators.
+
+Each tick becomes one frame. A keyframe carries the whole board (two cells per
+byte) and a delta only what changed since the previous frame: the cells that
+changed, the falling piece, the next and hold pieces and the score. Keyframes
+are sent periodically and whenever a new spectator joins, so late joiners
+can sync.
+
+Frame layout (little endian):
+    keyframe: b'K', tick (u32), 100 bytes of packed cells, piece (4 bytes),
+              next (u8), hold (u8), score (u32)
+    delta:    b'D', ticks since the previous frame (u8), flags (u8), then per flag:
+              CELLS: count (u8) and (cell index (u8), cell code (u8)) pairs
+              PIECE: piece (4 bytes); NEXT: u8; HOLD: u8; SCORE: u32
+    end:      b'E', winner flag (u8)
+where a piece is (shape index, x, y, rotation) as (u8, i8, i8, u8), 0xFF is no piece,
+and a cell code is one of the cell codes of tetris.engine's packed states.
+On the wire every frame is prefixed with its length (u16).
+"""
+import struct
+
+from .constants import GRID_COLUMNS, GRID_ROWS
+from .engine import CODE_COLORS, NO_PIECE, board_cells, packed_piece, unpacked_piece
+from .shapes import SHAPES
+
+KEYFRAME = b'K'
+DELTA = b'D'
+END = b'E'
+
+CELLS = 1
+PIECE = 2
+NEXT = 4
+HOLD = 8
+SCORE = 16
+
+PIECE_FORMAT = struct.Struct('<BbbB')
+KEYFRAME_HEADER = struct.Struct('<cI')
+KEYFRAME_TAIL = struct.Struct('<BbbBBBI')
+LENGTH = struct.Struct('<H')
+
+
+def shape_index(piece):
+    """
+    Get the shape index a next or hold piece is streamed as.
+
+    Args:
+        piece (Piece): The piece, or None.
+
+    Returns:
+        int: The shape index of the piece, NO_PIECE for no piece.
+    """
+    return NO_PIECE if piece is None else SHAPES.index(piece.shape)
+
+
+def frame_bytes(frame):
+    """
+    Prefix a frame with its length for the wire.
+
+    Args:
+        frame (bytes): The frame.
+
+    Returns:
+        bytes: The length-prefixed frame.
+    """
+    return LENGTH.pack(len(frame)) + frame
+
+
+def end_frame(won):
+    """
+    Get the frame that ends a stream.
+
+    Args:
+        won (bool): Whether the player of the board won the match.
+
+    Returns:
+        bytes: The frame.
+    """
+    return END + bytes((bool(won),))
+
+
+class DeltaEncoder:
+    """
+    Turns the states of one game, tick after tick, into keyframes and deltas.
+    """
+    def __init__(self, keyframe_interval=300):
+        """
+        Initialize the encoder. The first frame is always a keyframe.
+
+        Args:
+            keyframe_interval (int, optional): Ticks between keyframes. Defaults to 300.
+        """
+        self.keyframe_interval = keyframe_interval
+        self.cells = None
+        self.piece = None
+        self.next_shape = None
+        self.hold_shape = None
+        self.score = None
+        self.tick = None
+        self._keyframe_tick = None
+        self._board_key = None
+        self._force_keyframe = True
+
+    def request_keyframe(self):
+        """
+        Make the next frame a keyframe, e.g. because a spectator joined.
+        """
+        self._force_keyframe = True
+
+    def encode(self, state, tick):
+        """
+        Encode the state of the game at a tick.
+
+        Args:
+            state (GameState): The game.
+            tick (int): The tick of the state, increasing from frame to frame.
+
+        Returns:
+            bytes: The frame.
+        """
+        # the locked cells only change when a piece locks (rows clear and garbage rises then too)
+        board_key = (state.grid, state.pieces_placed)
+        cells = self.cells if board_key == self._board_key else board_cells(state.grid)
+        self._board_key = board_key
+        piece = packed_piece(state.current_piece)
+        next_shape = shape_index(state.next_piece)
+        hold_shape = shape_index(state.hold_piece)
+        score = state.score
+
+        if (self._force_keyframe or tick - self._keyframe_tick >= self.keyframe_interval
+                or tick - self.tick > 0xFF):
+            frame = self._keyframe(cells, piece, next_shape, hold_shape, score, tick)
+        else:
+            frame = self._delta(cells, piece, next_shape, hold_shape, score, tick)
+        self.cells, self.piece, self.next_shape, self.hold_shape, self.score, self.tick = (
+            cells, piece, next_shape, hold_shape, score, tick)
+        return frame
+
+    def _keyframe(self, cells, piece, next_shape, hold_shape, score, tick):
+        self._force_keyframe = False
+        self._keyframe_tick = tick
+        packed = bytes(cells[i] << 4 | cells[i + 1] for i in range(0, len(cells), 2))
+        return KEYFRAME_HEADER.pack(KEYFRAME, tick) + packed + KEYFRAME_TAIL.pack(*piece, next_shape, hold_shape, score)
+
+    def _delta(self, cells, piece, next_shape, hold_shape, score, tick):
+        flags = 0
+        body = bytearray()
+        if cells is not self.cells:
+            changed = [(i, code) for i, (code, previous) in enumerate(zip(cells, self.cells)) if code != previous]
+            if 2 * len(changed) >= len(cells) // 2:
+                # a line clear moved most of the board: the keyframe is smaller
+                return self._keyframe(cells, piece, next_shape, hold_shape, score, tick)
+            if changed:
+                flags |= CELLS
+                body.append(len(changed))
+                for i, code in changed:
+                    body += bytes((i, code))
+        if piece != self.piece:
+            flags |= PIECE
+            body += PIECE_FORMAT.pack(*piece)
+        if next_shape != self.next_shape:
+            flags |= NEXT
+            body.append(next_shape)
+        if hold_shape != self.hold_shape:
+            flags |= HOLD
+            body.append(hold_shape)
+        if score != self.score:
+            flags |= SCORE
+            body += struct.pack('<I', score)
+        return DELTA + bytes((tick - self.tick, flags)) + bytes(body)
+
+
+class DeltaDecoder:
+    """
+    Rebuilds a board from frames. Deltas received before the first keyframe are skipped.
+    """
+    def __init__(self, rows=GRID_ROWS, columns=GRID_COLUMNS):
+        """
+        Initialize a decoder that has not synced yet.
+
+        Args:
+            rows (int, optional): Number of rows on the board. Defaults to GRID_ROWS.
+            columns (int, optional): Number of columns on the board. Defaults to GRID_COLUMNS.
+        """
+        self.rows = rows
+        self.columns = columns
+        self.cells = bytearray(rows * columns)
+        self.piece = (NO_PIECE, 0, 0, 0)
+        self.next_shape = NO_PIECE
+        self.hold_shape = NO_PIECE
+        self.score = 0
+        self.tick = None
+        self.synced = False
+        self.ended = False
+        self.winner = None
+        self.cells_changed = False
+
+    def decode(self, frame):
+        """
+        Apply one frame.
+
+        Args:
+            frame (bytes): The frame, without its length prefix.
+
+        Returns:
+            bool: False when the frame was skipped because no keyframe was received yet.
+
+        Raises:
+            ValueError: If the frame has an unknown type.
+        """
+        kind = frame[:1]
+        if kind == KEYFRAME:
+            _, self.tick = KEYFRAME_HEADER.unpack_from(frame)
+            offset = KEYFRAME_HEADER.size
+            cells = self.cells
+            for i in range(len(cells) // 2):
+                byte = frame[offset + i]
+                cells[2 * i] = byte >> 4
+                cells[2 * i + 1] = byte & 0x0F
+            offset += len(cells) // 2
+            shape, x, y, rotation, self.next_shape, self.hold_shape, self.score = KEYFRAME_TAIL.unpack_from(frame, offset)
+            self.piece = (shape, x, y, rotation)
+            self.synced = True
+            self.cells_changed = True
+            return True
+        if kind == DELTA:
+            if not self.synced:
+                return False
+            self.tick += frame[1]
+            flags = frame[2]
+            offset = 3
+            if flags & CELLS:
+                count = frame[offset]
+                offset += 1
+                for i in range(count):
+                    self.cells[frame[offset]] = frame[offset + 1]
+                    offset += 2
+                self.cells_changed = True
+            if flags & PIECE:
+                self.piece = PIECE_FORMAT.unpack_from(frame, offset)
+                offset += PIECE_FORMAT.size
+            if flags & NEXT:
+                self.next_shape = frame[offset]
+                offset += 1
+            if flags & HOLD:
+                self.hold_shape = frame[offset]
+                offset += 1
+            if flags & SCORE:
+                self.score, = struct.unpack_from('<I', frame, offset)
+            return True
+        if kind == END:
+            self.ended = True
+            self.winner = bool(frame[1])
+            return True
+        raise ValueError('Unknown frame type {!r}'.format(kind))
+
+    def apply(self, state):
+        """
+        Copy the decoded board into a GameState for drawing.
+
+        Args:
+            state (GameState): The spectator's copy of the game.
+        """
+        if self.cells_changed:
+            columns = self.columns
+            state.locked_positions.clear()
+            state.locked_positions.update(((i % columns, i // columns), CODE_COLORS[code])
+                                          for i, code in enumerate(self.cells) if code)
+            state.grid.refresh()
+            self.cells_changed = False
+        state.current_piece = unpacked_piece(self.piece)
+        state.next_piece = unpacked_piece((self.next_shape, 5, 0, 0))
+        state.hold_piece = unpacked_piece((self.hold_shape, 5, 0, 0))
+        state.score = self.score
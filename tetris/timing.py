@@ -0,0 +1,108 @@
+# tetris\timing.py
+"""
+Fixed-timestep scheduling: the simulation advances in constant ticks while frames
+are rendered at a capped rate, sleeping in between.
+"""
+import time
+
+
+class FixedTimestepScheduler:
+    """
+    Decouples simulation ticks from rendered frames.
+
+    Each frame, begin_frame() reports how many fixed ticks of simulation are due for
+    the real time that passed, and end_frame() sleeps until the next frame is due.
+    """
+    def __init__(self, tick_rate=60, max_fps=60, max_ticks_per_frame=10, clock=time.perf_counter, sleep=time.sleep):
+        """
+        Initialize the scheduler.
+
+        Args:
+            tick_rate (int, optional): Simulation ticks per second. Defaults to 60.
+            max_fps (int, optional): Frame rate cap, 0 for uncapped (e.g. when vsync paces frames). Defaults to 60.
+            max_ticks_per_frame (int, optional): Ticks simulated at most per frame, so a long stall
+                does not snowball into ever longer frames. Defaults to 10.
+            clock (function, optional): Returns the current time in seconds. Defaults to time.perf_counter.
+            sleep (function, optional): Sleeps for a number of seconds. Defaults to time.sleep.
+        """
+        self.tick_ms = 1000 / tick_rate
+        self.frame_seconds = 1 / max_fps if max_fps else 0
+        self.max_ticks_per_frame = max_ticks_per_frame
+        self.clock = clock
+        self.sleep = sleep
+        self.accumulator = 0
+        self.tick = 0
+        self.fps = 0
+        self.simulated_until = None
+        self._last_time = None
+        self._next_frame = None
+        self._frame_count = 0
+        self._fps_time = None
+
+    @property
+    def alpha(self):
+        """
+        Get how far the current frame is between the last tick and the next one.
+
+        Returns:
+            float: The interpolation factor, from 0 to 1.
+        """
+        return min(self.accumulator / self.tick_ms, 1)
+
+    def tick_deadline(self, index, ticks):
+        """
+        Get when one of the ticks of the current frame ends in real time, e.g. to apply
+        the inputs that happened before it.
+
+        Args:
+            index (int): The tick, from 0 to ticks - 1.
+            ticks (int): The number of ticks begin_frame returned.
+
+        Returns:
+            float: The time on the scheduler's clock, in seconds.
+        """
+        return self.simulated_until - (ticks - 1 - index) * self.tick_ms / 1000
+
+    def begin_frame(self):
+        """
+        Start a frame and account for the real time passed since the previous one.
+
+        Returns:
+            int: The number of simulation ticks to run this frame.
+        """
+        now = self.clock()
+        if self._last_time is None:
+            self._last_time = self._fps_time = self._next_frame = now
+        self.accumulator += (now - self._last_time) * 1000
+        self._last_time = now
+
+        ticks = int(self.accumulator // self.tick_ms)
+        if ticks > self.max_ticks_per_frame:
+            ticks = self.max_ticks_per_frame
+            self.accumulator = 0
+        else:
+            self.accumulator -= ticks * self.tick_ms
+        self.tick += ticks
+        # the clock time the simulation has caught up to, which the last tick of the frame ends at
+        self.simulated_until = now - self.accumulator / 1000
+
+        self._frame_count += 1
+        if now - self._fps_time >= 1:
+            self.fps = self._frame_count / (now - self._fps_time)
+            self._frame_count = 0
+            self._fps_time = now
+        return ticks
+
+    def end_frame(self):
+        """
+        Finish a frame, sleeping until the next one is due when the frame rate is capped.
+        """
+        if not self.frame_seconds:
+            return
+        self._next_frame += self.frame_seconds
+        delay = self._next_frame - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        elif delay < -self.frame_seconds:
+            # fell behind by more than a frame: start counting again from now
+            self._next_frame = self.clock()
@@ -0,0 +1,273 @@
+# tetris\tuner.py
+"""
+Tuning of the auto-player's heuristic weights with the cross-entropy method.
+
+Every generation samples candidate weights from a normal distribution per
+weight, plays the same seeded games with every candidate across a pool of
+worker processes, and refits the distribution to the candidates that cleared
+the most rows. The search state is checkpointed to a JSON file after every
+generation, so a long run can be stopped and resumed.
+
+Run with: python -m tetris.tuner --generations 20 --checkpoint tuning.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .ai import DEFAULT_WEIGHTS, AutoPlayer, WeightedHeuristic
+from .engine import GameState
+
+FEATURES = tuple(DEFAULT_WEIGHTS)
+
+
+def play_game(weights, seed, max_pieces):
+    """
+    Play one game with the auto-player. Runs in the worker processes.
+
+    Args:
+        weights (dict): Weight per BoardFeatures field.
+        seed (int): Seed of the game's pieces.
+        max_pieces (int): Pieces after which the game is stopped.
+
+    Returns:
+        tuple: (rows cleared, pieces placed, seconds spent, process id).
+    """
+    start = time.perf_counter()
+    player = AutoPlayer(WeightedHeuristic(weights))
+    state = player.play_game(GameState(seed=seed), max_pieces)
+    return state.lines_cleared, state.pieces_placed, time.perf_counter() - start, os.getpid()
+
+
+class CrossEntropyTuner:
+    """
+    Cross-entropy search over the weights of WeightedHeuristic.
+    """
+    def __init__(self, population=24, elite=0.25, games=4, max_pieces=200, seed=None, noise=0.1):
+        """
+        Initialize the search, centred on DEFAULT_WEIGHTS.
+
+        Args:
+            population (int, optional): Candidates per generation. Defaults to 24.
+            elite (float, optional): Fraction of the candidates the distribution is refit to. Defaults to 0.25.
+            games (int, optional): Games played by every candidate. Defaults to 4.
+            max_pieces (int, optional): Pieces after which a game is stopped. Defaults to 200.
+            seed (int, optional): Seed of the sampling and of the games. Defaults to a random seed.
+            noise (float, optional): Added to the standard deviations, decaying every generation,
+                so the search does not collapse early. Defaults to 0.1.
+        """
+        self.population = population
+        self.elite = elite
+        self.games = games
+        self.max_pieces = max_pieces
+        self.noise = noise
+        self.rng = random.Random(seed)
+        self.generation = 0
+        self.mean = [DEFAULT_WEIGHTS[name] for name in FEATURES]
+        self.std = [0.5] * len(FEATURES)
+        self.best = None  # (fitness, weights) of the best candidate so far
+        self.history = []
+
+    def sample(self):
+        """
+        Draw the candidates of the next generation, scaled to unit length since
+        only the direction of the weights changes which placement is best.
+
+        Returns:
+            list: The candidate weights as dicts.
+        """
+        candidates = []
+        for _ in range(self.population):
+            values = [self.rng.gauss(mean, std) for mean, std in zip(self.mean, self.std)]
+            norm = sum(value * value for value in values) ** 0.5 or 1
+            candidates.append({name: value / norm for name, value in zip(FEATURES, values)})
+        return candidates
+
+    def game_seeds(self):
+        """
+        Draw the seeds of the next generation's games.
+
+        Returns:
+            list: The seeds of the games every candidate of the next generation plays,
+                the same for all of them so they are compared on the same pieces.
+        """
+        return [self.rng.getrandbits(63) for _ in range(self.games)]
+
+    def update(self, candidates, fitness):
+        """
+        Refit the distribution to the best candidates and record the generation.
+
+        Args:
+            candidates (list): The weights of the generation.
+            fitness (list): The mean rows cleared by every candidate.
+        """
+        ranked = sorted(zip(fitness, range(len(candidates))), reverse=True)
+        elite = [candidates[index] for _, index in ranked[:max(2, int(len(candidates) * self.elite))]]
+        extra = self.noise / (self.generation + 1)
+        for i, name in enumerate(FEATURES):
+            values = [weights[name] for weights in elite]
+            self.mean[i] = statistics.fmean(values)
+            self.std[i] = statistics.pstdev(values) + extra
+        best_fitness, best_index = ranked[0]
+        if self.best is None or best_fitness > self.best[0]:
+            self.best = (best_fitness, candidates[best_index])
+        self.generation += 1
+        self.history.append({'generation': self.generation, 'best': best_fitness,
+                             'mean': statistics.fmean(fitness), 'weights': candidates[best_index]})
+
+    def run_generation(self, executor, report=print):
+        """
+        Sample, evaluate and refit one generation.
+
+        Args:
+            executor (concurrent.futures.Executor): Plays the games.
+            report (function, optional): Receives a line of progress. Defaults to print.
+
+        Returns:
+            list: The fitness of every candidate.
+        """
+        candidates = self.sample()
+        seeds = self.game_seeds()
+        start = time.perf_counter()
+        futures = [[executor.submit(play_game, weights, seed, self.max_pieces) for seed in seeds]
+                   for weights in candidates]
+        fitness = []
+        workers = {}  # process id: (games, seconds)
+        for games in futures:
+            lines = []
+            for future in games:
+                cleared, _, seconds, pid = future.result()
+                lines.append(cleared)
+                count, busy = workers.get(pid, (0, 0))
+                workers[pid] = (count + 1, busy + seconds)
+            fitness.append(statistics.fmean(lines))
+        wall = time.perf_counter() - start
+        self.update(candidates, fitness)
+
+        played = self.population * self.games
+        per_worker = ' '.join(f'{count / busy:.2f}' for count, busy in workers.values())
+        report(f'generation {self.generation:3d}  best {max(fitness):7.1f}  mean {statistics.fmean(fitness):7.1f} lines  '
+               f'{played / wall:6.2f} games/s on {len(workers)} workers ({per_worker} games/s each)')
+        return fitness
+
+    def run(self, generations, workers=None, checkpoint=None, report=print):
+        """
+        Run generations in a process pool, checkpointing after each one.
+
+        Args:
+            generations (int): Generations to run, counting the ones of a resumed checkpoint.
+            workers (int, optional): Worker processes. Defaults to the CPU count.
+            checkpoint (str, optional): File the search state is saved to. Defaults to no checkpoints.
+            report (function, optional): Receives lines of progress. Defaults to print.
+
+        Returns:
+            dict: The best weights found.
+        """
+        with ProcessPoolExecutor(workers) as executor:
+            while self.generation < generations:
+                self.run_generation(executor, report)
+                if checkpoint:
+                    self.save(checkpoint)
+        return self.best[1] if self.best else dict(zip(FEATURES, self.mean))
+
+    def to_dict(self):
+        """
+        Get the search state, e.g. to checkpoint it.
+
+        Returns:
+            dict: The search state, JSON serializable.
+        """
+        return {
+            'settings': {'population': self.population, 'elite': self.elite, 'games': self.games,
+                         'max_pieces': self.max_pieces, 'noise': self.noise},
+            'generation': self.generation,
+            'mean': dict(zip(FEATURES, self.mean)),
+            'std': dict(zip(FEATURES, self.std)),
+            'best': None if self.best is None else {'fitness': self.best[0], 'weights': self.best[1]},
+            'history': self.history,
+            'rng': self.rng.getstate(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuild a search from the state returned by to_dict.
+
+        Args:
+            data (dict): The search state.
+
+        Returns:
+            CrossEntropyTuner: The search, ready to run its next generation.
+        """
+        tuner = cls(**data['settings'])
+        tuner.generation = data['generation']
+        tuner.mean = [data['mean'][name] for name in FEATURES]
+        tuner.std = [data['std'][name] for name in FEATURES]
+        best = data['best']
+        tuner.best = None if best is None else (best['fitness'], best['weights'])
+        tuner.history = data['history']
+        version, state, gauss_next = data['rng']
+        tuner.rng.setstate((version, tuple(state), gauss_next))
+        return tuner
+
+    def save(self, path):
+        """
+        Write the search state to a JSON file, replacing it atomically.
+
+        Args:
+            path (str): The checkpoint file.
+        """
+        temporary = path + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Resume a search from a checkpoint.
+
+        Args:
+            path (str): A checkpoint file written by save.
+
+        Returns:
+            CrossEntropyTuner: The search, ready to run its next generation.
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Tune the auto-player heuristic weights')
+    parser.add_argument('--generations', type=int, default=20, help='generations to run in total (default: 20)')
+    # the settings default to None so that a resumed run can tell which ones were given
+    parser.add_argument('--population', type=int, help='candidates per generation (default: 24)')
+    parser.add_argument('--games', type=int, help='games per candidate (default: 4)')
+    parser.add_argument('--max-pieces', type=int, help='pieces per game (default: 200)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: CPU count)')
+    parser.add_argument('--seed', type=int, help='seed of the search')
+    parser.add_argument('--checkpoint', help='JSON file to save to after every generation and resume from')
+    args = parser.parse_args(argv)
+    settings = {'population': args.population, 'games': args.games, 'max_pieces': args.max_pieces}
+
+    if args.checkpoint and os.path.exists(args.checkpoint):
+        tuner = CrossEntropyTuner.load(args.checkpoint)
+        if args.seed is not None:
+            parser.error(f'--seed cannot be changed when resuming {args.checkpoint}')
+        for name, value in settings.items():
+            if value is not None and value != getattr(tuner, name):
+                parser.error(f'--{name.replace("_", "-")} {value} conflicts with {getattr(tuner, name)} '
+                             f'in {args.checkpoint}')
+        print(f'resuming {args.checkpoint} after generation {tuner.generation}')
+    else:
+        tuner = CrossEntropyTuner(seed=args.seed, **{name: value for name, value in settings.items()
+                                                     if value is not None})
+    weights = tuner.run(args.generations, args.workers, args.checkpoint)
+    print('best weights:', json.dumps(weights))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,27 +1,156 @@
 # tetris_game.py
+import sys
+import time
+
 import pygame
-from tetris.gameplay import ShapeOperations, RowOperations, FallSpeedCalculator, Grid
-from tetris.shapes import Shapes
+from tetris.gameplay import ShapeOperations
+from tetris.engine import GameState, Input
+from tetris.ai import AutoPlayer
+from tetris.replay import ReplayRecorder, ReplayPlayer
+from tetris.client import MatchClient, SpectatorClient
+from tetris.spectate import DeltaDecoder
+from tetris.protocol import apply_state
+from tetris.timing import FixedTimestepScheduler
+from tetris.input import InputHandler, SOFT_DROP
+from tetris.profiler import FrameProfiler, NullProfiler
 from tetris.music import  MusicPlayer, RandomSongDecorator
-from tetris.display import TetrisDisplay
+from tetris.display import DirtyRectDisplay
 from tetris.constants import S_HEIGHT, S_WIDTH
 
+# Keys mapped to the inputs of the game engine
+KEY_BINDINGS = {
+    pygame.K_LEFT: Input.LEFT,
+    pygame.K_RIGHT: Input.RIGHT,
+    pygame.K_UP: Input.ROTATE,
+    pygame.K_SPACE: Input.HARD_DROP,
+    pygame.K_c: Input.HOLD,
+    pygame.K_DOWN: SOFT_DROP,
+}
+# Longest sleep between reads of the window's events while waiting for the next frame
+INPUT_POLL_SECONDS = 0.001
+
 class TetrisGame:
     """
     Main class representing the Tetris game.
     """
-    def __init__(self):
+    def __init__(self, autoplay=False, max_fps=60, tick_rate=60, vsync=False, seed=None, record_path=None,
+                 profile=False, profile_path=None, startup_budget=1.0, started_at=None, das_ms=167, arr_ms=33):
         """
-        Initialize the Tetris game by setting up the window, display, shape_operations, row_operations, and music_player.
+        Initialize the Tetris game by setting up the window, display, shape_operations, and music_player.
+
+        Args:
+            autoplay (bool, optional): Let the AutoPlayer place one piece per simulation tick. Defaults to False.
+            max_fps (int, optional): Frame rate cap, 0 for uncapped. Defaults to 60.
+            tick_rate (int, optional): Simulation ticks per second. Defaults to 60.
+            vsync (bool, optional): Ask the display to pace frames with vsync. Defaults to False.
+            seed (int, optional): Seed of the piece generator. Defaults to a random seed per game.
+            record_path (str, optional): Save a replay of each game to this file. Defaults to no recording.
+            profile (bool, optional): Time the phases of every frame and show their percentiles. Defaults to False.
+            profile_path (str, optional): Export the frame timings to this CSV or JSON lines file on exit.
+            startup_budget (float, optional): Seconds the main menu should take to show, a warning is printed
+                when it takes longer. Defaults to 1.0.
+            started_at (float, optional): time.perf_counter() when the program started. Defaults to now.
+            das_ms (float, optional): Milliseconds left or right is held before it repeats. Defaults to 167.
+            arr_ms (float, optional): Milliseconds between repeats, 0 to move to the wall at once. Defaults to 33.
         """
-        pygame.mixer.init()
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.startup_budget = startup_budget
+        self.startup_seconds = None
+        # the mixer is initialized by the music player when the first song plays
         pygame.font.init()
-        self.win = pygame.display.set_mode((S_WIDTH, S_HEIGHT))
+        self.win = self.create_window(vsync)
         pygame.display.set_caption('Tetris')
-        self.display = TetrisDisplay(self.win)
+        self.display = DirtyRectDisplay(self.win)
         self.shape_operations = ShapeOperations()
-        self.row_operations = RowOperations()
         self.music_player = RandomSongDecorator(MusicPlayer())
+        self.auto_player = AutoPlayer() if autoplay else None
+        self.max_fps = max_fps
+        self.tick_rate = tick_rate
+        self.seed = seed
+        self.record_path = record_path
+        self.profiler = FrameProfiler() if profile else NullProfiler()
+        self.profile_path = profile_path
+        self.profile_lines = []
+        self.das_ms = das_ms
+        self.arr_ms = arr_ms
+        self.events = []  # (time.perf_counter() when read, event)
+        for method, phase in (('draw_window', 'draw_window'), ('_draw_changed_cells', 'draw_cells'),
+                              ('_draw_panel', 'draw_panels'), ('_draw_label', 'draw_labels')):
+            self.profiler.instrument(self.display, method, phase)
+
+    @staticmethod
+    def create_window(vsync):
+        """
+        Create the game window, with vsync when requested and supported.
+
+        Args:
+            vsync (bool): Whether to ask for vsync.
+
+        Returns:
+            pygame.Surface: The window surface.
+        """
+        if vsync:
+            try:
+                return pygame.display.set_mode((S_WIDTH, S_HEIGHT), pygame.SCALED, vsync=1)
+            except pygame.error:
+                pass
+        return pygame.display.set_mode((S_WIDTH, S_HEIGHT))
+
+    def read_events(self):
+        """
+        Move the window's pending events to self.events, stamped with the time they were read.
+        """
+        now = time.perf_counter()
+        self.events.extend((now, event) for event in pygame.event.get())
+
+    def wait_for_events(self, seconds):
+        """
+        Sleep until the next frame is due, reading the window's events every millisecond meanwhile
+        so their timestamps do not depend on how long frames take. Used as the scheduler's sleep.
+
+        Args:
+            seconds (float): How long to sleep.
+        """
+        end = time.perf_counter() + seconds
+        while True:
+            self.read_events()
+            remaining = end - time.perf_counter()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, INPUT_POLL_SECONDS))
+
+    def take_events(self):
+        """
+        Get the events read since the previous call, including the ones still pending.
+
+        Returns:
+            list: (timestamp, event) pairs in the order they happened.
+        """
+        self.read_events()
+        events = self.events
+        self.events = []
+        return events
+
+    @staticmethod
+    def queue_key_event(input_handler, timestamp, event):
+        """
+        Queue a bound key press or release on an input handler.
+
+        Args:
+            input_handler (InputHandler): The handler.
+            timestamp (float): When the event was read.
+            event (pygame.event.Event): The event.
+
+        Returns:
+            bool: Whether the event was a bound key.
+        """
+        if event.type not in (pygame.KEYDOWN, pygame.KEYUP) or event.key not in KEY_BINDINGS:
+            return False
+        if event.type == pygame.KEYDOWN:
+            input_handler.press(KEY_BINDINGS[event.key], timestamp)
+        else:
+            input_handler.release(KEY_BINDINGS[event.key], timestamp)
+        return True
 
     def main(self, songs):
         """
@@ -30,155 +159,278 @@ class TetrisGame:
         Args:
             songs (list): List of song files to play during the game.
         """
-        global grid
-        #init variables
-        locked_positions = {}  # (x,y):(255,0,0)
-        grid_instance = Grid(locked_positions)
-        grid = grid_instance.grid
-
-        hold_piece = None
-        hold_switched = False
-        change_piece = False
-        run = True
-        current_piece = Shapes.get_shape()
-        next_piece = Shapes.get_shape()
-        clock = pygame.time.Clock()
-        fall_time = 0
-        fall_speed = FallSpeedCalculator.calculate_fall_speed(0)
-        score = 0
+        state = GameState(seed=self.seed)
+        recorder = None
+        if self.record_path and not self.auto_player:
+            recorder = ReplayRecorder(state.piece_generator.seed, self.tick_rate)
+        scheduler = FixedTimestepScheduler(self.tick_rate, self.max_fps, sleep=self.wait_for_events)
+        input_handler = InputHandler(self.das_ms, self.arr_ms)
+        profiler = self.profiler
+        profiler.instrument(state, 'valid', 'collision')
+        profiler.instrument(state.grid, 'drop_distance', 'collision')
+        profiler.instrument(state.grid, 'clear_full_rows', 'line_clear')
+        self.display.invalidate()
         current_song = self.music_player.play_random_song()
-        #lock delay variables
-        ld_time = 0
-        ld_limit = 20
-        ld_resets = 0
-        ld_max_resets = 10
-        
-        while run:
-
-            grid = grid_instance.create_grid(locked_positions)
-            ghost_piece = current_piece.ghost_piece_position(grid, self.shape_operations.valid_space)
-            fall_time += clock.get_rawtime()
-            clock.tick()
+        self.events = []
 
-            fps = clock.get_fps()
+        while not state.lost:
+            profiler.begin_frame()
+            ticks = scheduler.begin_frame()
 
             current_song = self.music_player.check_music()
-                
-            # handle piece falling
-            keys = pygame.key.get_pressed()  
-            if keys[pygame.K_DOWN]:           
-                fall_speed_multiplier = 5   
-            else:                             
-                fall_speed_multiplier = 1     
-
-            if fall_time/1000 >= fall_speed / fall_speed_multiplier:
-                fall_time = 0
-                current_piece.y += 1
-                if not self.shape_operations.valid_space(current_piece, grid) and current_piece.y > 0:
-                    current_piece.y -= 1
-                    if ld_time >= ld_limit or ld_resets >= ld_max_resets:
-                        change_piece = True
-                    else:
-                        ld_time += clock.get_rawtime()
-                else:
-                    ld_time = 0
-                    ld_resets = 0
+            profiler.lap('music')
 
-            # handle user input
-            for event in pygame.event.get():
+            # queue user input, applied on the simulation tick it happened in
+            for timestamp, event in self.take_events():
                 if event.type == pygame.QUIT:
-                    run = False
+                    if recorder:
+                        recorder.save(self.record_path)
+                    self.save_profile()
                     pygame.display.quit()
                     quit()
 
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_LEFT:
-                        current_piece.x -= 1
-                        if not self.shape_operations.valid_space(current_piece, grid):
-                            current_piece.x += 1
-                        else:
-                            ld_time = 0
-                            ld_resets += 1
-
-
-                    elif event.key == pygame.K_RIGHT:
-                        current_piece.x += 1
-                        if not self.shape_operations.valid_space(current_piece, grid):
-                            current_piece.x -= 1
-                        else:
-                            ld_time = 0
-                            ld_resets += 1
-
-                    elif event.key == pygame.K_UP:
-                        # rotate shape
-                        current_piece.rotation = current_piece.rotation + 1 % len(current_piece.shape)
-                        if not self.shape_operations.valid_space(current_piece, grid):
-                            current_piece.rotation = current_piece.rotation - 1 % len(current_piece.shape)
-                        else:
-                            ld_time = 0
-                            ld_resets += 1
-
-                    elif event.key == pygame.K_SPACE:
-                        while self.shape_operations.valid_space(current_piece, grid):
-                            current_piece.y += 1
-                        current_piece.y -= 1
-                        change_piece = True
-                    
-                    elif event.key == pygame.K_c:
-                        if not hold_switched:
-                            if hold_piece is None:
-                                hold_piece = current_piece
-                                current_piece = next_piece
-                                next_piece = Shapes.get_shape()
-                            else:
-                                hold_piece, current_piece = current_piece, hold_piece
-                                current_piece.x = 5
-                                current_piece.y = 0
-                            hold_switched = True
-
-            # update shape position on grid
-            shape_pos = self.shape_operations.convert_shape_format(current_piece)
-
-            # add piece to the grid for drawing
-            for i in range(len(shape_pos)):
-                x, y = shape_pos[i]
-                if y > -1:
-                    grid[y][x] = current_piece.color
-
-            # check if piece hit the ground
-            if change_piece:
-                for pos in shape_pos:
-                    p = (pos[0], pos[1])
-                    locked_positions[p] = current_piece.color
-                current_piece = next_piece
-                next_piece = Shapes.get_shape()
-                change_piece = False
-                hold_switched = False
-
-                cleared_rows = self.row_operations.clear_rows(grid, locked_positions)
-                if cleared_rows:
-                    score += 10 * cleared_rows
-                    fall_speed = FallSpeedCalculator.calculate_fall_speed(score)
-            
-            # update the window
-            self.display.draw_window(ghost_piece, grid, self.shape_operations.convert_shape_format)
-            self.display.draw_next_shape(next_piece)
-            self.display.draw_score(score)
-            self.display.draw_current_song(current_song)
-            self.display.draw_fps(fps)
-            if hold_piece:
-                self.display.draw_hold_shape(hold_piece)
-            pygame.display.update()
+                if self.music_player.handle_event(event):
+                    continue
+                if not self.auto_player:
+                    # the input handler is only polled when a human plays
+                    self.queue_key_event(input_handler, timestamp, event)
 
-            # Check if user lost
-            if self.shape_operations.check_lost(locked_positions):
-                run = False
+            profiler.lap('events')
+            for tick in range(ticks):
+                if self.auto_player:
+                    self.auto_player.play_move(state)
+                else:
+                    inputs, soft_drop = input_handler.poll(scheduler.tick_deadline(tick, ticks))
+                    if recorder:
+                        recorder.record(inputs, soft_drop)
+                    state.step(inputs, scheduler.tick_ms, soft_drop)
+                if state.lost:
+                    break
+            profiler.lap('simulate')
+            self.draw_state(state, current_song, scheduler.fps, input_handler.latency_ms())
+            input_handler.displayed(time.perf_counter())
+            profiler.end_frame()
+            scheduler.end_frame()
 
+        if recorder:
+            recorder.save(self.record_path)
+        self.save_profile()
         # Display "You Lost" message
         self.display.draw_text_middle("You Lost", 40, (255, 255, 255))
         pygame.display.update()
         pygame.time.delay(2000)
-    
+
+    def draw_state(self, state, current_song, fps, input_latency=None):
+        """
+        Draw a game, updating only the parts of the window that changed.
+
+        Args:
+            state (GameState): The game to draw.
+            current_song (str): The name of the song playing.
+            fps (float): The measured frame rate, shown in the timing overlay instead when profiling.
+            input_latency (tuple, optional): Median and 95th percentile input-to-display latency
+                in milliseconds. Defaults to not shown.
+        """
+        profiler = self.profiler
+        ghost_piece = state.ghost_piece()
+        profiler.lap('ghost')
+        dirty_rects = self.display.draw_frame(ghost_piece, state.view(), self.shape_operations.convert_shape_format,
+                                              state.next_piece, state.hold_piece, state.score, current_song,
+                                              None if profiler else fps, input_latency)
+        if profiler:
+            # sorting the ring buffers is not free, refresh the overlay twice a second
+            if profiler.frame_count % 30 == 0:
+                self.profile_lines = profiler.hud_lines(fps)
+            dirty_rects += self.display.draw_profile(self.profile_lines)
+        profiler.lap('draw_frame')
+        pygame.display.update(dirty_rects)
+        profiler.lap('display_update')
+
+    def save_profile(self):
+        """
+        Export the frame timings when profiling to a file was requested.
+        """
+        if self.profile_path:
+            self.profiler.export(self.profile_path)
+
+    def play_replay(self, replay, speed=1):
+        """
+        Play a replay back through the display. Left/right arrows seek 10 seconds back/forward.
+
+        Args:
+            replay (Replay): The replay to play.
+            speed (float, optional): Playback speed, 1 for real time. Defaults to 1.
+        """
+        player = ReplayPlayer(replay)
+        scheduler = FixedTimestepScheduler(replay.tick_rate * speed, self.max_fps,
+                                           max_ticks_per_frame=max(10, int(10 * speed)))
+        seek_ticks = 10 * replay.tick_rate
+        self.display.invalidate()
+        current_song = self.music_player.play_random_song()
+
+        while not player.finished:
+            self.profiler.begin_frame()
+            ticks = scheduler.begin_frame()
+            current_song = self.music_player.check_music()
+            self.profiler.lap('music')
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.save_profile()
+                    pygame.quit()
+                    return
+                if self.music_player.handle_event(event):
+                    continue
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_LEFT:
+                    player.seek(player.tick - seek_ticks)
+                elif event.type == pygame.KEYDOWN and event.key == pygame.K_RIGHT:
+                    player.seek(player.tick + seek_ticks)
+
+            self.profiler.lap('events')
+
+            player.advance(ticks)
+            self.profiler.lap('simulate')
+            self.draw_state(player.state, current_song, scheduler.fps)
+            self.profiler.end_frame()
+            scheduler.end_frame()
+
+        self.save_profile()
+        self.display.draw_text_middle("Replay finished", 40, (255, 255, 255))
+        pygame.display.update()
+        pygame.time.delay(2000)
+        pygame.quit()
+
+    def play_online(self, host='127.0.0.1', port=7777, name='player'):
+        """
+        Play versus matches on a match server. The server runs the game: inputs are sent
+        as they happen and the window shows the states the server sends back.
+
+        Args:
+            host (str, optional): The server address. Defaults to '127.0.0.1'.
+            port (int, optional): The server port. Defaults to 7777.
+            name (str, optional): The name shown to opponents. Defaults to 'player'.
+        """
+        client = MatchClient(host, port)
+        client.send({'type': 'join', 'name': name})
+        scheduler = FixedTimestepScheduler(self.tick_rate, self.max_fps, sleep=self.wait_for_events)
+        input_handler = InputHandler(self.das_ms, self.arr_ms)
+        self.events = []
+        state = None
+        status = 'Waiting for an opponent'
+        caption = None
+        soft_drop = False
+        current_song = ''
+
+        while not client.closed:
+            scheduler.begin_frame()
+            if state is not None:
+                current_song = self.music_player.check_music()
+
+            for timestamp, event in self.take_events():
+                if event.type == pygame.QUIT:
+                    client.close()
+                    pygame.quit()
+                    return
+                if self.music_player.handle_event(event):
+                    continue
+                if event.type == pygame.KEYDOWN and state is None and status != 'Waiting for an opponent':
+                    client.send({'type': 'join', 'name': name})
+                    status = 'Waiting for an opponent'
+                self.queue_key_event(input_handler, timestamp, event)
+
+            # the server runs the ticks, send everything that happened up to now
+            inputs, pressed = input_handler.poll(time.perf_counter())
+            if state is not None and (inputs or pressed != soft_drop):
+                client.send({'type': 'input', 'inputs': inputs, 'soft_drop': pressed})
+                soft_drop = pressed
+
+            latest = None
+            for message in client.poll():
+                kind = message['type']
+                if kind == 'start':
+                    state = GameState(seed=message['seed'])
+                    player_index = message['player']
+                    opponent_name = message['opponent']
+                    self.display.invalidate()
+                    current_song = self.music_player.play_random_song()
+                elif kind == 'state' and state is not None:
+                    latest = message
+                elif kind == 'end' and state is not None:
+                    if message['winner'] is None:
+                        status = 'Draw. Press any key'
+                    elif message['winner'] == player_index:
+                        status = 'You won! Press any key'
+                    else:
+                        status = 'You lost. Press any key'
+                    state = latest = None
+            # only the newest state is drawn when several arrived during a frame
+            if latest is not None:
+                apply_state(state, latest['you'])
+                opponent = latest['opponent']
+                status = (f"vs {opponent_name}: score {opponent['score']}, height {opponent['height']}"
+                          f" | incoming garbage {latest['garbage']}")
+
+            if status != caption:
+                pygame.display.set_caption(f'Tetris - {status}')
+                caption = status
+            if state is not None:
+                self.draw_state(state, current_song, scheduler.fps)
+            else:
+                self.win.fill((0, 0, 0))
+                self.display.draw_text_middle(status, 40, (255, 255, 255))
+                pygame.display.update()
+            scheduler.end_frame()
+        pygame.quit()
+
+    def spectate(self, host='127.0.0.1', port=7777, match=None, player=0):
+        """
+        Watch one board of a match on a match server, drawn from the spectator stream.
+
+        Args:
+            host (str, optional): The server address. Defaults to '127.0.0.1'.
+            port (int, optional): The server port. Defaults to 7777.
+            match (int, optional): The id of the match. Defaults to any running match.
+            player (int, optional): Which player of the match to watch, 0 or 1. Defaults to 0.
+        """
+        client = SpectatorClient(host, port, match, player)
+        decoder = DeltaDecoder()
+        state = GameState()
+        scheduler = FixedTimestepScheduler(self.tick_rate, self.max_fps)
+        self.display.invalidate()
+        current_song = self.music_player.play_random_song()
+
+        while not client.closed and not decoder.ended:
+            scheduler.begin_frame()
+            current_song = self.music_player.check_music()
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    client.close()
+                    pygame.quit()
+                    return
+                self.music_player.handle_event(event)
+
+            for frame in client.poll():
+                decoder.decode(frame)
+            if decoder.synced:
+                decoder.apply(state)
+                self.draw_state(state, current_song, scheduler.fps)
+            scheduler.end_frame()
+
+        client.close()
+        if decoder.ended:
+            self.display.draw_text_middle("Won" if decoder.winner else "Lost", 40, (255, 255, 255))
+            pygame.display.update()
+            pygame.time.delay(2000)
+        pygame.quit()
+
+    def check_startup_time(self):
+        """
+        Measure the time until the main menu was first shown and warn when it exceeds the startup budget.
+        """
+        self.startup_seconds = time.perf_counter() - self.started_at
+        if self.startup_budget and self.startup_seconds > self.startup_budget:
+            print(f'Startup took {self.startup_seconds:.2f}s, over the {self.startup_budget:.2f}s budget',
+                  file=sys.stderr)
 
     def main_menu(self):
         """
@@ -186,15 +438,20 @@ class TetrisGame:
         """
         run = True
         songs = self.music_player.load_songs()
+        scheduler = FixedTimestepScheduler(self.tick_rate, self.max_fps)
         while run:
+            scheduler.begin_frame()
             self.win.fill((0, 0, 0))
             self.display.draw_text_middle('Press any key to begin', 60, (255, 255, 255))
             pygame.display.update()
+            if self.startup_seconds is None:
+                self.check_startup_time()
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     run = False
 
+                self.music_player.handle_event(event)
                 if event.type == pygame.KEYDOWN:
-                    self.music_player.play_random_song()
                     self.main(songs)
+            scheduler.end_frame()
         pygame.quit()
\ No newline at end of file